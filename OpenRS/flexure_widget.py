@@ -1,38 +1,84 @@
 import numpy as np
 import os
+import threading
 from PyQt5 import QtGui, QtWidgets, QtCore
 from PyQt5.QtCore import Qt, QThread, pyqtSignal
 import importlib.resources
-import yaml
 from OpenRS.return_disp import get_disp_from_fid
+from OpenRS.generate import solver_config
+from OpenRS.generate.solver_config import SOLVERS
 from OpenRS.open_rs_common import table_model, get_file
+from OpenRS.job_queue import job_queue
 
 class external(QThread):
     '''
-    Sets up and runs external thread for FEA, emits 100 when done.
+    Sets up and runs external thread for FEA. Emits the percentage of the CalculiX solution completed as it runs, 100 when done, or -1 if it failed or was cancelled, with a description of progress emitted to _status. Unless full_solve is True, the result is obtained by scaling a cached unit displacement solution (see generate/superposition.py); full solves are cached against their input deck. Both caches are held in unit_cache and result_cache subdirectories of cache_dir, which defaults to outputdir. The dictionary returned by superposition.run_elastic is held in result once complete.
     '''
     _signal = pyqtSignal(int)
-    def __init__(self,disp,ccx_exe,outputdir):
+    _status = pyqtSignal(str)
+    #jobs sharing a unit displacement cache wait for the first to build it
+    cache_lock = threading.Lock()
+    def __init__(self,disp,ccx_exe,outputdir,full_solve=False,threads=None,solver=None,cache_dir=None):
         super(external, self).__init__()
         self.disp = disp
         self.ccx_exe = ccx_exe
         self.outputdir = outputdir
+        self.full_solve = full_solve
+        self.threads = threads
+        self.solver = solver
+        self.cache_dir = outputdir if cache_dir is None else cache_dir
+        self.cancelled = threading.Event()
+        self.result = None
 
     def run(self):
-        from OpenRS.generate.packager_ccx import run_packager_ccx
-        current_dir = os.getcwd()
-        os.chdir(self.outputdir)
-        resource = importlib.resources.files('OpenRS') / 'generate/U_elastic_mesh_only.inp'
-        with importlib.resources.as_file(resource) as path:
-            mf = path.__str__()
-        rf = 'U_elastic_run_ccx.inp'
-        run_packager_ccx(mesh_file_name = mf, \
-            run_file_name = rf, \
-            disp = self.disp, \
-            ccx_exe = self.ccx_exe, \
-            outputdir = self.outputdir)
+        from OpenRS.generate.superposition import run_elastic, get_unit_cache
+        from OpenRS.generate.ccx_process import CcxCancelled
+        try:
+            if not self.full_solve:
+                #only building the shared cache is serialised, scaling it to disp is not
+                self._status.emit('Waiting for cache')
+                with self.cache_lock:
+                    get_unit_cache(self.ccx_exe, \
+                        os.path.join(self.cache_dir, 'unit_cache'), \
+                        progress = self.progress, \
+                        cancel = self.cancelled, \
+                        threads = self.threads, \
+                        solver = self.solver)
+            self.result = run_elastic(self.disp, \
+                self.ccx_exe, \
+                self.outputdir, \
+                full_solve = self.full_solve, \
+                cache_dir = os.path.join(self.cache_dir, 'unit_cache'), \
+                result_cache_dir = os.path.join(self.cache_dir, 'result_cache'), \
+                progress = self.progress, \
+                cancel = self.cancelled, \
+                threads = self.threads, \
+                solver = self.solver)
+        except CcxCancelled:
+            self._status.emit('Cancelled')
+            self._signal.emit(-1)
+            return
+        except Exception as e:
+            print(e)
+            self._status.emit('Failed')
+            self._signal.emit(-1)
+            return
+        self._status.emit('Complete')
         self._signal.emit(100)
-        os.chdir(current_dir)
+
+    def progress(self, state):
+        '''
+        Relays CalculiX progress (see generate/ccx_process.py), holding back 100 until postprocessing is done.
+        '''
+        from OpenRS.generate.ccx_process import progress_message
+        self._status.emit(progress_message(state))
+        self._signal.emit(min(state['percent'], 99))
+
+    def cancel(self):
+        '''
+        Kills CalculiX if running, removing its files from the working directory.
+        '''
+        self.cancelled.set()
 
 
 class modeling_widget(QtWidgets.QDialog):
@@ -116,6 +162,10 @@ class modeling_widget(QtWidgets.QDialog):
         
 
         self.run_button = QtWidgets.QPushButton('Run')
+        self.cancel_button = QtWidgets.QPushButton('Cancel')
+        self.cancel_button.setEnabled(False)
+        self.full_solve_box = QtWidgets.QCheckBox('Full solve')
+        self.full_solve_box.setToolTip('Run CalculiX for this displacement rather than scaling a cached unit displacement result')
         ccx_exec_path_label = QtWidgets.QLabel('Path to CalculiX executable:')
         self.ccx_exec_path = QtWidgets.QLineEdit()
         ccx_choose_path = QtWidgets.QPushButton('...')
@@ -124,23 +174,74 @@ class modeling_widget(QtWidgets.QDialog):
         self.fea_path = QtWidgets.QLineEdit()
         wd_choose_path = QtWidgets.QPushButton('...')
         wd_choose_path.setMaximumWidth(20)
+        threads_label = QtWidgets.QLabel('Solver threads:')
+        self.threads = QtWidgets.QSpinBox()
+        self.threads.setMinimum(0)
+        self.threads.setMaximum(os.cpu_count() or 1)
+        self.threads.setSpecialValueText('Default')
+        self.threads.setToolTip('Threads used by CalculiX; Default leaves this to OMP_NUM_THREADS/CCX_NPROC_EQUATION_SOLVER')
+        self.solver = QtWidgets.QComboBox()
+        self.solver.addItems(['Default'] + SOLVERS)
+        self.solver.setToolTip('Equation solver; Default lets CalculiX choose')
+        max_jobs_label = QtWidgets.QLabel('Concurrent jobs:')
+        self.max_jobs = QtWidgets.QSpinBox()
+        self.max_jobs.setMinimum(1)
+        self.max_jobs.setMaximum(max(os.cpu_count() or 1, 4))
+        self.max_jobs.setToolTip('Number of jobs run at once; others wait in the queue until one finishes')
+
+        self.jobs = job_queue(1, self)
+        self.job_table = QtWidgets.QTableView()
+        self.job_table.setModel(self.jobs)
+        self.job_table.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+        self.job_table.horizontalHeader().setStretchLastSection(True)
+        self.job_table.setToolTip('Double click a completed job to load its result into the model viewer')
+        self.load_result_button = QtWidgets.QPushButton('Load result')
+        self.load_result_button.setEnabled(False)
+        self.clear_jobs_button = QtWidgets.QPushButton('Clear finished')
 
         fea_layout = QtWidgets.QGridLayout()
-        fea_layout.addWidget(self.run_button,2,0,1,1)
+        fea_layout.addWidget(self.run_button,3,0,1,1)
         fea_layout.addWidget(ccx_exec_path_label,0,0,1,1)
         fea_layout.addWidget(self.ccx_exec_path,0,1,1,2)
         fea_layout.addWidget(ccx_choose_path,0,3,1,1)
         fea_layout.addWidget(fea_path_label,1,0,1,1)
         fea_layout.addWidget(self.fea_path,1,1,1,2)
         fea_layout.addWidget(wd_choose_path,1,3,1,1)
-        fea_layout.addWidget(self.pbar,2,1,1,3)
+        fea_layout.addWidget(threads_label,2,0,1,1)
+        fea_layout.addWidget(self.threads,2,1,1,1)
+        fea_layout.addWidget(self.solver,2,2,1,1)
+        fea_layout.addWidget(self.full_solve_box,3,1,1,1)
+        fea_layout.addWidget(self.pbar,3,2,1,2)
+        fea_layout.addWidget(self.cancel_button,4,0,1,1)
+        fea_layout.addWidget(max_jobs_label,4,1,1,1)
+        fea_layout.addWidget(self.max_jobs,4,2,1,1)
+
+        job_group = QtWidgets.QGroupBox('Jobs:')
+        job_button_layout = QtWidgets.QHBoxLayout()
+        job_button_layout.addWidget(self.load_result_button)
+        job_button_layout.addWidget(self.clear_jobs_button)
+        job_button_layout.addStretch()
+        job_layout = QtWidgets.QVBoxLayout()
+        job_layout.addWidget(self.job_table)
+        job_layout.addLayout(job_button_layout)
+        job_group.setLayout(job_layout)
 
         
         self.run_calc_button.clicked.connect(self.get_disp)
 
         self.run_button.clicked.connect(self.run_calc)
+        self.cancel_button.clicked.connect(self.cancel_calc)
         
         ccx_choose_path.clicked.connect(self.set_ccx)
+        self.threads.valueChanged.connect(self.make_config_change)
+        self.solver.currentIndexChanged.connect(self.make_config_change)
+        self.max_jobs.valueChanged.connect(self.make_config_change)
+        self.max_jobs.valueChanged.connect(self.jobs.set_max_jobs)
+        self.jobs.job_finished.connect(self.update_job_buttons)
+        self.job_table.selectionModel().selectionChanged.connect(self.update_job_buttons)
+        self.job_table.doubleClicked.connect(lambda index: self.load_result(index.row()))
+        self.load_result_button.clicked.connect(lambda: self.load_result())
+        self.clear_jobs_button.clicked.connect(self.clear_jobs)
         wd_choose_path.clicked.connect(self.set_wd)
         
 
@@ -149,6 +250,7 @@ class modeling_widget(QtWidgets.QDialog):
         vertical_spacer = QtWidgets.QSpacerItem(10, 10, QtWidgets.QSizePolicy.Minimum, QtWidgets.QSizePolicy.Expanding)
         self.layout.addItem(vertical_spacer)
         self.layout.addLayout(fea_layout)
+        self.layout.addWidget(job_group)
 
         self.setLayout(self.layout)
         self.read_config()
@@ -184,45 +286,136 @@ class modeling_widget(QtWidgets.QDialog):
         self.make_config_change()
         
     def run_calc(self):
-        self.thread = external(self.disp,self.ccx_exec_path.text(),self.fea_path.text())
+        '''
+        Queues a job for the current displacement in its own subdirectory of the working directory, sharing cached results held in the working directory. The progress bar follows the most recently queued job.
+        '''
+        work_dir = self.fea_path.text()
+        self.thread = external(self.disp,self.ccx_exec_path.text(),new_job_dir(work_dir),self.full_solve_box.isChecked(),self.threads.value() or None,self.get_solver(),work_dir)
         self.thread._signal.connect(self.signal_accept)
-        self.thread.start()
+        self.thread._status.connect(self.status_accept)
+        self.jobs.add('%s %.3f'%('Full solve' if self.full_solve_box.isChecked() else 'Scaled', self.disp), self.thread)
+        self.cancel_button.setEnabled(True)
         self.pbar.setTextVisible(True)
         self.pbar.setStyleSheet("")
-        self.pbar.setRange(0,0)
+        self.pbar.setRange(0,100)
+        self.pbar.setValue(0)
+        self.pbar.setFormat("Starting" if self.thread.isRunning() else "Queued")
+
+    def cancel_calc(self):
+        '''
+        Cancels the selected jobs, or the most recently queued if none are selected.
+        '''
+        rows = self.selected_jobs() or [self.jobs.rowCount()-1]
+        for row in rows:
+            if row >= 0 and not self.jobs.is_finished(row):
+                self.jobs.cancel(row)
+                if self.jobs.thread(row) is self.thread and self.jobs.is_finished(row):
+                    self.pbar.setFormat('Cancelled') #never started
+        self.update_job_buttons()
+
+    def selected_jobs(self):
+        return sorted(set([index.row() for index in self.job_table.selectionModel().selectedRows()]))
+
+    def update_job_buttons(self):
+        '''
+        Enables Cancel if there are unfinished jobs, and Load result if a selected job, or failing that any job, has completed.
+        '''
+        rows = range(self.jobs.rowCount())
+        self.cancel_button.setEnabled(any([not self.jobs.is_finished(row) for row in rows]))
+        self.load_result_button.setEnabled(any([self.jobs.result(row) is not None for row in (self.selected_jobs() or rows)]))
+
+    def clear_jobs(self):
+        self.jobs.clear_finished()
+        self.update_job_buttons()
+
+    def load_result(self, row=None):
+        '''
+        Loads the result of the job of row into the model viewer; the selected, or otherwise most recent, completed job if row is None.
+        '''
+        if row is None:
+            rows = [r for r in (self.selected_jobs() or range(self.jobs.rowCount())) if self.jobs.result(r) is not None]
+            if not rows:
+                return
+            row = rows[-1]
+        outfile = self.jobs.result(row)
+        if outfile is None:
+            return
+        self.get_viewer().load_model_file(outfile)
+
+    def get_viewer(self):
+        '''
+        Returns the model viewer interactor of the main application or model viewer this was launched from, or a new model viewer window if launched on its own.
+        '''
+        parent = self.parent()
+        if hasattr(parent, 'mvui'): #main application
+            parent.tabWidget.setCurrentWidget(parent.mvtab)
+            return parent.mvui
+        if hasattr(parent, 'load_model_file'):
+            return parent
+        if not hasattr(self, 'viewer_window'):
+            from OpenRS.model_viewer import launch #model_viewer imports this module
+            self.viewer_window = launch()
+        self.viewer_window.show()
+        return self.viewer_window.main_window
+
+    def status_accept(self, msg):
+        if self.sender() is not self.thread:
+            return
+        if msg in ('Complete', 'Cancelled', 'Failed'):
+            self.pbar.setFormat(msg)
+        else:
+            self.pbar.setFormat(msg + " (%p%)")
         
     def signal_accept(self, msg):
-        if int(msg) == 100:
-            self.pbar.setRange(0,100)
-            self.pbar.setValue(0)
-            self.pbar.setFormat("Complete")
+        if self.sender() is not self.thread:
+            return
+        if int(msg) == 100 or int(msg) == -1:
+            self.pbar.setValue(100 if int(msg) == 100 else 0)
             self.pbar.setStyleSheet("QProgressBar"
               "{"
-              "background-color: lightgreen;"
+              "background-color: %s;"
               "border : 1px"
-              "}")
+              "}"%("lightgreen" if int(msg) == 100 else "lightcoral"))
+        else:
+            self.pbar.setValue(int(msg))
         
 
     def read_config(self):
-        resource = importlib.resources.files('OpenRS') / 'meta/OpenRSconfig.yml'
-        with importlib.resources.as_file(resource) as path:
-            with open(path.__str__(), 'r') as f:
-                read = yaml.load(f, Loader=yaml.FullLoader)
-        
+        read = solver_config.read_config()
+        self.reading_config = True #don't write back while populating
         self.ccx_exec_path.setText(read['FEA']['ccx_exec'])
         self.fea_path.setText(read['FEA']['work_dir'])
+        self.threads.setValue(int(read['FEA']['threads']))
+        self.max_jobs.setValue(int(read['FEA']['max_jobs']))
+        solver = str(read['FEA']['solver']).upper()
+        self.solver.setCurrentIndex(SOLVERS.index(solver)+1 if solver in SOLVERS else 0)
+        self.reading_config = False
 
     def make_config_change(self):
-        data = dict(
-        FEA = dict(
-        ccx_exec = str(self.ccx_exec_path.text()),
-        work_dir = str(self.fea_path.text())
-        )
-        )
-        resource = importlib.resources.files('OpenRS') / 'meta/OpenRSconfig.yml'
-        with importlib.resources.as_file(resource) as path:
-            with open(path.__str__(), 'r') as f:
-                yaml.dump(data,f, default_flow_style=False)
+        if self.reading_config:
+            return
+        solver_config.write_fea_config(ccx_exec = str(self.ccx_exec_path.text()), \
+            work_dir = str(self.fea_path.text()), \
+            threads = self.threads.value(), \
+            max_jobs = self.max_jobs.value(), \
+            solver = self.get_solver() or '')
+
+    def get_solver(self):
+        '''
+        Returns the selected equation solver, None for default
+        '''
+        return self.solver.currentText() if self.solver.currentIndex() > 0 else None
+
+def new_job_dir(work_dir):
+    '''
+    Creates and returns the next unused numbered subdirectory (job_001, job_002 etc.) of work_dir.
+    '''
+    n = 1
+    while os.path.exists(os.path.join(work_dir, 'job_%03i'%n)):
+        n += 1
+    path = os.path.join(work_dir, 'job_%03i'%n)
+    os.makedirs(path)
+    return path
 
 if __name__ == "__main__":
     import sys
@@ -0,0 +1,131 @@
+'''
+Batch postprocessing of a directory of CalculiX results. Each *.frd file (and companion *.dat file) found is processed with frd_access.postprocess in a pool of worker processes, with any failure recorded against the file rather than stopping the batch. A JSON manifest of timings, node/element counts and failures is written alongside the output.
+(c) M. J. Roy 2021
+'''
+
+import os
+import sys
+import glob
+import json
+import time
+import traceback
+from contextlib import contextmanager
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from OpenRS.generate.frd_access import postprocess
+
+@contextmanager
+def limit_threads(n):
+    '''
+    Context manager setting the number of OpenMP/BLAS and CalculiX threads to n for any processes started within it, so that a pool of processes share the available cores rather than competing for them.
+    '''
+    saved = dict([(k, os.environ.get(k)) for k in ['OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS', \
+        'CCX_NPROC_EQUATION_SOLVER', 'CCX_NPROC_RESULTS', 'CCX_NPROC_STIFFNESS']])
+    for k in saved:
+        os.environ[k] = str(n)
+    try:
+        yield
+    finally:
+        for k, v in saved.items():
+            if v is None:
+                del os.environ[k]
+            else:
+                os.environ[k] = v
+
+def find_results(directory, recursive=False):
+    '''
+    Returns a sorted list of *.frd files in directory, including subdirectories if recursive is True.
+    '''
+    if recursive:
+        pattern = os.path.join(directory, '**', '*.frd')
+    else:
+        pattern = os.path.join(directory, '*.frd')
+    return sorted(glob.glob(pattern, recursive=recursive))
+
+def _postprocess_one(frdname, outfile, fiducial_file, binary):
+    '''
+    Runs postprocess on a single result, returning a manifest entry rather than raising.
+    '''
+    entry = {'frd': frdname, 'outfile': outfile, 'fiducial_file': fiducial_file}
+    start = time.perf_counter()
+    try:
+        entry.update(postprocess(frdname, outfile, fiducial_file, binary=binary))
+        entry['status'] = 'ok'
+    except Exception as e:
+        entry['status'] = 'failed'
+        entry['error'] = '%s: %s'%(type(e).__name__, e)
+        entry['traceback'] = traceback.format_exc()
+    entry['time'] = time.perf_counter() - start
+    return entry
+
+def batch_postprocess(directory, outputdir=None, ext='.vtu', processes=None, recursive=False, binary=True, manifest='batch_manifest.json'):
+    '''
+    Postprocesses all *.frd files in directory across a pool of processes.
+    outputdir - where output is written, defaults to alongside each *.frd file
+    ext - output format, one of '.vtu', '.vtk' or '.OpenRS'
+    processes - number of worker processes, defaults to the number of cores
+    recursive - whether subdirectories of directory are searched
+    binary - write compressed binary rather than ascii *.vtu files
+    manifest - name of the JSON summary written to outputdir (or directory), None to skip
+    Returns the list of manifest entries, one per result file in the order found.
+    '''
+    frdnames = find_results(directory, recursive)
+    if processes is None:
+        processes = os.cpu_count()
+    processes = max(1, min(processes, len(frdnames)))
+
+    if outputdir is not None and not os.path.isdir(outputdir):
+        os.makedirs(outputdir)
+
+    jobs = []
+    for frdname in frdnames:
+        prefix = os.path.splitext(frdname)[0]
+        if outputdir is not None:
+            prefix = os.path.join(outputdir, os.path.basename(prefix))
+        jobs.append((frdname, prefix + ext, prefix + '_fid.txt', binary))
+
+    start = time.perf_counter()
+    results = [None]*len(jobs)
+    #keep numerical libraries in each worker single threaded so that workers scale with cores
+    if jobs:
+        with limit_threads(1), ProcessPoolExecutor(max_workers=processes) as pool:
+            futures = dict([(pool.submit(_postprocess_one, *job), i) for i, job in enumerate(jobs)])
+            for count, future in enumerate(as_completed(futures)):
+                i = futures[future]
+                results[i] = future.result()
+                print('[%i/%i] %s %s (%.2f s)'%(count+1, len(jobs), results[i]['status'], results[i]['frd'], results[i]['time']))
+    wall_time = time.perf_counter() - start
+
+    if manifest is not None:
+        summary = {
+            'created': datetime.today().strftime('%Y-%m-%d %H:%M:%S'),
+            'directory': os.path.abspath(directory),
+            'processes': processes,
+            'wall_time': wall_time,
+            'processed': sum([r['status'] == 'ok' for r in results]),
+            'failed': [r['frd'] for r in results if r['status'] == 'failed'],
+            'results': results,
+            }
+        with open(os.path.join(outputdir if outputdir is not None else directory, manifest), 'w') as f:
+            json.dump(summary, f, indent=2)
+
+    return results
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Postprocess all CalculiX *.frd (and companion *.dat) results in a directory in parallel.')
+    parser.add_argument('directory', help='directory containing *.frd files')
+    parser.add_argument('-o', '--outputdir', help='output directory, defaults to alongside each *.frd file')
+    parser.add_argument('-f', '--format', default='.vtu', choices=['.vtu', '.vtk', '.OpenRS'], help='output format')
+    parser.add_argument('-n', '--processes', type=int, help='number of worker processes, defaults to the number of cores')
+    parser.add_argument('-r', '--recursive', action='store_true', help='search subdirectories')
+    parser.add_argument('--ascii', action='store_true', help='write ascii rather than binary *.vtu')
+    parser.add_argument('--manifest', default='batch_manifest.json', help='name of the JSON summary file')
+    args = parser.parse_args()
+
+    results = batch_postprocess(args.directory, args.outputdir, args.format, args.processes, args.recursive, not args.ascii, args.manifest)
+    failed = [r for r in results if r['status'] == 'failed']
+    for r in failed:
+        print('Failed: %s, %s'%(r['frd'], r['error']))
+    print('Processed %i of %i results.'%(len(results) - len(failed), len(results)))
+    sys.exit(1 if failed else 0)
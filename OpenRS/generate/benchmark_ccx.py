@@ -0,0 +1,103 @@
+'''
+Benchmarks CalculiX on the elastic U-bend deck across combinations of thread count and equation solver, to find the fastest setting for the machine it runs on. Each combination is solved in a temporary work directory and timed from start to exit of CalculiX, with combinations that fail (i.e. a solver that CalculiX has not been built with) recorded as such. The fastest setting is written to OpenRSconfig.yml (see solver_config.py) for subsequent runs, and all timings to a JSON file if requested.
+(c) M. J. Roy 2021
+'''
+
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import itertools
+from datetime import datetime
+from OpenRS.generate.packager_ccx import default_mesh, material_details, step_details
+from OpenRS.generate.ccx_process import run_ccx
+from OpenRS.generate.solver_config import SOLVERS, write_fea_config
+
+def default_threads():
+    '''
+    Returns powers of two up to the number of cores, and the number of cores itself.
+    '''
+    n = os.cpu_count() or 1
+    threads = [2**i for i in range(n.bit_length()) if 2**i <= n]
+    if threads[-1] != n:
+        threads.append(n)
+    return threads
+
+def _time_case(ccx_exe, deck, threads, solver, binary):
+    '''
+    Solves deck once in a new temporary directory, returning the wall time, or raising RuntimeError if CalculiX fails or writes no results.
+    '''
+    work_dir = tempfile.mkdtemp(prefix='OpenRS_benchmark_')
+    try:
+        run_file_name = os.path.join(work_dir, 'U_elastic_benchmark.inp')
+        with open(run_file_name, 'w') as f:
+            f.write(deck)
+        start = time.perf_counter()
+        run_ccx(ccx_exe, run_file_name, work_dir, binary, threads=threads)
+        elapsed = time.perf_counter() - start
+        if not os.path.isfile(os.path.join(work_dir, 'U_elastic_benchmark.frd')):
+            raise RuntimeError('CalculiX wrote no results with %i threads and solver %s.'%(threads, solver))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return elapsed
+
+def benchmark(ccx_exe, threads=None, solvers=SOLVERS, mesh_file_name=None, repeats=1, binary=True, save=True):
+    '''
+    Times CalculiX on the elastic U-bend deck for every combination of threads and solvers.
+    threads - thread counts to try, see default_threads if None
+    solvers - equation solvers to try, see solver_config.SOLVERS
+    mesh_file_name - mesh input deck, defaults to that distributed with OpenRS
+    repeats - number of times each combination is run, the fastest of which is recorded
+    save - write the fastest setting to OpenRSconfig.yml
+    Returns a dictionary of the 'fastest' combination ('threads', 'solver' and 'time'), or None if all failed, and 'results', a list of the same for each combination with 'status' and any 'error'.
+    '''
+    if threads is None:
+        threads = default_threads()
+    if mesh_file_name is None:
+        mesh_file_name = default_mesh()
+    with open(mesh_file_name) as mesh:
+        mesh_deck = mesh.read()
+
+    results = []
+    for solver, n in itertools.product(solvers, threads):
+        entry = {'threads': n, 'solver': solver}
+        deck = mesh_deck + material_details() + step_details(1.0, solver)
+        try:
+            entry['time'] = min([_time_case(ccx_exe, deck, n, solver, binary) for i in range(repeats)])
+            entry['status'] = 'ok'
+        except RuntimeError as e:
+            entry['status'] = 'failed'
+            entry['error'] = str(e)
+        results.append(entry)
+        print('%s with %i threads: %s'%(solver, n, '%.2f s'%entry['time'] if entry['status'] == 'ok' else entry['status']))
+
+    completed = [r for r in results if r['status'] == 'ok']
+    fastest = min(completed, key=lambda r: r['time']) if completed else None
+    if fastest is not None and save:
+        write_fea_config(threads=fastest['threads'], solver=fastest['solver'])
+        print('Saved %s with %i threads to configuration.'%(fastest['solver'], fastest['threads']))
+    return {'fastest': fastest, 'results': results}
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Find the fastest CalculiX thread count and equation solver for the elastic U-bend model on this machine.')
+    parser.add_argument('ccx_exe', help='full path to the CalculiX executable')
+    parser.add_argument('-t', '--threads', type=int, nargs='+', help='thread counts to try, defaults to powers of two up to the number of cores')
+    parser.add_argument('-s', '--solvers', nargs='+', default=SOLVERS, choices=SOLVERS, help='equation solvers to try')
+    parser.add_argument('-m', '--mesh', help='mesh input deck, defaults to that distributed with OpenRS')
+    parser.add_argument('-r', '--repeats', type=int, default=1, help='runs of each combination, the fastest of which is kept')
+    parser.add_argument('-o', '--output', help='JSON file to write all timings to')
+    parser.add_argument('--no-save', action='store_true', help='do not write the fastest setting to OpenRSconfig.yml')
+    args = parser.parse_args()
+
+    summary = benchmark(args.ccx_exe, args.threads, args.solvers, args.mesh, args.repeats, save=not args.no_save)
+    if args.output is not None:
+        summary['created'] = datetime.today().strftime('%Y-%m-%d %H:%M:%S')
+        summary['ccx_exe'] = args.ccx_exe
+        with open(args.output, 'w') as f:
+            json.dump(summary, f, indent=2)
+    if summary['fastest'] is None:
+        sys.exit('All combinations failed.')
+    print('Fastest: %s with %i threads (%.2f s).'%(summary['fastest']['solver'], summary['fastest']['threads'], summary['fastest']['time']))
@@ -0,0 +1,232 @@
+'''
+Python script for generating a structured hexahedral mesh of the EASI-STRESS elastically loaded U-bend specimen with numpy, as an alternative to "build_model.py" that needs neither ABAQUS nor a STEP file. Geometry is parameterised as per geometry/U_elastic.scad with implicit fiducials (as U_elastic_imp_fid.STEP): two legs with a notch on either side, joined by a semi-circular arch and extruded through the thickness, with a loading hole through both legs at the roots of the notches. The mesh is written as an input deck containing nodal coordinates, element definitions and the sets for the application of boundary conditions used by "packager_ccx.py" and "packager.py":
+left, right - nodes along the root of the outer notch of each leg, either side of the loading hole
+midplane_xy - nodes on the mid-thickness plane of the arch
+left_lower_datum, left_upper_datum, right_lower_datum, right_upper_datum - nodes along the fiducial datum lines, on the mid-thickness plane from the outer face of each leg
+all - all nodes and elements
+The mesh is made of blocks that are each a structured grid: the y-z section of each leg is divided into an O-grid around the loading hole and rectangles above and below it, which are swept across the width of the leg, while the arch is swept around its centre. Coincident nodes of neighbouring blocks are merged.
+(c) M. J. Roy 2021
+'''
+
+import numpy as np
+
+GEOMETRY = {
+    'inner_radius': 20.0, #inner radius of the arch, half the distance between legs
+    'width': 10.0, #of legs and arch
+    'length': 50.0, #of legs, from their base to the centre of the arch
+    'thickness': 20.0,
+    'notch_depth': 2.0,
+    'notch_length': 10.0,
+    'notch_y': 15.0, #height of notch roots and centre of the loading hole
+    'hole_radius': 5.0,
+    'datum_y': (25.0, 45.0), #heights of lower and upper datums
+    'datum_depth': 4.0, #length of datum lines from the outer face
+    }
+
+HEX8 = [(0,0,0), (1,0,0), (1,1,0), (0,1,0), (0,0,1), (1,0,1), (1,1,1), (0,1,1)]
+#corners on a grid of twice the divisions, then mid-sides of bottom, top and vertical edges
+HEX20 = [(2*i, 2*j, 2*k) for i, j, k in HEX8] + [(1,0,0), (2,1,0), (1,2,0), (0,1,0), (1,0,2), (2,1,2), (1,2,2), (0,1,2), \
+    (0,0,1), (2,0,1), (2,2,1), (0,2,1)]
+#corner nodes of faces S1 to S6 of hexahedra
+FACES = [[0, 1, 2, 3], [4, 7, 6, 5], [0, 4, 5, 1], [1, 5, 6, 2], [2, 6, 7, 3], [3, 7, 4, 0]]
+
+def divisions(length, seed, multiple=1):
+    '''
+    Returns the number of divisions of length closest to seed, rounded up to a multiple.
+    '''
+    return max(multiple, int(np.ceil(length/seed/multiple - 1e-9))*multiple)
+
+def segments(breaks, seed, order=1):
+    '''
+    Returns coordinates between successive breaks spaced close to seed, with nodes at all breaks. Intervals are halved for quadratic elements.
+    '''
+    breaks = np.unique(breaks)
+    parts = [np.linspace(a, b, order*divisions(b - a, seed) + 1)[:-1] for a, b in zip(breaks[:-1], breaks[1:])]
+    return np.append(np.concatenate(parts), breaks[-1])
+
+def _leg_section(g, seed, n_thick, order):
+    '''
+    Returns blocks of points (y, z) meshing the section of a leg: rectangles below and above a square around the loading hole, and an O-grid of four blocks between the square and the hole.
+    '''
+    h, yc, r = g['thickness']/2, g['notch_y'], g['hole_radius']
+    z = np.linspace(-h, h, order*n_thick + 1)
+    blocks = []
+    if yc - h > 0:
+        y = segments([0, yc - h], seed, order)
+        blocks.append(np.stack(np.meshgrid(y, z, indexing='ij'), axis=-1))
+    y = segments([yc + h] + sorted(g['datum_y']) + [g['length']], seed, order)
+    blocks.append(np.stack(np.meshgrid(y, z, indexing='ij'), axis=-1))
+
+    #each side of the square, from corner to corner anticlockwise, maps to a quarter of the hole
+    s = np.linspace(0, 1, order*n_thick + 1)[:, None, None]
+    rho = np.linspace(0, 1, order*divisions(h - r, seed) + 1)[None, :, None]
+    centre = np.array([yc, 0.0])
+    for k in range(4):
+        a = -0.75*np.pi + k*0.5*np.pi
+        start = np.sqrt(2)*h*np.array([np.cos(a), np.sin(a)])
+        end = np.sqrt(2)*h*np.array([np.cos(a + 0.5*np.pi), np.sin(a + 0.5*np.pi)])
+        square = start + s*(end - start)
+        hole = r*np.concatenate((np.cos(a + s*0.5*np.pi), np.sin(a + s*0.5*np.pi)), axis=-1)
+        blocks.append(centre + hole + rho*(square - hole))
+    return blocks
+
+def _leg(section, t, g, side):
+    '''
+    Sweeps a block of the leg section across the width of the leg at fractions t from the outer face, following the notches. side is -1 for the left leg and 1 for the right.
+    '''
+    R, W = g['inner_radius'], g['width']
+    y, z = section[..., 0][..., None], section[..., 1][..., None]
+    notch = g['notch_depth']*np.clip(1 - np.abs(y - g['notch_y'])/(g['notch_length']/2), 0, None)
+    outer, inner = R + W - notch, R + notch
+    x = side*(outer + t*(inner - outer))
+    return np.stack(np.broadcast_arrays(x, y, z), axis=-1)
+
+def _arch(t, g, seed, n_thick, order):
+    '''
+    Returns the block of points of the arch, swept from the left leg to the right at fractions t of width from the outer face.
+    '''
+    R, W, h = g['inner_radius'], g['width'], g['thickness']/2
+    theta = np.pi*(1 - np.linspace(0, 1, order*divisions(np.pi*(R + W/2), seed) + 1))
+    r = (R + W - t*W)[:, None, None]
+    theta = theta[None, :, None]
+    z = np.linspace(-h, h, order*n_thick + 1)[None, None, :]
+    x, y = r*np.cos(theta), g['length'] + r*np.sin(theta)
+    return np.stack(np.broadcast_arrays(x, y, z), axis=-1)
+
+def _block_cells(index, points, offsets, step):
+    '''
+    Returns the connectivity of hexahedra on a block given the global index of its points, with the block reversed through its last axis if elements would otherwise be inside out.
+    '''
+    p = [points[i, j, k] for i, j, k in offsets[:8]]
+    if np.dot(np.cross(p[1] - p[0], p[3] - p[0]), p[4] - p[0]) < 0:
+        index = index[:, :, ::-1]
+    a, b, c = [(n - 1)//step for n in index.shape]
+    i, j, k = np.meshgrid(step*np.arange(a), step*np.arange(b), step*np.arange(c), indexing='ij')
+    return np.column_stack([index[i.ravel() + oi, j.ravel() + oj, k.ravel() + ok] for oi, oj, ok in offsets])
+
+def merge_blocks(blocks, offsets=HEX8, step=1):
+    '''
+    Returns nodal coordinates and element connectivity (of node numbers 1 to N) of blocks of points, each an array of shape (a, b, c, 3), meshed with hexahedra of the given offsets (HEX8 or HEX20, with a step of 2 for the latter). Coincident points of blocks are merged, and only points of elements are kept.
+    '''
+    points = np.concatenate([b.reshape(-1, 3) for b in blocks])
+    _, first, inverse = np.unique(np.round(points, 6), axis=0, return_index=True, return_inverse=True)
+    inverse = inverse.ravel()
+    cells, start = [], 0
+    for b in blocks:
+        n = b[..., 0].size
+        cells.append(_block_cells(inverse[start:start + n].reshape(b.shape[:3]), b, offsets, step))
+        start += n
+    cells = np.concatenate(cells)
+    used = np.unique(cells)
+    label = np.zeros(len(first), dtype=np.int64)
+    label[used] = np.arange(1, len(used) + 1)
+    return points[first[used]], label[cells]
+
+def element_faces(coordinates, connectivity, on_surface):
+    '''
+    Returns element numbers (1 to M) and face numbers (1 to 6, as per the S1 to S6 faces of C3D8/C3D20 elements) of faces of all of whose corner nodes on_surface, a callable of nodal coordinates (N x 3) returning a boolean array, is True.
+    '''
+    on = on_surface(coordinates)[connectivity[:, :8] - 1]
+    elements, faces = [], []
+    for i, face in enumerate(FACES):
+        found = np.nonzero(on[:, face].all(axis=1))[0]
+        elements.append(found + 1)
+        faces.append(np.full(len(found), i + 1))
+    return np.concatenate(elements), np.concatenate(faces)
+
+def u_bend_mesh(seed=1.0, element_type='C3D8', **geometry):
+    '''
+    Meshes the U-bend with elements of nominal length seed. element_type is one of C3D8(R) or C3D20(R), and keyword arguments override values of GEOMETRY. Returns nodal coordinates (N x 3, of node numbers 1 to N), element connectivity (of node numbers) and a dictionary of node sets (see module description).
+    '''
+    g = dict(GEOMETRY)
+    g.update(geometry)
+    if element_type.upper() not in ('C3D8', 'C3D8R', 'C3D20', 'C3D20R'):
+        raise ValueError('Element type %s not supported; needs to be C3D8, C3D8R, C3D20 or C3D20R.'%element_type)
+    h = g['thickness']/2
+    if not 0 < g['hole_radius'] < h:
+        raise ValueError('Loading hole needs to be smaller than the thickness.')
+    if g['notch_y'] < h or g['notch_y'] + h > min(g['datum_y']) or max(g['datum_y']) >= g['length']:
+        raise ValueError('Loading hole needs to be at least half the thickness from the base, and datums between it and the arch.')
+    if not 0 < g['datum_depth'] < g['width'] or g['notch_depth'] >= g['width']/2:
+        raise ValueError('Datums and notches need to be within the width of the legs.')
+
+    order = 2 if '20' in element_type else 1
+    offsets = HEX20 if order == 2 else HEX8
+    n_thick = divisions(g['thickness'], seed, 4) #nodes on mid-planes of the thickness and around the hole
+    t = segments([0, g['datum_depth'], g['width']], seed, order)/g['width']
+    section = _leg_section(g, seed, n_thick, order)
+    blocks = [_leg(b, t, g, -1) for b in section] + [_leg(b, t, g, 1) for b in section] + [_arch(t, g, seed, n_thick, order)]
+
+    coordinates, connectivity = merge_blocks(blocks, offsets, order)
+
+    x, y, z = coordinates.T
+    tol = 1e-6*(g['length'] + g['inner_radius'] + g['width'])
+    outer, root = g['inner_radius'] + g['width'], g['inner_radius'] + g['width'] - g['notch_depth']
+    hole_side = (np.abs(y - g['notch_y']) < tol) & (np.abs(z) > g['hole_radius'] - tol)
+    mid = np.abs(z) < tol
+    nsets = {'left': hole_side & (np.abs(x + root) < tol), 'right': hole_side & (np.abs(x - root) < tol),
+        'midplane_xy': mid & (y > g['length'] - tol)}
+    for name, yd in zip(['lower', 'upper'], sorted(g['datum_y'])):
+        line = mid & (np.abs(y - yd) < tol)
+        nsets['left_%s_datum'%name] = line & (x < -outer + g['datum_depth'] + tol)
+        nsets['right_%s_datum'%name] = line & (x > outer - g['datum_depth'] - tol)
+    nsets = dict([(k, np.nonzero(v)[0] + 1) for k, v in nsets.items()])
+    return coordinates, connectivity, nsets
+
+def _write_labels(f, labels, per_line=16):
+    for i in range(0, len(labels), per_line):
+        f.write(', '.join(['%i'%n for n in labels[i:i + per_line]]) + '\n')
+
+def write_mesh(file_name, coordinates, connectivity, nsets, element_type='C3D8', elsets=None, surfaces=None, heading='U-bend mesh generated by build_mesh.py'):
+    '''
+    Writes an input deck of nodes, elements of element_type and node sets, with a node set 'all' of all nodes unless one is given.
+    elsets - dictionary of element sets, otherwise all elements are in the element set 'all'
+    surfaces - dictionary of element based surfaces of (element numbers, face numbers), see element_faces
+    '''
+    n = connectivity.shape[1]
+    with open(file_name, 'w') as f:
+        f.write('*Heading\n** %s\n*Node\n'%heading)
+        np.savetxt(f, np.column_stack((np.arange(1, len(coordinates) + 1), coordinates)), fmt='%7d, %.10g, %.10g, %.10g')
+        f.write('*Element, type=%s%s\n'%(element_type.upper(), ', elset=all' if elsets is None else ''))
+        #no more than 16 entries per line
+        row = '%i' + ', %i'*min(15, n) + ''.join([',\n' + ', '.join(['%i']*min(16, n - s)) for s in range(15, n, 16)])
+        np.savetxt(f, np.column_stack((np.arange(1, len(connectivity) + 1), connectivity)), fmt=row)
+        if 'all' not in nsets:
+            f.write('*Nset, nset=all, generate\n1, %i, 1\n'%len(coordinates))
+        for name, labels in nsets.items():
+            f.write('*Nset, nset=%s\n'%name)
+            _write_labels(f, labels)
+        for name, labels in (elsets or {}).items():
+            f.write('*Elset, elset=%s\n'%name)
+            _write_labels(f, labels)
+        for name, (elements, faces) in (surfaces or {}).items():
+            f.write('*Surface, type=ELEMENT, name=%s\n'%name)
+            np.savetxt(f, np.column_stack((elements, faces)), fmt='%i, S%i')
+
+def build_mesh(file_name, seed=1.0, element_type='C3D8', **geometry):
+    '''
+    Meshes the U-bend (see u_bend_mesh) and writes it to file_name, returning the number of nodes and elements.
+    '''
+    coordinates, connectivity, nsets = u_bend_mesh(seed, element_type, **geometry)
+    write_mesh(file_name, coordinates, connectivity, nsets, element_type)
+    return len(coordinates), len(connectivity)
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Mesh the elastic U-bend with structured hexahedra, without ABAQUS.')
+    parser.add_argument('-s', '--seed', type=float, default=1.0, help='nominal element length (mm)')
+    parser.add_argument('-e', '--element-type', default='C3D8', choices=['C3D8', 'C3D8R', 'C3D20', 'C3D20R'], help='element type')
+    parser.add_argument('-o', '--output', help='mesh input deck to write, defaults to that used by packager_ccx.py')
+    for k, v in GEOMETRY.items():
+        if k == 'datum_y':
+            parser.add_argument('--datum-y', type=float, nargs=2, default=v, help='heights of lower and upper datums (mm)')
+        else:
+            parser.add_argument('--' + k.replace('_', '-'), type=float, default=v, help='(mm)')
+    args = parser.parse_args()
+
+    if args.output is None:
+        from OpenRS.generate.packager_ccx import default_mesh
+        args.output = default_mesh()
+    geometry = dict([(k, getattr(args, k)) for k in GEOMETRY])
+    n_nodes, n_elements = build_mesh(args.output, args.seed, args.element_type, **geometry)
+    print('Wrote %s with %i nodes and %i elements.'%(args.output, n_nodes, n_elements))
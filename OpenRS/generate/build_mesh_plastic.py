@@ -0,0 +1,106 @@
+'''
+Python script for generating a structured hexahedral mesh of the three roller bending of an EASI-STRESS U-bend blank with numpy, for solution with CalculiX by "packager_plastic_ccx.py". Geometry follows "build_model_plastic.py" (ISO 5173): a blank is bent by a central plunger roller between two die rollers. As CalculiX has no analytical rigid surfaces, each roller is a ring of elements one element thick; as all of their nodes are given displacements, rollers move as rigid bodies. The mesh is written as an input deck containing:
+all - node and element sets of the blank
+xy_midplane, yz_midplane - nodes of the blank on the mid-planes normal to z and x
+roller1, roller2, roller3 - nodes of the plunger and die rollers
+rollers - element set of all rollers
+TOP, BOTTOM - element surfaces of the upper and lower sides of the blank
+R1_SURF, R2_SURF, R3_SURF - element surfaces of the outside of each roller
+Blank nodes and elements are numbered first, followed by those of each roller in turn.
+(c) M. J. Roy 2021
+'''
+
+import numpy as np
+from OpenRS.generate.build_mesh import segments, divisions, merge_blocks, element_faces, write_mesh
+
+GEOMETRY = {
+    'thickness': 10.0, #of the blank
+    'roller_radius': 20.0, #of all rollers, 2 x thickness
+    'roller_width': 25.0,
+    'length': 160.0, #of the blank
+    'die_spacing': 64.0, #between die rollers, 2 x (3 x thickness + 2)
+    'width': 20.0, #of the blank
+    'clearance': 0.0, #between rollers and blank
+    }
+
+def roller_positions(g):
+    '''
+    Returns the centres of the plunger and die rollers.
+    '''
+    r, t, c = g['roller_radius'], g['thickness'], g['clearance']
+    half_spacing = g['die_spacing']/2 + r
+    return [(0.0, r + t/2 + c, 0.0), (-half_spacing, -(r + t/2 + c), 0.0), (half_spacing, -(r + t/2 + c), 0.0)]
+
+def _roller(centre, g, seed):
+    '''
+    Returns the block of points of a ring of one element through its thickness at the outside of a roller.
+    '''
+    r, w = g['roller_radius'], g['roller_width']
+    theta = np.linspace(0, 2*np.pi, divisions(2*np.pi*r, seed, 4) + 1)[:, None, None]
+    radius = np.array([r - min(seed, r/4), r])[None, :, None]
+    z = segments([-w/2, w/2], seed)[None, None, :]
+    x, y = centre[0] + radius*np.cos(theta), centre[1] + radius*np.sin(theta)
+    return np.stack(np.broadcast_arrays(x, y, z + 0*x), axis=-1)
+
+def plastic_mesh(seed=2.0, **geometry):
+    '''
+    Meshes the blank and rollers with C3D8 elements of nominal length seed, with keyword arguments overriding values of GEOMETRY. Returns nodal coordinates, element connectivity, and dictionaries of node sets, element sets and surfaces (see write_mesh).
+    '''
+    g = dict(GEOMETRY)
+    g.update(geometry)
+    l, t, b = g['length'], g['thickness'], g['width']
+    x, y, z = segments([-l/2, 0, l/2], seed), np.linspace(-t/2, t/2, divisions(t, seed, 2) + 1), segments([-b/2, 0, b/2], seed)
+    blank = np.stack(np.meshgrid(x, y, z, indexing='ij'), axis=-1)
+
+    #each body is merged separately, as rollers touch the blank
+    bodies = [merge_blocks([blank])] + [merge_blocks([_roller(c, g, seed)]) for c in roller_positions(g)]
+    coordinates, connectivity, node_ranges, element_ranges = [], [], [], []
+    n_nodes = n_elements = 0
+    for co, conn in bodies:
+        coordinates.append(co)
+        connectivity.append(conn + n_nodes)
+        node_ranges.append(np.arange(n_nodes + 1, n_nodes + len(co) + 1))
+        element_ranges.append(np.arange(n_elements + 1, n_elements + len(conn) + 1))
+        n_nodes, n_elements = n_nodes + len(co), n_elements + len(conn)
+    coordinates, connectivity = np.concatenate(coordinates), np.concatenate(connectivity)
+
+    tol = 1e-6*l
+    blank_nodes = node_ranges[0]
+    blank_co = coordinates[blank_nodes - 1]
+    nsets = {'all': blank_nodes, 'xy_midplane': blank_nodes[np.abs(blank_co[:, 2]) < tol],
+        'yz_midplane': blank_nodes[np.abs(blank_co[:, 0]) < tol]}
+    for i in range(3):
+        nsets['roller%i'%(i+1)] = node_ranges[i+1]
+    elsets = {'all': element_ranges[0], 'rollers': np.concatenate(element_ranges[1:])}
+
+    in_blank = np.zeros(len(coordinates), dtype=bool)
+    in_blank[blank_nodes - 1] = True
+    surfaces = {'TOP': element_faces(coordinates, connectivity, lambda c: in_blank & (np.abs(c[:, 1] - t/2) < tol)),
+        'BOTTOM': element_faces(coordinates, connectivity, lambda c: in_blank & (np.abs(c[:, 1] + t/2) < tol))}
+    for i, centre in enumerate(roller_positions(g)):
+        in_roller = np.zeros(len(coordinates), dtype=bool)
+        in_roller[node_ranges[i+1] - 1] = True
+        outside = lambda c: in_roller & (np.abs(np.hypot(c[:, 0] - centre[0], c[:, 1] - centre[1]) - g['roller_radius']) < tol)
+        surfaces['R%i_SURF'%(i+1)] = element_faces(coordinates, connectivity, outside)
+    return coordinates, connectivity, nsets, elsets, surfaces
+
+def build_mesh_plastic(file_name, seed=2.0, **geometry):
+    '''
+    Meshes the blank and rollers (see plastic_mesh) and writes them to file_name, returning the number of nodes and elements.
+    '''
+    coordinates, connectivity, nsets, elsets, surfaces = plastic_mesh(seed, **geometry)
+    write_mesh(file_name, coordinates, connectivity, nsets, 'C3D8', elsets, surfaces, \
+        heading='U-bend blank and rollers generated by build_mesh_plastic.py')
+    return len(coordinates), len(connectivity)
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Mesh the blank and rollers of the plastically bent U-bend with structured hexahedra, without ABAQUS.')
+    parser.add_argument('-s', '--seed', type=float, default=2.0, help='nominal element length (mm)')
+    parser.add_argument('-o', '--output', default='U_plastic_mesh_only_ccx.inp', help='mesh input deck to write')
+    for k, v in GEOMETRY.items():
+        parser.add_argument('--' + k.replace('_', '-'), type=float, default=v, help='(mm)')
+    args = parser.parse_args()
+
+    n_nodes, n_elements = build_mesh_plastic(args.output, args.seed, **dict([(k, getattr(args, k)) for k in GEOMETRY]))
+    print('Wrote %s with %i nodes and %i elements.'%(args.output, n_nodes, n_elements))
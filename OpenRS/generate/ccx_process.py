@@ -0,0 +1,192 @@
+'''
+Runs CalculiX as a child process, streaming its standard output to follow the progress of the solution. The number and time period of steps are read from the input deck, and the step, increment, iteration and time reported by CalculiX are parsed as they are printed, so that progress can be reported as a percentage of the total step time of the deck. A run can be cancelled at any point, which kills CalculiX along with any processes it has started.
+(c) M. J. Roy 2021
+'''
+
+import os
+import re
+import sys
+import signal
+import queue
+import threading
+import subprocess as subproc
+from OpenRS.generate.solver_config import solver_env
+
+STEP_LINE = re.compile(r'^\s*STEP\s+(\d+)\s*$')
+INCREMENT_LINE = re.compile(r'^\s*increment\s+(\d+)\s+attempt\s+(\d+)')
+STEP_TIME_LINE = re.compile(r'^\s*actual step time\s*=\s*(\S+)')
+RESTART_READ_LINE = re.compile(r'^\s*\*restart\s*,\s*read.*step\s*=\s*(\d+)', re.IGNORECASE)
+ITERATION_LINE = re.compile(r'^\s*iteration\s+(\d+)')
+
+class CcxCancelled(RuntimeError):
+    '''
+    Raised when a CalculiX run is cancelled.
+    '''
+    pass
+
+def deck_step_periods(inp_file):
+    '''
+    Returns a list of the time period of each step of the CalculiX input deck inp_file, being 1.0 where not specified on the data line of *STATIC (or other procedures with the period as the second value). The steps a restart deck (*RESTART, READ, STEP=n) continues from are given periods of 0, as CalculiX carries on their numbering.
+    '''
+    periods = []
+    procedure = False
+    with open(inp_file) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('**'):
+                continue
+            keyword = line.lower()
+            if keyword.startswith('*step'):
+                periods.append(1.0)
+                procedure = False
+            elif keyword.startswith('*restart') and RESTART_READ_LINE.match(line) is not None:
+                periods.extend([0.0]*int(RESTART_READ_LINE.match(line).group(1)))
+            elif keyword.startswith('*static') or keyword.startswith('*visco') or keyword.startswith('*dynamic') or keyword.startswith('*heat transfer'):
+                procedure = bool(periods)
+            elif line.startswith('*'):
+                procedure = False
+            elif procedure:
+                #data line of the procedure: initial increment, time period, ...
+                values = [v.strip() for v in line.split(',')]
+                if len(values) > 1 and values[1]:
+                    periods[-1] = float(values[1])
+                procedure = False
+    return periods
+
+def new_progress(periods):
+    '''
+    Returns the state followed by parse_progress for a deck with steps of the given time periods.
+    '''
+    return {'step': 0, 'increment': 0, 'attempt': 0, 'iteration': 0, 'step_time': 0.0, 'pending_time': 0.0,
+        'periods': list(periods) or [1.0], 'percent': 0, 'finished': False}
+
+def parse_progress(line, state):
+    '''
+    Updates state (see new_progress) from a line of CalculiX output. The step time of an increment is counted once it has converged, with linear steps counted as complete when the next step starts or the job finishes. Returns True if the state changed.
+    '''
+    step, increment = STEP_LINE.match(line), INCREMENT_LINE.match(line)
+    step_time, iteration = STEP_TIME_LINE.match(line), ITERATION_LINE.match(line)
+    if step is not None:
+        state['step'] = int(step.group(1))
+        state['increment'], state['attempt'], state['iteration'] = 0, 0, 0
+        state['step_time'] = state['pending_time'] = 0.0
+    elif increment is not None:
+        state['increment'], state['attempt'], state['iteration'] = int(increment.group(1)), int(increment.group(2)), 0
+    elif step_time is not None:
+        state['pending_time'] = float(step_time.group(1))
+        return False
+    elif iteration is not None:
+        state['iteration'] = int(iteration.group(1))
+    elif line.strip() == 'convergence':
+        state['step_time'] = state['pending_time']
+    elif line.strip() == 'Job finished':
+        state['finished'] = True
+    else:
+        return False
+    _update_percent(state)
+    return True
+
+def _update_percent(state):
+    '''
+    Sets the percentage of the total step time of the deck completed, with earlier steps complete.
+    '''
+    periods = state['periods']
+    if state['finished']:
+        state['percent'] = 100
+    else:
+        step = min(max(state['step'], 1), len(periods))
+        done = sum(periods[:step-1]) + min(state['step_time'], periods[step-1])
+        state['percent'] = min(99, int(100*done/sum(periods)))
+
+def progress_message(state):
+    '''
+    Returns a short description of state, i.e. for a progress bar.
+    '''
+    if state['finished']:
+        return 'Solved'
+    if state['increment']:
+        return 'Step %i, increment %i, iteration %i'%(state['step'], state['increment'], state['iteration'])
+    if state['step']:
+        return 'Step %i'%state['step']
+    return 'Starting'
+
+def kill_tree(proc):
+    '''
+    Kills the process proc and any processes it has started.
+    '''
+    if proc.poll() is not None:
+        return
+    if sys.platform == 'win32':
+        subproc.call(['taskkill', '/F', '/T', '/PID', str(proc.pid)], stdout=subproc.DEVNULL, stderr=subproc.DEVNULL)
+    else:
+        try:
+            os.killpg(proc.pid, signal.SIGKILL) #started in its own session, see run_ccx
+        except OSError:
+            proc.kill()
+    proc.wait()
+
+def _read_lines(stream, lines):
+    for line in iter(stream.readline, ''):
+        lines.put(line)
+    stream.close()
+    lines.put(None)
+
+def run_ccx(ccx_exe, inp_file, work_dir=None, binary=False, progress=None, cancel=None, log_file=None, poll=0.1, threads=None):
+    '''
+    Runs CalculiX on inp_file in work_dir (that of inp_file if None), streaming its output.
+    progress - callable receiving the state of parse_progress whenever it changes
+    cancel - object with an is_set() method (i.e. threading.Event) polled while CalculiX runs; CalculiX is killed and CcxCancelled raised once it is set
+    log_file - file that all output is written to, none if None
+    threads - number of threads CalculiX uses (see solver_config.solver_env), as per the environment if None
+    Raises RuntimeError if CalculiX cannot be started or exits with an error. Returns the final progress state.
+    '''
+    if work_dir is None:
+        work_dir = os.path.dirname(os.path.abspath(inp_file))
+    job = os.path.splitext(os.path.basename(inp_file))[0]
+    args = [ccx_exe, '-i', job]
+    if binary:
+        args += ['-o', 'bin']
+
+    state = new_progress(deck_step_periods(os.path.join(work_dir, job + '.inp')))
+    kwargs = {'creationflags': subproc.CREATE_NEW_PROCESS_GROUP} if sys.platform == 'win32' else {'start_new_session': True}
+    try:
+        proc = subproc.Popen(args, cwd=work_dir, env=solver_env(threads), stdout=subproc.PIPE, stderr=subproc.STDOUT,
+            universal_newlines=True, bufsize=1, **kwargs)
+    except OSError as e:
+        raise RuntimeError('CalculiX job %s could not be started with %s: %s'%(job, ' '.join(args), e))
+
+    #read output on another thread, so that cancel is polled even if CalculiX is silent
+    lines = queue.Queue()
+    reader = threading.Thread(target=_read_lines, args=(proc.stdout, lines), daemon=True)
+    reader.start()
+    log = open(log_file, 'w') if log_file is not None else None
+    try:
+        while True:
+            if cancel is not None and cancel.is_set():
+                kill_tree(proc)
+                raise CcxCancelled('CalculiX job %s cancelled.'%job)
+            try:
+                line = lines.get(timeout=poll)
+            except queue.Empty:
+                if proc.poll() is not None:
+                    break #exited, with output held open by a process it started
+                continue
+            if line is None:
+                break
+            if log is not None:
+                log.write(line)
+            if parse_progress(line, state) and progress is not None:
+                progress(state)
+        proc.wait()
+    finally:
+        if log is not None:
+            log.close()
+        kill_tree(proc) #only if still running, i.e. on an exception
+
+    if proc.returncode != 0:
+        raise RuntimeError('CalculiX job %s failed with exit code %i.'%(job, proc.returncode))
+    if not state['finished']:
+        state['finished'], state['percent'] = True, 100
+        if progress is not None:
+            progress(state)
+    return state
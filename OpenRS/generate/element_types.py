@@ -0,0 +1,78 @@
+'''
+Translation of CalculiX (*.frd) and ABAQUS element types to VTK cell types, including the reordering of nodes of quadratic elements, shared between frd_access.py and odb_access*.py.
+NB: this module is imported by ABAQUS Python scripts, and therefore needs to remain Python 2.7 compatible.
+(c) M. J. Roy 2021
+'''
+import re
+import numpy as np
+
+#frd element type number: (name, number of nodes, VTK cell type, frd to VTK node order or None if identical)
+FRD_ELEMENTS = {
+    1: ('C3D8', 8, 12, None),
+    2: ('C3D6', 6, 13, None),
+    3: ('C3D4', 4, 10, None),
+    4: ('C3D20', 20, 25, [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 16, 17, 18, 19, 12, 13, 14, 15]),
+    5: ('C3D15', 15, 26, [0, 1, 2, 3, 4, 5, 6, 7, 8, 12, 13, 14, 9, 10, 11]),
+    6: ('C3D10', 10, 24, None),
+    7: ('S3', 3, 5, None),
+    8: ('S6', 6, 22, None),
+    9: ('S4', 4, 9, None),
+    10: ('S8', 8, 23, None),
+    11: ('B31', 2, 3, None),
+    12: ('B32', 3, 21, None),
+    }
+
+#ABAQUS/CalculiX input deck element family: (number of nodes, VTK cell type, node order). Node ordering of continuum elements in ABAQUS matches VTK.
+ABAQUS_ELEMENTS = {
+    'C3D8': (8, 12, None),
+    'C3D6': (6, 13, None),
+    'C3D4': (4, 10, None),
+    'C3D20': (20, 25, None),
+    'C3D15': (15, 26, None),
+    'C3D10': (10, 24, None),
+    }
+
+def abaqus_family(name):
+    '''
+    Returns the element family of an ABAQUS element type name by removing formulation suffixes, i.e. 'C3D20R' -> 'C3D20', 'C3D10M' -> 'C3D10'.
+    '''
+    m = re.match(r'^(C3D\d+)', name.upper())
+    if m is None or m.group(1) not in ABAQUS_ELEMENTS:
+        raise ValueError('Element type %s is not supported.'%name)
+    return m.group(1)
+
+def nodes_per_element(types, table):
+    '''
+    Returns the number of nodes of each element according to its type (a key of table).
+    '''
+    types = np.asarray(types)
+    n = np.zeros(len(types), dtype=np.int64)
+    for key in np.unique(types):
+        n[types == key] = table[key][-3]
+    return n
+
+def to_vtk_cells(types, connectivity, table=FRD_ELEMENTS):
+    '''
+    Translates element definitions to VTK cells in a single, vectorised pass per element type present.
+    types - type of each element, as a key of table (i.e. frd type numbers for FRD_ELEMENTS or families from abaqus_family for ABAQUS_ELEMENTS)
+    connectivity - flat array of node numbers of all elements, in element order
+    Returns the reordered connectivity, offsets (end of each cell in connectivity) and VTK cell types.
+    '''
+    types = np.asarray(types)
+    connectivity = np.asarray(connectivity)
+    n = nodes_per_element(types, table)
+    offsets = np.cumsum(n)
+    if offsets[-1] != len(connectivity):
+        raise ValueError('Element connectivity does not match element types.')
+    starts = offsets - n
+
+    out = connectivity.copy()
+    cell_types = np.zeros(len(types), dtype=np.uint8)
+    for key in np.unique(types):
+        mask = types == key
+        n_nodes, vtk_type, order = table[key][-3:]
+        cell_types[mask] = vtk_type
+        if order is not None:
+            s = starts[mask].reshape(-1, 1)
+            out[s + np.arange(n_nodes)] = connectivity[s + np.asarray(order)]
+    return out, offsets, cell_types
@@ -0,0 +1,123 @@
+'''
+Extrapolation of integration point values (i.e. stresses printed with *el print) to element nodes, and averaging of element nodal values onto points. Extrapolation matrices are built from the linear shape functions of each element evaluated at its integration points, and are applied to all elements of the same type and integration scheme as a single matrix product. Cells and node ordering follow VTK (as returned by element_types.to_vtk_cells).
+NB: this module is imported by ABAQUS Python scripts, and therefore needs to remain Python 2.7 compatible.
+(c) M. J. Roy 2021
+'''
+import numpy as np
+
+#natural coordinates of corner nodes
+HEX_CORNERS = np.array([[-1, -1, -1], [1, -1, -1], [1, 1, -1], [-1, 1, -1],
+    [-1, -1, 1], [1, -1, 1], [1, 1, 1], [-1, 1, 1]], dtype=np.float64)
+
+def _hex_linear(p):
+    return np.prod(1 + p[:, None, :]*HEX_CORNERS[None, :, :], axis=2)/8.
+
+def _tet_linear(p):
+    return np.column_stack((1 - p.sum(axis=1), p))
+
+def _gauss_hex(g):
+    #xi varies fastest, then eta, then zeta, as per CalculiX and ABAQUS
+    g = np.asarray(g, dtype=np.float64)
+    n = len(g)
+    return np.column_stack((np.tile(g, n*n), np.tile(np.repeat(g, n), n), np.repeat(g, n*n)))
+
+_TET_A, _TET_B = 0.138196601125011, 0.585410196624968
+
+#element shape: (linear shape functions, {number of integration points: natural coordinates})
+SHAPES = {
+    'hex': (_hex_linear, {
+        1: np.zeros((1, 3)),
+        8: _gauss_hex([-1/np.sqrt(3.), 1/np.sqrt(3.)]),
+        27: _gauss_hex([-np.sqrt(0.6), 0., np.sqrt(0.6)]),
+        }),
+    'tet': (_tet_linear, {
+        1: np.array([[0.25, 0.25, 0.25]]),
+        4: np.array([[_TET_A, _TET_A, _TET_A], [_TET_B, _TET_A, _TET_A], [_TET_A, _TET_B, _TET_A], [_TET_A, _TET_A, _TET_B]]),
+        }),
+    }
+
+#VTK cell type: (element shape, corner node pairs of each midside node or None if linear)
+CELL_SHAPES = {
+    12: ('hex', None),
+    25: ('hex', [(0, 1), (1, 2), (2, 3), (3, 0), (4, 5), (5, 6), (6, 7), (7, 4), (0, 4), (1, 5), (2, 6), (3, 7)]),
+    10: ('tet', None),
+    24: ('tet', [(0, 1), (1, 2), (2, 0), (0, 3), (1, 3), (2, 3)]),
+    }
+
+_MATRICES = {}
+
+def extrapolation_matrix(cell_type, n_ip):
+    '''
+    Returns the (number of nodes) x n_ip matrix which extrapolates integration point values of a VTK cell_type to its nodes. Corner values are found by inverting the linear shape functions evaluated at the integration points (a least squares fit for the 27 point scheme, a constant for single point schemes), and midside values are the mean of the adjacent corners.
+    '''
+    key = (cell_type, n_ip)
+    if key not in _MATRICES:
+        if cell_type not in CELL_SHAPES or n_ip not in SHAPES[CELL_SHAPES[cell_type][0]][1]:
+            raise ValueError('Extrapolation of %i integration points of VTK cell type %i is not supported.'%(n_ip, cell_type))
+        shape, midside = CELL_SHAPES[cell_type]
+        linear, points = SHAPES[shape]
+        E = np.linalg.pinv(linear(points[n_ip]))
+        if midside is not None:
+            E = np.vstack([E] + [0.5*(E[a] + E[b]) for a, b in midside])
+        _MATRICES[key] = E
+    return _MATRICES[key]
+
+def extrapolate(cell_types, offsets, cells, values):
+    '''
+    Extrapolates integration point values to the nodes of each cell.
+    cell_types, offsets - VTK cell types and connectivity offsets of all cells, as per element_types.to_vtk_cells
+    cells - 0-based index of the cell of each integration point, ordered by integration point number within each cell
+    values - array with one row of M components per integration point
+    Returns an array of len(connectivity) x M element nodal values aligned with the connectivity, which are zero for cells without integration point values, and a boolean array of which cells had values.
+    '''
+    cell_types = np.asarray(cell_types)
+    offsets = np.asarray(offsets)
+    cells = np.asarray(cells, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float64)
+    n_cells = len(cell_types)
+    n_comp = values.shape[1]
+
+    #group integration points by cell, preserving their order
+    if np.any(np.diff(cells) < 0):
+        order = np.argsort(cells, kind='mergesort')
+        values = values[order]
+    n_ip = np.bincount(cells, minlength=n_cells)
+    ip_starts = np.cumsum(n_ip) - n_ip
+    sizes = np.diff(np.concatenate(([0], offsets)))
+    starts = offsets - sizes
+
+    out = np.zeros((offsets[-1], n_comp))
+    has_data = n_ip > 0
+    key = cell_types.astype(np.int64)*1000 + n_ip
+    for k in np.unique(key[has_data]):
+        mask = key == k
+        E = extrapolation_matrix(int(k//1000), int(k%1000))
+        n_nodes, n = E.shape
+        homogeneous = mask.all()
+        if homogeneous:
+            v = values.reshape(n_cells, n, n_comp)
+        else:
+            v = values[ip_starts[mask][:, None] + np.arange(n)] #cells x n x M
+        #single matrix product over all cells and components
+        nodal = np.dot(E, v.transpose(1, 0, 2).reshape(n, -1)).reshape(n_nodes, -1, n_comp).transpose(1, 0, 2)
+        if homogeneous:
+            out.reshape(n_cells, n_nodes, n_comp)[:] = nodal
+        else:
+            out[starts[mask][:, None] + np.arange(n_nodes)] = nodal
+    return out, has_data
+
+def average_to_points(connectivity, values, n_points, valid=None):
+    '''
+    Averages element nodal values (one row per entry of connectivity) onto n_points points. Entries where valid is False are excluded; points without any contribution are zero.
+    '''
+    connectivity = np.asarray(connectivity, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float64)
+    if valid is not None:
+        connectivity, values = connectivity[valid], values[valid]
+    count = np.bincount(connectivity, minlength=n_points)
+    out = np.zeros((n_points, values.shape[1]))
+    for j in range(values.shape[1]):
+        out[:, j] = np.bincount(connectivity, weights=values[:, j], minlength=n_points)
+    hit = count > 0
+    out[hit] /= count[hit][:, None]
+    return out
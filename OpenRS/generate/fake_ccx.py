@@ -0,0 +1,405 @@
+'''
+Stand-in for the CalculiX executable, so that deck assembly, result parsing and the job flow of the GUI can be run and benchmarked without a solver. It is called in the same way as CalculiX (`-i <job>`, optionally `-o bin`) and, after printing progress in the form CalculiX does over a configurable delay, either:
+1) replays recorded results, copying <prefix>.frd and <prefix>.dat of a previous CalculiX run to <job>.frd and <job>.dat, or
+2) synthesizes results for the nodes, elements, node sets and steps of <job>.inp, with displacements and stresses that are smooth functions of position scaled by the largest displacement boundary condition of each step, so that results are proportional to the applied load as for a linear elastic model. If the deck holds no mesh, or a number of elements is specified, a structured block of 20 node hexahedra of (approximately) that many elements replaces it, i.e. for benchmarking with large models.
+*.frd files are written in ascii or binary (-o bin) form as per CalculiX, and *node print/*el print output is written to *.dat. Converged increments are listed in <job>.sta. If any step writes restart data (*RESTART, WRITE), the model is written to <job>.rout along with the number of steps completed, and a deck starting with *RESTART, READ takes its model from <job>.rin, continuing the step numbering of the run it was written by.
+Options are given on the command line or as environment variables (see OPTIONS), which is how they pass through packager_ccx.run_packager_ccx and the GUI. As these expect a single executable, `python -m OpenRS.generate.fake_ccx --install <directory>` writes a launcher to use as the CalculiX executable, with any options given fixed in it.
+(c) M. J. Roy 2021
+'''
+
+import os
+import re
+import sys
+import time
+import shutil
+import numpy as np
+from OpenRS.generate.element_types import FRD_ELEMENTS, abaqus_family
+
+#command line option: (environment variable, type, default, help)
+OPTIONS = {
+    'replay': ('FAKE_CCX_REPLAY', str, '', 'prefix of recorded *.frd/*.dat results to replay, rather than synthesizing them'),
+    'elements': ('FAKE_CCX_ELEMENTS', int, 0, 'synthesize results on a structured mesh of this many elements rather than that of the deck'),
+    'delay': ('FAKE_CCX_DELAY', float, 0.0, 'seconds taken by each step'),
+    'increments': ('FAKE_CCX_INCREMENTS', int, 1, 'increments reported per step'),
+    'fail': ('FAKE_CCX_FAIL', int, 0, 'exit with this code rather than writing results'),
+    }
+
+#frd element type number of each ABAQUS/CalculiX element family
+FRD_TYPES = {'C3D8': 1, 'C3D6': 2, 'C3D4': 3, 'C3D20': 4, 'C3D15': 5, 'C3D10': 6}
+
+#last line of a *.rout file written by write_restart
+RESTART_MARK = re.compile(r'^\*\* fake_ccx steps completed: (\d+)\s*$', re.MULTILINE)
+
+#integration points of each element type for *el print, ordered as per CalculiX
+INTEGRATION_POINTS = {'C3D8': 8, 'C3D8R': 1, 'C3D6': 2, 'C3D4': 1, 'C3D20': 27, 'C3D20R': 8, 'C3D15': 9, 'C3D10': 4}
+
+def _keyword(line):
+    '''
+    Returns the keyword of a deck line in lower case and a dictionary of its parameters, i.e. ('*element', {'type': 'C3D20R', 'elset': 'ALL'}).
+    '''
+    parts = [p.strip() for p in line.split(',')]
+    params = {}
+    for p in parts[1:]:
+        if p:
+            k, _, v = p.partition('=')
+            params[k.strip().lower()] = v.strip()
+    return parts[0].lower(), params
+
+def read_deck(inp_file):
+    '''
+    Reads the parts of a CalculiX input deck needed to synthesize results. Returns a dictionary of:
+    'node_labels' and 'coordinates' - node numbers and Nx3 coordinates
+    'element_labels', 'element_types' and 'connectivity' - element numbers, type names (i.e. 'C3D20R') and node numbers of each element in deck order
+    'nsets' - dictionary of upper case node set name to node numbers
+    'steps' - list of dictionaries, one per step, of the 'load' (largest absolute displacement boundary condition), the 'node_print' and 'el_print' set names, and whether it writes 'restart' data
+    inp_file may also be a list of the lines of a deck.
+    '''
+    if isinstance(inp_file, str):
+        with open(inp_file) as f:
+            return read_deck(f.readlines())
+    nodes, elements, nsets, steps = [], [], {}, []
+    mode, params, current = None, {}, []
+    for raw in inp_file:
+        line = raw.strip()
+        if not line or line.startswith('**'):
+            continue
+        if line.startswith('*'):
+            keyword, params = _keyword(line)
+            mode = keyword
+            if keyword == '*nset':
+                current = nsets.setdefault(params.get('nset', '').upper(), [])
+            elif keyword == '*step':
+                steps.append({'load': 0.0, 'node_print': [], 'el_print': [], 'restart': False})
+            elif keyword == '*restart' and 'write' in params and steps:
+                steps[-1]['restart'] = True
+            elif keyword == '*node print' and steps:
+                steps[-1]['node_print'].append(params.get('nset', '').upper())
+            elif keyword == '*el print' and steps:
+                steps[-1]['el_print'].append(params.get('elset', '').upper())
+            continue
+
+        values = [v.strip() for v in line.rstrip(',').split(',')]
+        if mode == '*node':
+            nodes.append([float(v) for v in values[:4]])
+        elif mode == '*element':
+            if elements and len(elements[-1][2]) < _element_nodes(elements[-1][1]):
+                elements[-1][2].extend([int(v) for v in values if v]) #continuation line
+            else:
+                elements.append((int(values[0]), params.get('type', '').upper(), [int(v) for v in values[1:] if v]))
+        elif mode == '*nset':
+            if params.get('generate') is not None:
+                start, stop, inc = [int(v) for v in values[:3]] + [1]*(3-len(values[:3]))
+                current.extend(range(start, stop+1, inc))
+            else:
+                current.extend([int(v) for v in values if v and v.lstrip('-').isdigit()])
+        elif mode == '*boundary' and steps and len(values) > 3 and values[3]:
+            steps[-1]['load'] = max(steps[-1]['load'], abs(float(values[3])))
+
+    node_array = np.array(nodes, dtype=np.float64).reshape(-1, 4)
+    return {'node_labels': node_array[:, 0].astype(np.int64), 'coordinates': node_array[:, 1:],
+        'element_labels': np.array([e[0] for e in elements], dtype=np.int64),
+        'element_types': [e[1] for e in elements], 'connectivity': [e[2] for e in elements],
+        'nsets': dict([(k, np.array(v, dtype=np.int64)) for k, v in nsets.items()]), 'steps': steps}
+
+def _element_nodes(name):
+    return FRD_ELEMENTS[FRD_TYPES[abaqus_family(name)]][1]
+
+def structured_mesh(n_elements, size=(80.0, 20.0, 10.0)):
+    '''
+    Returns a block of C3D20R elements of the given size, divided into approximately n_elements, in the form of read_deck (without steps). Node sets of the faces normal to x (LEFT, RIGHT), mid-plane normal to z (MIDPLANE_XY), the four fiducial datums at the ends of the x faces (LEFT_LOWER_DATUM etc.) and ALL are defined.
+    '''
+    #divisions in proportion to size
+    size = np.asarray(size, dtype=np.float64)
+    scale = (max(n_elements, 1)/np.prod(size))**(1.0/3)
+    nx, ny, nz = [max(1, int(round(s*scale))) for s in size]
+    nz += nz % 2 #mid-plane on nodes
+
+    #corner and mid-side nodes on a grid of twice the divisions; cell centres and face centres aren't nodes of 20 node hexahedra
+    gx, gy, gz = 2*nx+1, 2*ny+1, 2*nz+1
+    i, j, k = np.meshgrid(np.arange(gx), np.arange(gy), np.arange(gz), indexing='ij')
+    used = ((i % 2) + (j % 2) + (k % 2)) <= 1
+    grid = np.zeros((gx, gy, gz), dtype=np.int64)
+    grid[used] = np.arange(1, used.sum()+1)
+    coordinates = np.column_stack((i[used]*size[0]/(gx-1) - size[0]/2, j[used]*size[1]/(gy-1), k[used]*size[2]/(gz-1) - size[2]/2))
+
+    #C3D20 node order: corners of bottom then top face, mid-sides of bottom, top, then vertical edges
+    corners = [(0,0,0), (2,0,0), (2,2,0), (0,2,0), (0,0,2), (2,0,2), (2,2,2), (0,2,2)]
+    mids = [(1,0,0), (2,1,0), (1,2,0), (0,1,0), (1,0,2), (2,1,2), (1,2,2), (0,1,2), (0,0,1), (2,0,1), (2,2,1), (0,2,1)]
+    ei, ej, ek = np.meshgrid(2*np.arange(nx), 2*np.arange(ny), 2*np.arange(nz), indexing='ij')
+    connectivity = np.column_stack([grid[ei.ravel()+a, ej.ravel()+b, ek.ravel()+c] for a, b, c in corners + mids])
+
+    labels = grid[used]
+    x, y, z = coordinates.T
+    datum = lambda xi, yi: grid[xi, yi, nz:nz+1]
+    nsets = {'LEFT': labels[x == x.min()], 'RIGHT': labels[x == x.max()], 'MIDPLANE_XY': labels[np.isclose(z, 0)],
+        'LEFT_LOWER_DATUM': datum(0, 0), 'LEFT_UPPER_DATUM': datum(0, gy-1),
+        'RIGHT_UPPER_DATUM': datum(gx-1, gy-1), 'RIGHT_LOWER_DATUM': datum(gx-1, 0), 'ALL': labels}
+    return {'node_labels': labels, 'coordinates': coordinates,
+        'element_labels': np.arange(1, len(connectivity)+1), 'element_types': ['C3D20R']*len(connectivity),
+        'connectivity': list(connectivity), 'nsets': nsets}
+
+def synthetic_fields(coordinates, load):
+    '''
+    Returns Nx3 displacements and Nx6 stresses (SXX, SYY, SZZ, SXY, SYZ, SZX) at coordinates, proportional to load. Displacements in x are load and -load at the ends of the x extent, as per the boundary conditions of packager_ccx.step_details.
+    '''
+    lo, hi = coordinates.min(axis=0), coordinates.max(axis=0)
+    span = np.where(hi > lo, hi - lo, 1.0)
+    xn, yn, zn = ((coordinates - lo)/span).T
+    displacement = load*np.column_stack((1 - 2*xn, 0.5*(xn - 0.5)**2, np.zeros(len(xn))))
+    stress = load*np.column_stack((400*(0.5 - yn)*np.cos(np.pi*(xn - 0.5)), 50*(yn - 0.5), 20*(zn - 0.5), 30*np.sin(np.pi*xn), np.zeros(len(xn)), 5*(zn - 0.5)))
+    return displacement, stress
+
+def _frd_elements(mesh):
+    '''
+    Returns frd type numbers and connectivity in frd node order of each element of mesh, grouped by type.
+    '''
+    families = np.array([FRD_TYPES[abaqus_family(t)] for t in mesh['element_types']])
+    groups = []
+    for frd_type in np.unique(families):
+        index = np.nonzero(families == frd_type)[0]
+        connectivity = np.array([mesh['connectivity'][i] for i in index], dtype=np.int64)
+        order = FRD_ELEMENTS[frd_type][3]
+        if order is not None:
+            #frd to vtk (= input deck) order is connectivity_vtk[:, i] = connectivity_frd[:, order[i]]
+            frd = np.empty_like(connectivity)
+            frd[:, order] = connectivity
+            connectivity = frd
+        groups.append((frd_type, mesh['element_labels'][index], connectivity))
+    return groups
+
+def write_frd(frd_file, mesh, results, binary=False):
+    '''
+    Writes the mesh and results, a list of (load, displacement, stress) per step, to frd_file in the ascii or binary form written by CalculiX.
+    '''
+    n = len(mesh['node_labels'])
+    n_elements = len(mesh['element_labels'])
+    fmt = 2 if binary else 1
+    with open(frd_file, 'wb') as f:
+        f.write(b'    1C\n    1UUSER\n')
+        #binary node coordinates are double precision, flagged 3
+        f.write(('    2C%18s%12d%37s%1d\n'%('', n, '', 3 if binary else fmt)).encode())
+        if binary:
+            rec = np.zeros(n, dtype=[('n', '<i4'), ('x', '<f8', (3,))])
+            rec['n'], rec['x'] = mesh['node_labels'], mesh['coordinates']
+            f.write(rec.tobytes())
+        else:
+            np.savetxt(f, np.column_stack((mesh['node_labels'], mesh['coordinates'])), fmt=' -1%10d%12.5E%12.5E%12.5E')
+            f.write(b' -3\n')
+
+        f.write(('    3C%18s%12d%37s%1d\n'%('', n_elements, '', fmt)).encode())
+        for frd_type, labels, connectivity in _frd_elements(mesh):
+            m = connectivity.shape[1]
+            if binary:
+                rec = np.zeros((len(labels), 4 + m), dtype='<i4')
+                rec[:, 0], rec[:, 1], rec[:, 3], rec[:, 4:] = labels, frd_type, 1, connectivity
+                f.write(rec.tobytes())
+            else:
+                #element definition then up to 10 nodes per record
+                row = ' -1%10d%5d%5d%5d' + ''.join(['\n -2' + '%10d'*min(10, m-s) for s in range(0, m, 10)])
+                np.savetxt(f, np.column_stack((labels, np.full(len(labels), frd_type), np.zeros(len(labels)), np.ones(len(labels)), connectivity)), fmt=row)
+        if not binary:
+            f.write(b' -3\n')
+
+        for step, (load, displacement, stress) in enumerate(results):
+            for block, name, components, values in [(1, 'DISP', ['D1', 'D2', 'D3', 'ALL'], displacement), \
+                    (2, 'STRESS', ['SXX', 'SYY', 'SZZ', 'SXY', 'SYZ', 'SZX'], stress)]:
+                f.write(('    1PSTEP%25d%12d%12d\n'%(2*step+block, 1, step+1)).encode())
+                f.write(('  100CL  %3d%12.5E%12d%20s%2d%5d%10s%2d\n'%(100+block, 1.0, n, '', 0, step+1, '', fmt)).encode())
+                f.write((' -4  %-8s%4d    1\n'%(name, values.shape[1] + (1 if name == 'DISP' else 0))).encode())
+                for c, component in enumerate(components):
+                    if component == 'ALL':
+                        f.write(b' -5  ALL         1    2    0    0    1ALL\n')
+                    elif name == 'DISP':
+                        f.write((' -5  %-8s    1    2%5d    0\n'%(component, c+1)).encode())
+                    else:
+                        a, b = [(1,1), (2,2), (3,3), (1,2), (2,3), (3,1)][c]
+                        f.write((' -5  %-8s    1    4%5d%5d\n'%(component, a, b)).encode())
+                if binary:
+                    rec = np.zeros(n, dtype=[('n', '<i4'), ('v', '<f4', (values.shape[1],))])
+                    rec['n'], rec['v'] = mesh['node_labels'], values
+                    f.write(rec.tobytes())
+                else:
+                    np.savetxt(f, np.column_stack((mesh['node_labels'], values)), fmt=' -1%10d' + '%12.5E'*values.shape[1])
+                    f.write(b' -3\n')
+        f.write(b' 9999\n')
+
+def write_dat(dat_file, mesh, steps, results):
+    '''
+    Writes *node print displacements of node sets and *el print stresses at integration points (taken as those at element centroids) of each step to dat_file, in the form written by CalculiX.
+    '''
+    node_index = np.zeros(mesh['node_labels'].max()+1, dtype=np.int64)
+    node_index[mesh['node_labels']] = np.arange(len(mesh['node_labels']))
+    n_ip = np.array([INTEGRATION_POINTS.get(t, 1) for t in mesh['element_types']])
+    centroids = np.array([mesh['coordinates'][node_index[c]].mean(axis=0) for c in mesh['connectivity']]).reshape(-1, 3)
+    with open(dat_file, 'w') as f:
+        for i, (step, (load, displacement, stress)) in enumerate(zip(steps, results)):
+            f.write('\n                        S T E P %7d\n\n\n                                INCREMENT     1\n\n'%(i+1))
+            for name in step['node_print']:
+                labels = mesh['nsets'].get(name, np.array([], dtype=np.int64))
+                if not len(labels):
+                    continue
+                f.write('\n displacements (vx,vy,vz) for set %s and time  0.1000000E+01\n\n'%name)
+                np.savetxt(f, np.column_stack((labels, displacement[node_index[labels]])), fmt='%10d %13.6E %13.6E %13.6E')
+            for name in step['el_print']:
+                f.write('\n stresses (elem, integ.pnt.,sxx,syy,szz,sxy,sxz,syz) for set %s and time  0.1000000E+01\n\n'%name)
+                #bounded by the mesh rather than centroids, as per nodal results
+                _, ip_stress = synthetic_fields(np.vstack((centroids, mesh['coordinates'].min(axis=0), mesh['coordinates'].max(axis=0))), load)
+                ip_stress = ip_stress[:len(centroids)][:, [0, 1, 2, 3, 5, 4]] #dat columns are sxx,syy,szz,sxy,sxz,syz
+                rows = np.repeat(np.arange(len(centroids)), n_ip)
+                ip = np.concatenate([np.arange(1, m+1) for m in n_ip]) if len(n_ip) else np.array([])
+                np.savetxt(f, np.column_stack((mesh['element_labels'][rows], ip, ip_stress[rows])), fmt='%10d %3d' + ' %13.6E'*6)
+            f.write('\n')
+
+def restart_model(job):
+    '''
+    Returns the lines of the model of job.inp (those before its first step) and the number of steps completed before it. These are 0 and the lines of job.inp, unless it restarts (*RESTART, READ) from job.rin, which holds the model as written by write_restart. Raises ValueError if job.rin has not completed the step to be read.
+    '''
+    lines, read = [], None
+    with open(job + '.inp') as f:
+        for line in f:
+            keyword, params = _keyword(line.strip())
+            if keyword == '*step':
+                break
+            if keyword == '*restart' and 'read' in params:
+                read = params.get('step')
+            else:
+                lines.append(line)
+    if read is None:
+        return lines, 0
+    with open(job + '.rin') as f:
+        text = f.read()
+    mark = RESTART_MARK.search(text)
+    completed = int(mark.group(1)) if mark is not None else 0
+    read = completed if not read else int(read)
+    if not 0 < read <= completed:
+        raise ValueError('step %i not found in restart file %s.rin, which holds %i steps'%(read, job, completed))
+    return text[:mark.start()].splitlines(True), read
+
+def write_restart(job, model, completed):
+    '''
+    Writes the lines of a model to job.rout, noting the number of steps completed.
+    '''
+    with open(job + '.rout', 'w') as f:
+        f.writelines(model)
+        f.write('** fake_ccx steps completed: %i\n'%completed)
+
+def write_status(job, first_step, n_steps, increments, failed=False):
+    '''
+    Writes the converged increments of n_steps steps, numbered from first_step, to job.sta in the form written by CalculiX. If failed, only half of the increments of the last step are written, as if it had not converged thereafter.
+    '''
+    with open(job + '.sta', 'w') as f:
+        f.write('SUMMARY OF JOB INFORMATION\n  STEP      INC     ATT   ITRS     TOT TIME     STEP TIME         INC TIME\n')
+        total = 0.0
+        for step in range(first_step, first_step + n_steps):
+            n = increments//2 if failed and step == first_step + n_steps - 1 else increments
+            for inc in range(1, n+1):
+                total += 1.0/increments
+                f.write('%6i %8i %7i %6i %13.6E %13.6E %13.6E\n'%(step, inc, 1, 1, total, float(inc)/increments, 1.0/increments))
+
+def synthesize(job, elements=0, binary=False, model=None):
+    '''
+    Writes synthetic results for job.inp to job.frd and job.dat; see module description. The mesh is read from the lines of model if given, i.e. those of a restart file.
+    '''
+    deck = read_deck(job + '.inp')
+    steps = deck['steps'] or [{'load': 1.0, 'node_print': [], 'el_print': [], 'restart': False}]
+    if model is not None:
+        mesh = read_deck(model)
+        deck.update(dict([(k, v) for k, v in mesh.items() if k != 'steps']))
+    mesh = deck
+    if elements or not len(deck['node_labels']) or not len(deck['element_labels']):
+        mesh = structured_mesh(elements or 1000)
+        for step in steps:
+            if not step['node_print']:
+                step['node_print'] = ['LEFT_LOWER_DATUM', 'LEFT_UPPER_DATUM', 'RIGHT_UPPER_DATUM', 'RIGHT_LOWER_DATUM']
+    results = []
+    for step in steps:
+        load = step['load'] or 1.0
+        displacement, stress = synthetic_fields(mesh['coordinates'], load)
+        results.append((load, displacement, stress))
+    write_frd(job + '.frd', mesh, results, binary)
+    write_dat(job + '.dat', mesh, steps, results)
+    return len(mesh['node_labels']), len(mesh['element_labels'])
+
+def replay(prefix, job):
+    '''
+    Copies prefix.frd and prefix.dat to job.frd and job.dat.
+    '''
+    for ext in ['.frd', '.dat']:
+        shutil.copyfile(prefix + ext, job + ext)
+
+def _print_progress(n_steps, increments, delay, first_step=1):
+    '''
+    Prints output in the form of CalculiX (see ccx_process.parse_progress), taking delay seconds per step.
+    '''
+    for step in range(first_step, first_step + n_steps):
+        print('\n STEP %12i\n\n Static analysis was selected\n'%step, flush=True)
+        for inc in range(1, increments+1):
+            print(' increment %i attempt 1 \n increment size= %e\n actual step time= %e\n'%(inc, 1.0/increments, float(inc)/increments), flush=True)
+            print(' iteration 1\n', flush=True)
+            time.sleep(delay/increments)
+            print(' convergence\n', flush=True)
+
+def install(directory, **options):
+    '''
+    Writes an executable launcher for this stand-in to directory, with options (see OPTIONS) fixed in it, returning its path. The launcher is a batch file on Windows and a shell script otherwise.
+    '''
+    args = ' '.join(['--%s %s'%(k, v) for k, v in options.items() if v])
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    if sys.platform == 'win32':
+        path = os.path.join(directory, 'fake_ccx.bat')
+        with open(path, 'w') as f:
+            f.write('@echo off\r\n"%s" -m OpenRS.generate.fake_ccx %s %%*\r\n'%(sys.executable, args))
+    else:
+        path = os.path.join(directory, 'fake_ccx')
+        with open(path, 'w') as f:
+            f.write('#!/bin/sh\nexec "%s" -m OpenRS.generate.fake_ccx %s "$@"\n'%(sys.executable, args))
+        os.chmod(path, 0o755)
+    return path
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description='Stand-in for the CalculiX executable, replaying recorded or synthesizing results.')
+    parser.add_argument('-i', dest='job', help='job name, as per CalculiX')
+    parser.add_argument('-o', dest='output', help="'bin' for binary *.frd output, as per CalculiX")
+    for name, (env, kind, default, description) in OPTIONS.items():
+        parser.add_argument('--' + name, type=kind, default=kind(os.environ.get(env, default)), help='%s (%s)'%(description, env))
+    parser.add_argument('--install', metavar='DIRECTORY', help='write a launcher with the given options to DIRECTORY, to use as the CalculiX executable')
+    args = parser.parse_args(argv)
+
+    if args.install is not None:
+        print(install(args.install, **dict([(k, getattr(args, k)) for k in OPTIONS])))
+        return 0
+    if args.job is None:
+        parser.error('a job needs to be specified with -i')
+
+    job = os.path.splitext(args.job)[0]
+    if not os.path.isfile(job + '.inp'):
+        print(' *ERROR: input file %s.inp does not exist'%job)
+        return 201
+    try:
+        model, first = restart_model(job)
+    except (IOError, ValueError) as e:
+        print(' *ERROR: %s'%e)
+        return 201
+    steps = read_deck(job + '.inp')['steps']
+    n_steps, increments = max(1, len(steps)), max(1, args.increments)
+    restart = any([step['restart'] for step in steps])
+    _print_progress(n_steps, increments, args.delay, first + 1)
+    write_status(job, first + 1, n_steps, increments, bool(args.fail))
+    if args.fail:
+        if restart and n_steps > 1:
+            write_restart(job, model, first + n_steps - 1)
+        print(' *ERROR: failure requested of stand-in solver')
+        return args.fail
+    if restart:
+        write_restart(job, model, first + n_steps)
+    if args.replay:
+        replay(args.replay, job)
+    else:
+        synthesize(job, args.elements, args.output == 'bin', model if first else None)
+    print(' Job finished\n', flush=True)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,181 +1,534 @@
 '''
-Python script for extracting stresses at nodes of a C3D8 formulation conducted by CalculiX. Output: ascii based *.vtu or legacy *.vtk file depending on `outfile` extension. Both will consisting of deformed mesh and scalar fields at S11, S22, S33. Further extracts deformed positions of fiducial points specified to a text file which are read from a companion *.dat file. Input frd, dat and output directory are arguments.
+Python script for extracting stresses at nodes of a continuum (C3D4/6/8/10/15/20) formulation conducted by CalculiX, from either ascii or binary (ccx -o bin) *.frd files. Output: binary (zlib compressed) or ascii based *.vtu, legacy *.vtk, or the model data of an OpenRS (HDF5) file depending on `outfile` extension. All will consisting of deformed mesh and scalar fields of all six stress components, von Mises (Svm), hydrostatic (Shyd) and principal stresses (SP1-3) along with principal directions. Further extracts deformed positions of fiducial points specified to a text file which are read from a companion *.dat file. Input frd, dat and output directory are arguments. Can be run from the command line, see `python -m OpenRS.generate.frd_access -h`.
 (c) M. J. Roy 2021
 '''
 import sys
 import os.path
+import json
+import re
 import numpy as np
-from itertools import islice
+from OpenRS.generate.vtu_writer import write_ug
+from OpenRS.generate.element_types import FRD_ELEMENTS, to_vtk_cells
+from OpenRS.generate.stress_tools import stress_point_data
+from OpenRS.generate.extrapolation import extrapolate, average_to_points
 
-def postprocess(frdname,outfile,fiducial_file):
+#number of nodes per element according to the frd element type number
+FRD_ELEMENT_NODES = dict([(k, v[1]) for k, v in FRD_ELEMENTS.items()])
 
-    #debug (script treatment)
-    # np.set_printoptions(precision=3,suppress=True)
-    #check if incoming odb file is valid. Use try/catch for valid directory. Assumes dat file has same prefix as frd file.
-    # frdname = sys.argv[1]
-    # outfile = sys.argv[2]
-    # fiducial_file = sys.argv[3]
+#header of *node print/*el print blocks in dat files, i.e. ' displacements (vx,vy,vz) for set LEFT and time  0.1000000E+01'
+DAT_HEADER = re.compile(r'^ (\w[\w .]*?) \((.*)\) for set (\S+) and time\s+(\S+)')
 
+def _decode_fixed(lines, widths, dtype=float):
+    '''
+    Decodes a list of fixed-width byte strings into a 2D numpy array, one column per entry in widths. The first field (the record key, i.e. ' -1') is discarded.
+    '''
+    w = sum(widths)
+    buf = b''.join([l[:w].ljust(w) for l in lines])
+    rec = np.frombuffer(buf, dtype=np.dtype([('f%i'%i, 'S%i'%wi) for i, wi in enumerate(widths)]))
+    out = np.empty((len(lines), len(widths)-1), dtype=dtype)
+    for i in range(1, len(widths)):
+        out[:, i-1] = rec['f%i'%i].astype(dtype)
+    return out
+
+def _decode_elements(lines):
+    '''
+    Decodes an ascii element block into element numbers, frd element types and a flat connectivity array. Element definitions (' -1') are followed by one or more connectivity (' -2') records.
+    '''
+    defs = [l for l in lines if l[:3] == b' -1']
+    info = _decode_fixed(defs, (3, 10, 5, 5, 5), dtype=np.int64)
+    connectivity = np.array(b' '.join([l[3:] for l in lines if l[:3] == b' -2']).split(), dtype=np.int64)
+    return info[:, 0], info[:, 1], connectivity
+
+def _decode_result(lines, n_comp):
+    '''
+    Decodes an ascii nodal result block into node labels and an array of n_comp values per node. Values beyond the sixth component are held on continuation (' -2') records.
+    '''
+    first = [l for l in lines if l[:3] == b' -1']
+    a = _decode_fixed(first, (3, 10) + (12,)*min(n_comp, 6))
+    labels = a[:, 0].astype(np.int64)
+    data = a[:, 1:]
+    if n_comp > 6:
+        rest = [l for l in lines if l[:3] == b' -2']
+        b = _decode_fixed(rest, (3, 10) + (12,)*(n_comp-6))
+        data = np.hstack((data, b[:, 1:]))
+    return labels, data
+
+def _binary_float(fmt):
+    '''
+    Returns the float dtype of binary blocks of format fmt: 2 is single and 3 double precision.
+    '''
+    return np.dtype('<f8') if fmt == 3 else np.dtype('<f4')
+
+def _read_binary_nodes(fid, n, fmt=3):
+    '''
+    Reads n binary node records from the current position of fid; each record is an int32 node number followed by 3 float32 (format 2, 16 bytes) or float64 (format 3, 28 bytes, as written by CalculiX) coordinates.
+    '''
+    rec = np.frombuffer(fid.read(n*(4+3*_binary_float(fmt).itemsize)), dtype=np.dtype([('n', '<i4'), ('x', _binary_float(fmt), (3,))]))
+    return np.column_stack((rec['n'], rec['x'].astype(np.float64)))
+
+def _read_binary_elements(fid, n):
+    '''
+    Reads n binary (format 2 or 3) element records from the current position of fid. Each record is an int32 element number, type, group and material number followed by int32 node numbers. Homogeneous meshes are read as a single block, mixed meshes record by record.
+    '''
+    start = fid.tell()
+    etype = int(np.frombuffer(fid.read(8), dtype='<i4')[1])
+    width = 4 + FRD_ELEMENT_NODES[etype]
+    fid.seek(start)
+    buf = fid.read(n*width*4)
+    if len(buf) == n*width*4:
+        rec = np.frombuffer(buf, dtype='<i4').reshape(n, width)
+        if np.all(rec[:, 1] == etype):
+            return rec[:, 0].astype(np.int64), rec[:, 1].astype(np.int64), rec[:, 4:].astype(np.int64).ravel()
+
+    fid.seek(start)
+    info = np.zeros((n, 4), dtype=np.int64)
+    connectivity = []
+    for i in range(n):
+        info[i, :] = np.frombuffer(fid.read(16), dtype='<i4')
+        connectivity.append(np.frombuffer(fid.read(4*FRD_ELEMENT_NODES[int(info[i, 1])]), dtype='<i4'))
+    return info[:, 0], info[:, 1], np.concatenate(connectivity).astype(np.int64)
+
+def _read_binary_result(fid, n, n_comp, fmt=2):
+    '''
+    Reads n binary nodal result records from the current position of fid; each record is an int32 node number followed by n_comp float32 (format 2) or float64 (format 3) values.
+    '''
+    rec = np.frombuffer(fid.read(n*(4+_binary_float(fmt).itemsize*n_comp)), dtype=np.dtype([('n', '<i4'), ('v', _binary_float(fmt), (n_comp,))]))
+    return rec['n'].astype(np.int64), rec['v'].astype(np.float64)
+
+def _skip_records(fid, count, lines_per_record=1):
+    '''
+    Advances fid past count ascii records and the terminating ' -3' record of a block, returning the offset of the terminating record. Records are assumed to be of constant length as measured from the first; if the terminating record is not found where expected, the block is scanned line by line.
+    '''
+    start = fid.tell()
+    length = sum([len(fid.readline()) for i in range(lines_per_record)])
+    fid.seek(start + count*length)
+    if fid.readline()[:3] == b' -3':
+        return start + count*length
+
+    fid.seek(start)
+    while True:
+        pos = fid.tell()
+        line = fid.readline()
+        if not line or line[:3] == b' -3':
+            return pos
+
+class FrdFile(object):
+    '''
+    Lazy access to a CalculiX *.frd file. On opening, the byte offset of every block (nodes, elements and each result block of every step and increment) is indexed without decoding any values, and the index is saved to a sidecar file (frdname + '.idx') so that subsequent openings of the same, unmodified file do not need to re-scan it. Blocks are decoded on demand with get(), and cached.
+    '''
+    INDEX_VERSION = 2
+
+    def __init__(self, frdname, save_index=True):
+        if not os.path.isfile(frdname):
+            raise FileNotFoundError('Specified frd file %s not valid.'%frdname)
+        self.frdname = frdname
+        self.index_file = frdname + '.idx'
+        self._cache = {}
+
+        stat = os.stat(frdname)
+        self.index = self._load_index(stat)
+        if self.index is None:
+            self.index = self._build_index()
+            self.index.update({'version': self.INDEX_VERSION, 'size': stat.st_size, 'mtime': stat.st_mtime})
+            if save_index:
+                try:
+                    with open(self.index_file, 'w') as f:
+                        json.dump(self.index, f)
+                except OSError:
+                    pass #read-only location, index is rebuilt next time
+
+    def _load_index(self, stat):
+        '''
+        Returns the index stored in the sidecar file if it matches the version, size and modification time of the frd file, otherwise None.
+        '''
+        try:
+            with open(self.index_file, 'r') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if index.get('version') != self.INDEX_VERSION or index.get('size') != stat.st_size or index.get('mtime') != stat.st_mtime:
+            return None
+        return index
+
+    def _build_index(self):
+        '''
+        Reads the header records of each block, skipping over their values, and returns a dictionary of 'nodes', 'elements' and a list of 'results' entries with byte offsets and metadata.
+        '''
+        index = {'nodes': None, 'elements': None, 'results': []}
+        header = {}
+        with open(self.frdname, 'rb') as fid:
+            for line in iter(fid.readline, b''):
+                key = line[:6]
+                if key == b'    2C' or key == b'    3C':
+                    count, fmt = [int(v) for v in line[6:].split()[:2]]
+                    entry = {'offset': fid.tell(), 'count': count, 'format': fmt}
+                    if key == b'    2C':
+                        if fmt >= 2:
+                            fid.seek(count*(4+3*_binary_float(fmt).itemsize), 1)
+                        else:
+                            entry['end'] = _skip_records(fid, count)
+                        index['nodes'] = entry
+                    else:
+                        if fmt >= 2:
+                            #element records are of variable length, decoding is as cheap as skipping
+                            labels, types, connectivity = _read_binary_elements(fid, count)
+                            self._cache['elements'] = {'labels': labels, 'types': types, 'connectivity': connectivity}
+                        else:
+                            #peek at the first element type to find the number of records per element
+                            etype = int(fid.readline()[13:18])
+                            fid.seek(entry['offset'])
+                            entry['end'] = _skip_records(fid, count, 1 + (FRD_ELEMENT_NODES[etype]-1)//10 + 1)
+                        index['elements'] = entry
+                elif key == b'    1P' and line[6:10] == b'STEP':
+                    #output counter, increment and step of the result block that follows
+                    _, inc, step = [int(v) for v in line[10:].split()[:3]]
+                    header = {'step': step, 'increment': inc}
+                elif key == b'  100C':
+                    #step value (time/frequency), number of nodes and format of the result block that follows
+                    header['value'] = float(line[12:24])
+                    header['count'] = int(line[24:36])
+                    header['format'] = int(line.split()[-1])
+                elif line[:4] == b' -4 ':
+                    fields = line[4:].split()
+                    header['name'] = fields[0].decode()
+                    header['components'] = []
+                    for i in range(int(fields[1])):
+                        line = fid.readline()
+                        #component definitions; 'ALL' type entries are calculated by CGX and not stored
+                        if line[33:38].strip() != b'1':
+                            header['components'].append(line[5:13].strip().decode())
+                    n_comp = len(header['components'])
+                    header['offset'] = fid.tell()
+                    if header['format'] >= 2:
+                        fid.seek(header['count']*(4+_binary_float(header['format']).itemsize*n_comp), 1)
+                    else:
+                        header['end'] = _skip_records(fid, header['count'], 1 + (n_comp-1)//6)
+                    index['results'].append(header)
+                    header = {}
+        return index
+
+    @property
+    def results(self):
+        '''
+        List of result block metadata ('name', 'step', 'increment', 'value', 'components' etc.) in order of appearance.
+        '''
+        return self.index['results']
+
+    def steps(self):
+        return sorted(set([r['step'] for r in self.results]))
+
+    def increments(self, step):
+        return sorted(set([r['increment'] for r in self.results if r['step'] == step]))
+
+    def fields(self, step=None):
+        names = []
+        for r in self.results:
+            if (step is None or r['step'] == step) and r['name'] not in names:
+                names.append(r['name'])
+        return names
+
+    def _read_lines(self, entry):
+        with open(self.frdname, 'rb') as fid:
+            fid.seek(entry['offset'])
+            return fid.read(entry['end'] - entry['offset']).splitlines(True)
+
+    @property
+    def nodes(self):
+        '''
+        Nx4 array of node number, x, y, z
+        '''
+        if 'nodes' not in self._cache:
+            entry = self.index['nodes']
+            if entry['format'] >= 2:
+                with open(self.frdname, 'rb') as fid:
+                    fid.seek(entry['offset'])
+                    self._cache['nodes'] = _read_binary_nodes(fid, entry['count'], entry['format'])
+            else:
+                self._cache['nodes'] = _decode_fixed(self._read_lines(entry), (3, 10, 12, 12, 12))
+        return self._cache['nodes']
+
+    @property
+    def elements(self):
+        '''
+        Dictionary of 'labels', 'types' (frd numbering) and 'connectivity' (flat, 1-based node numbers)
+        '''
+        if 'elements' not in self._cache:
+            entry = self.index['elements']
+            if entry['format'] >= 2:
+                with open(self.frdname, 'rb') as fid:
+                    fid.seek(entry['offset'])
+                    labels, types, connectivity = _read_binary_elements(fid, entry['count'])
+            else:
+                labels, types, connectivity = _decode_elements(self._read_lines(entry))
+            self._cache['elements'] = {'labels': labels, 'types': types, 'connectivity': connectivity}
+        return self._cache['elements']
+
+    def read(self, i):
+        '''
+        Decodes result block i (according to the order of self.results), returning a copy of its metadata with 'labels' and 'data' (NxM array of components) added.
+        '''
+        if i not in self._cache:
+            entry = self.results[i]
+            n_comp = len(entry['components'])
+            if entry['format'] >= 2:
+                with open(self.frdname, 'rb') as fid:
+                    fid.seek(entry['offset'])
+                    self._cache[i] = _read_binary_result(fid, entry['count'], n_comp, entry['format'])
+            else:
+                self._cache[i] = _decode_result(self._read_lines(entry), n_comp)
+        out = dict(self.results[i])
+        out['labels'], out['data'] = self._cache[i]
+        return out
+
+    def get(self, name, step=None, increment=None):
+        '''
+        Decodes the result block called name (i.e. 'DISP' or 'STRESS') for the specified step and increment. If step or increment are not specified, the last available is used.
+        '''
+        matches = [i for i, r in enumerate(self.results) if r['name'] == name \
+            and (step is None or r['step'] == step) \
+            and (increment is None or r['increment'] == increment)]
+        if not matches:
+            raise KeyError('No %s result found in %s for step %s, increment %s.'%(name, self.frdname, step, increment))
+        if step is None:
+            last = self.results[matches[-1]]['step']
+            matches = [i for i in matches if self.results[i]['step'] == last]
+        return self.read(matches[-1])
+
+    def clear_cache(self):
+        self._cache = {}
+
+def read_frd(frdname):
+    '''
+    Reads and decodes all blocks of a CalculiX *.frd file, in either ascii (format 1) or binary (format 2 single, or 3 double precision). Returns a dictionary with:
+    'nodes' - Nx4 array of node number, x, y, z
+    'elements' - dictionary of 'labels', 'types' (frd numbering) and 'connectivity' (flat, 1-based node numbers)
+    'results' - list of dictionaries, one per result block in order of appearance, with 'name', 'step', 'increment', 'value', 'components', 'labels' and 'data' (NxM array of components)
+    '''
+    frd = FrdFile(frdname, save_index=False)
+    return {'nodes': frd.nodes, 'elements': frd.elements, 'results': [frd.read(i) for i in range(len(frd.results))]}
+
+def read_dat(datname):
+    '''
+    Reads all *node print and *el print output from a CalculiX *.dat file in a single pass. Returns a list of dictionaries, one per printed block in order of appearance, with:
+    'quantity' - i.e. 'displacements' or 'stresses'
+    'set' - name of the node or element set
+    'columns' - list of column labels as given in the header, i.e. ['vx', 'vy', 'vz']
+    'step', 'increment' and 'time' - as declared in the file
+    'data' - NxM array with one row per node (node number, values) or integration point (element number, integration point number, values)
+    '''
+    blocks = []
+    block = None
+    step, inc = 1, 1
+    with open(datname, 'r') as fid:
+        for line in fid:
+            if block is not None:
+                if line.strip():
+                    lines.append(line)
+                    continue
+                if lines:
+                    #blank line following data closes the block
+                    values = np.array(' '.join(lines).split(), dtype=float)
+                    block['data'] = values.reshape(len(lines), -1)
+                    blocks.append(block)
+                    block = None
+                continue
+
+            if ' for set ' in line:
+                m = DAT_HEADER.match(line)
+                if m is not None:
+                    block = {'quantity': m.group(1).strip(), 'columns': [c.strip() for c in m.group(2).split(',')],
+                        'set': m.group(3), 'time': float(m.group(4)), 'step': step, 'increment': inc}
+                    lines = []
+            elif line.strip().startswith('S T E P'):
+                step = int(line.split()[-1])
+            elif line.strip().startswith('INCREMENT'):
+                inc = int(line.split()[-1])
+
+        if block is not None and lines:
+            block['data'] = np.array(' '.join(lines).split(), dtype=float).reshape(len(lines), -1)
+            blocks.append(block)
+    return blocks
+
+def dat_sets(blocks, quantity, step=None, increment=None):
+    '''
+    Returns a dictionary of set name to data array of the blocks (as returned by read_dat) of quantity, i.e. 'displacements', for the specified step and increment. If not specified, the last available step and increment is used.
+    '''
+    blocks = [b for b in blocks if b['quantity'] == quantity \
+        and (step is None or b['step'] == step) \
+        and (increment is None or b['increment'] == increment)]
+    if blocks and step is None:
+        blocks = [b for b in blocks if b['step'] == blocks[-1]['step']]
+    out = {}
+    for b in blocks:
+        out[b['set']] = b['data'] #later increments replace earlier ones
+    return out
+
+def dat_ip_stress(blocks, step=None, increment=None):
+    '''
+    Returns the element numbers and an Nx6 array of S11, S22, S33, S12, S23, S13 of all integration point stresses (as printed with *el print, S) in the blocks returned by read_dat, for the specified step and increment. Rows are in order of integration point within each element.
+    '''
+    sets = dat_sets(blocks, 'stresses', step, increment)
+    if not sets:
+        raise ValueError('No integration point stresses found; *el print of S is required.')
+    labels, values = [], []
+    for name in sets:
+        block = [b for b in blocks if b['quantity'] == 'stresses' and b['set'] == name][0]
+        columns = [c.lower() for c in block['columns']]
+        data = sets[name]
+        labels.append(data[:,0].astype(np.int64))
+        #dat columns are sxx,syy,szz,sxy,sxz,syz
+        values.append(data[:,[columns.index(c) for c in ['sxx','syy','szz','sxy','syz','sxz']]])
+    return np.concatenate(labels), np.vstack(values)
+
+def postprocess(frdname,outfile,fiducial_file,step=None,increment=None,binary=True,fiducial_sets=None,ip_stress=None):
+    '''
+    Writes the deformed mesh and stresses of the specified step and increment of frdname to outfile, and the deformed fiducial positions to fiducial_file. The last step/increment is used if not specified. If binary is False, *.vtu files are written as ascii rather than compressed binary. fiducial_sets is a list of node set names printed to the companion *.dat file to write; all are written if None.
+    By default, stresses are the nodal averages written to the frd file by CalculiX. If ip_stress is 'averaged' or 'unaveraged', integration point stresses printed to the *.dat file (*el print, S) are extrapolated to element nodes instead; these are then either averaged at each node, or kept per element by writing each cell with its own points so that discontinuities between elements are retained.
+    outfile may be *.vtu, *.vtk, *.OpenRS or *.npz; the latter holds the undeformed mesh, displacements, stresses and fiducial sets as raw arrays (see npz_interchange.write_npz).
+    Raises FileNotFoundError if frdname or its companion *.dat file does not exist, and ValueError if outfile is not a supported format or a set of fiducial_sets was not printed, rather than exiting, so that it can be run by batch_postprocess. Returns a dictionary of the number of nodes and elements and the fiducial sets written.
+    '''
+    return postprocess_steps(frdname, [outfile], [fiducial_file], [step], increment, binary, fiducial_sets, ip_stress)[0]
+
+def postprocess_steps(frdname,outfiles,fiducial_files,steps=None,increment=None,binary=True,fiducial_sets=None,ip_stress=None):
+    '''
+    Splits the results of several steps of frdname (i.e. load cases of a deck written by packager_ccx.run_load_cases) into separate datasets, writing each step to the corresponding entry of outfiles and fiducial_files. All steps in frdname are written if steps is None. The mesh is read and indexed once for all steps; other arguments are as per postprocess. Returns a list of dictionaries as per postprocess, one per step.
+    '''
+    #companion dat file has the same prefix as the frd file
     datname, _ = os.path.splitext(frdname)
     datname = datname + '.dat'
 
+    if ip_stress not in (None, 'averaged', 'unaveraged'):
+        raise ValueError("ip_stress needs to be None, 'averaged' or 'unaveraged'.")
     if not os.path.isfile(frdname):
-        sys.exit("Specified frd file to frd_access not valid.")
-
-    #read file and get line numbers with key values identifying output
-    i=0
-    lineFlag=[]
-    keyStrings=["    2C", "    3C", " -4  DISP", " -4  STRESS", " -3"]
-
-    fid = open(frdname)
-    while 1:
-        lines = fid.readlines(100000)
-        if not lines:
-            break
-        for line in lines:
-            i+=1
-            for keyString in keyStrings:
-                if line[0:len(keyString)]==keyString:
-                    lineFlag.append(i)
-                
-    fid.close()
-
-    #read nodal data
-    a = np.genfromtxt(frdname,
-        delimiter = (3,10,12,12,12),
-        skip_header=lineFlag[0], max_rows=lineFlag[1]-lineFlag[0]-1)
-    node_array = a[:,1::] #node number, x,y,z coords
+        raise FileNotFoundError("Specified frd file %s to frd_access not valid."%frdname)
+    if not os.path.isfile(datname):
+        raise FileNotFoundError("Companion dat file %s to frd_access not found."%datname)
+
+    #index file, only decoding blocks which are needed
+    frd = FrdFile(frdname)
+    if steps is None:
+        steps = frd.steps()
+    if len(outfiles) != len(steps) or len(fiducial_files) != len(steps):
+        raise ValueError('An outfile and fiducial file is needed for each of steps %s.'%steps)
+
+    node_array = frd.nodes.copy() #node number, x,y,z coords
+    n_nodes = np.size(node_array, 0)
+
+    #map node numbers onto rows of node_array
+    node_index = np.zeros(int(node_array[:,0].max())+1, dtype=np.int64)
+    node_index[node_array[:,0].astype(np.int64)] = np.arange(n_nodes)
+
+    #translate to vtk cells, which have 0 based point numbering
+    elements = frd.elements
+    connectivity, offsets, cell_types = to_vtk_cells(elements['types'], elements['connectivity'])
+    connectivity = node_index[connectivity]
+    if ip_stress is not None:
+        element_index = np.zeros(int(elements['labels'].max())+1, dtype=np.int64)
+        element_index[elements['labels']] = np.arange(len(elements['labels']))
 
+    dat_blocks = read_dat(datname)
+    out = []
+    for step, outfile, fiducial_file in zip(steps, outfiles, fiducial_files):
+        out.append(_postprocess_step(frd, dat_blocks, node_index, connectivity, offsets, cell_types, \
+            outfile, fiducial_file, step, increment, binary, fiducial_sets, ip_stress, \
+            element_index if ip_stress is not None else None))
+    return out
+
+def _postprocess_step(frd, dat_blocks, node_index, connectivity, offsets, cell_types, outfile, fiducial_file, step, increment, binary, fiducial_sets, ip_stress, element_index):
+    '''
+    Writes a single step and increment for postprocess_steps, given the indexed mesh.
+    '''
+    node_array = frd.nodes
     n_nodes = np.size(node_array, 0)
-    n_elements = int((lineFlag[3]-1 - lineFlag[2])/2) #Could also be read directly from '3C' flag
-
-    #preallocate numpy array
-    element_array = np.zeros([n_elements,9]) #C3D8
-    #read element data using isslice, could be optimised with regex
-    with open(frdname) as fid:
-        lines = islice(fid,lineFlag[2],lineFlag[3]-1)
-        e_num = 0
-        for line in lines:
-            l = np.array([int(i) for i in line.split()])
-            #capture lines that once split have 8 values (C3D8)
-            if l[0] == -1: #then element declaration
-                e_num = l[1]
-                element_array[e_num-1,0] = e_num-1 #cell numbering in vtk is 0 based
-            if l[0] == -2 and e_num != 0:#then connectivity of element number declared the line above
-                element_array[e_num-1,1::] = l[1::]-1 #node numbering in vtk is 0 based
-
-    vtk_element_array = element_array
-    vtk_element_array[:,0] = 8 #quads
-
-    #read displacement data and add to node_array
-    a = np.genfromtxt(frdname,
-        delimiter = (3,10,12,12,12),
-        skip_header=lineFlag[4]+4, max_rows=lineFlag[5]-1-(lineFlag[4]+4))
-        
-    for row in a:
-        node_array[int(row[1])-1,1::] = node_array[int(row[1])-1,1::] + row[2::]
-
-    #read averaged stresses
-    a = np.genfromtxt(frdname,
-        delimiter = (3,10,12,12,12,12,12,12),
-        skip_header=lineFlag[6]+6, max_rows=lineFlag[7]-1-(lineFlag[6]+6))
-    stress_avg_array = a[:,2:5] #SXX/S11, SYY/S22, SZZ/S33
-
-
-    #write output
-    if outfile.endswith('.vtk'):
-        fid=open(outfile,'w+')
-        fid.write('# vtk DataFile Version 2.0\n')
-        fid.write('%s,created by OpenRS\n'%outfile[:-4])
-        fid.write('ASCII\n')
-        fid.write('DATASET UNSTRUCTURED_GRID\n')
-        fid.write('POINTS %i double\n'%n_nodes)
-        np.savetxt(fid,node_array[:,1::],fmt='%.6f')
-        fid.write('\n')
-
-        fid.write('CELLS %i %i\n'%(n_elements,np.size(element_array)))
-        np.savetxt(fid,vtk_element_array,fmt='%i')
-        fid.write('\n')
-
-        fid.write('CELL_TYPES %i\n'%n_elements)
-        CellType=np.ones([n_elements,1])*12 #quads
-        np.savetxt(fid,CellType,fmt='%i')
-        fid.write('\n')
-
-        fid.write('POINT_DATA %i\n'%n_nodes)
-        for i in range(3):
-            fid.write('SCALARS S%s%s float 1\n'%(i+1,i+1))
-            fid.write('LOOKUP_TABLE DEFAULT\n')
-            np.savetxt(fid,stress_avg_array[:,i])
-        
-        fid.close()
-
-    #write a vtu file (preferred)
-    elif outfile.endswith('.vtu'):
-        fid=open(outfile,'w+')
-        fid.write('<VTKFile type="UnstructuredGrid" version="0.1" byte_order="LittleEndian" header_type="UInt32" compressor="vtkZLibDataCompressor">\n<UnstructuredGrid><Piece NumberOfPoints="%i" NumberOfCells="%i">\n'%(n_nodes,n_elements))
-        fid.write('<PointData>\n')
-        #now point data (stresses at nodes)    
-        for i in range(3):
-            fid.write('<DataArray Name="S%s%s" type="Float64" format="ASCII">\n'%(i+1,i+1))
-            np.savetxt(fid,stress_avg_array[:,i])
-            fid.write('</DataArray>\n')
-        fid.write('</PointData>\n')
-        #write node coordinates
-        fid.write('<Points>\n<DataArray type="Float64" Name="Points" NumberOfComponents="3" format="ascii" RangeMin="%f" RangeMax="%f">\n'%(np.min(node_array[:,1::]),np.max(node_array[:,1::])))
-        np.savetxt(fid,node_array[:,1::],fmt='%.6f')
-        fid.write('</DataArray>\n</Points>')
-
-        fid.write('<Cells>\n <DataArray type="Int64" Name="connectivity" format="ascii" RangeMin="%i" RangeMax="%i">\n'%(0,n_nodes+1))
-        np.savetxt(fid,vtk_element_array[:,1::],fmt='%i')
-        fid.write('</DataArray>\n<DataArray type="Int64" Name="offsets" format="ascii" RangeMin="%i" RangeMax="%i">\n'%(8,8*n_elements))
-        offsets = np.asarray([i * 8 for i in range(n_elements+1)])
-        np.savetxt(fid,offsets[1::],fmt='%i')
-        fid.write('</DataArray>\n<DataArray type="UInt8" Name="types" format="ascii" RangeMin="%i" RangeMax="%i">\n'%(12,12))
-        types = np.asarray([12 for i in range(n_elements+1)])
-        np.savetxt(fid,types,fmt='%i')
-
-        fid.write('</DataArray>\n</Cells>\n</Piece>\n</UnstructuredGrid>\n</VTKFile>')
-        fid.close()
+
+    #displacement of each node, added to undeformed coordinates
+    disp = frd.get('DISP', step, increment)
+    displacement = np.zeros([n_nodes,3])
+    displacement[node_index[disp['labels']],:] = disp['data'][:,0:3]
+    coordinates = node_array[:,1::]
+    points = coordinates + displacement
+    node_labels = node_array[:,0].astype(np.int64)
+
+    if ip_stress is None:
+        #averaged stresses, full tensor
+        stress = frd.get('STRESS', step, increment)
+        stress_array = np.zeros([n_nodes,6])
+        stress_array[node_index[stress['labels']],:] = stress['data'][:,0:6] #SXX/S11, SYY/S22, SZZ/S33, SXY/S12, SYZ/S23, SZX/S13
     else:
-        sys.exit("Specified output file for odb_access not valid.")
+        ip_labels, ip_array = dat_ip_stress(dat_blocks, step, increment)
+        element_nodal, has_data = extrapolate(cell_types, offsets, element_index[ip_labels], ip_array)
+        if ip_stress == 'averaged':
+            valid = np.repeat(has_data, np.diff(np.concatenate(([0], offsets))))
+            stress_array = average_to_points(connectivity, element_nodal, n_nodes, valid)
+        else:
+            #each cell has its own points, which keep the node number they were copied from
+            coordinates, displacement = coordinates[connectivity], displacement[connectivity]
+            node_labels = node_labels[connectivity]
+            points = coordinates + displacement
+            connectivity = np.arange(len(connectivity))
+            stress_array = element_nodal
 
-    print('Wrote %s.'%outfile)
+    #get deformed coordinates of all node sets printed to the dat file, or those specified
+    disp_sets = dat_sets(dat_blocks, 'displacements', step, increment)
+    if fiducial_sets is None:
+        fiducial_sets = list(disp_sets.keys())
+    missing = [name for name in fiducial_sets if name.upper() not in disp_sets]
+    if missing:
+        raise ValueError('Fiducial set(s) %s not found in the dat file; available sets are %s.'%( \
+            ', '.join(missing), ', '.join(disp_sets.keys()) or 'none'))
+    undeformed = frd.nodes
+    fiducials = []
+    for name in fiducial_sets:
+        disp_array = disp_sets[name.upper()].copy()
+        #add displacement to starting node position
+        disp_array[:,1:4] += undeformed[node_index[disp_array[:,0].astype(np.int64)],1::]
+        fiducials.append((name.upper(), disp_array))
 
-    #get deformed datum coodinates
-    lld = 'left_lower_datum'.upper()
-    lud = 'left_upper_datum'.upper()
-    rud = 'right_upper_datum'.upper()
-    rld = 'right_lower_datum'.upper()
-    datum_nodeSets = [lld, lud, rud, rld] #list of nodeSets
-
-    #identify lines which contain 'displacements'
-    keyStrings = [" displacements", " stresses"]
-    lineFlag = []
-    fid = open(datname)
-    i=0
-    while 1:
-        lines = fid.readlines(100000)
-        if not lines:
-            break
-        for line in lines:
-            i+=1
-            for keyString in keyStrings:
-                if line[0:len(keyString)]==keyString:
-                    lineFlag.append(i)
-    fid.close()
+    #write output with derived quantities, binary vtu preferred
+    if outfile.endswith('.npz'):
+        from OpenRS.generate.npz_interchange import write_npz
+        write_npz(outfile, coordinates, connectivity, offsets, cell_types, displacement, stress_array, fiducials, node_labels)
+    elif outfile.endswith('.OpenRS'):
+        #write model data directly, bypassing vtu serialisation
+        from OpenRS.open_rs_hdf5_io import write_model_arrays
+        write_model_arrays(outfile, points, connectivity, offsets, cell_types, stress_point_data(stress_array))
+    else:
+        write_ug(outfile, points, connectivity, offsets, cell_types, stress_point_data(stress_array), binary=binary)
 
-    with open(fiducial_file, "w+") as f:
+    print('Wrote %s.'%outfile)
 
-        for i in range(len(datum_nodeSets)):
-            disp_array = np.genfromtxt(datname,
-                delimiter = (10,14,14,14),
-                skip_header=lineFlag[i]+1, max_rows=lineFlag[i+1]-2-(lineFlag[i]+1))#additional ints are for whitespace
-            
-            for row in disp_array:
-                #add displacement to starting node position
-                disp_array[disp_array[:,0]==row[0],1::] = node_array[int(row[0])-1,1::]+[row[1],row[2],row[3]]
-            f.write('U_%s\n'%datum_nodeSets[i]) #'U_' required to identify as datum for main postprocessor
+    with open(fiducial_file, "w+") as f:
+        for name, disp_array in fiducials:
+            f.write('U_%s\n'%name) #'U_' required to identify as datum for main postprocessor
             np.savetxt(f,disp_array)
-            
+
     print('Wrote %s.'%fiducial_file)
+
+    return {'nodes': n_nodes, 'elements': len(cell_types), 'fiducial_sets': [name for name, disp_array in fiducials]}
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Convert a CalculiX *.frd (and companion *.dat) result to *.vtu, *.vtk or *.OpenRS.')
+    parser.add_argument('frd', help='CalculiX result file')
+    parser.add_argument('outfile', help='output file, format according to extension: *.vtu, *.vtk, *.OpenRS or *.npz')
+    parser.add_argument('--fiducial', help='fiducial output file, defaults to outfile prefix with _fid.txt')
+    parser.add_argument('--step', type=int, help='step to extract, defaults to last')
+    parser.add_argument('--increment', type=int, help='increment to extract, defaults to last')
+    parser.add_argument('--ascii', action='store_true', help='write ascii rather than binary *.vtu')
+    parser.add_argument('--split-steps', action='store_true', help='write every step to its own outfile, suffixed _000, _001 etc.')
+    parser.add_argument('--ip-stress', choices=['averaged', 'unaveraged'], help='extrapolate integration point stresses from the *.dat file rather than using frd nodal stresses')
+    args = parser.parse_args()
+
+    fiducial_file = args.fiducial
+    if fiducial_file is None:
+        fiducial_file = os.path.splitext(args.outfile)[0] + '_fid.txt'
+    try:
+        if args.split_steps:
+            prefix, ext = os.path.splitext(args.outfile)
+            n = len(FrdFile(args.frd).steps())
+            postprocess_steps(args.frd, ['%s_%03i%s'%(prefix, i, ext) for i in range(n)], \
+                ['%s_%03i_fid.txt'%(prefix, i) for i in range(n)], increment=args.increment, binary=not args.ascii, ip_stress=args.ip_stress)
+        else:
+            postprocess(args.frd, args.outfile, fiducial_file, args.step, args.increment, binary=not args.ascii, ip_stress=args.ip_stress)
+    except (FileNotFoundError, ValueError) as e:
+        sys.exit(str(e))
@@ -0,0 +1,154 @@
+'''
+Binary interchange of finite element results between the ABAQUS Python scripts (odb_access*.py) and OpenRS. Under ABAQUS, write_npz stores raw arrays of the undeformed mesh, displacements, the full stress tensor and fiducial sets in an uncompressed *.npz archive; npz_convert then writes these to *.vtu, *.vtk or *.OpenRS with the Python environment of OpenRS, without any text being written or parsed.
+Several frames are stored as a series archive: the mesh is written once by write_npz_topology, and the displacements and stresses of each frame are appended to the archive with append_npz_frame as they are extracted. Series archives are converted to a time series HDF5 store with npz_to_time_series, or a single frame is converted with npz_convert.
+NB: this module is imported by ABAQUS Python scripts, and therefore needs to remain Python 2.7 compatible.
+(c) M. J. Roy 2021
+'''
+import sys
+import os.path
+import io
+import zipfile
+import numpy as np
+
+FIDUCIAL_PREFIX = 'U_' #required to identify as datum for main postprocessor
+
+def write_npz(npzfile, points, connectivity, offsets, cell_types, displacement, stress, fiducials=(), node_labels=None):
+    '''
+    Writes results to npzfile.
+    points - Nx3 array of undeformed point coordinates
+    connectivity, offsets, cell_types - VTK cells, as per element_types.to_vtk_cells
+    displacement - Nx3 array of point displacements
+    stress - Nx6 array of S11, S22, S33, S12, S23, S13 at points
+    fiducials - sequence of (set name, array of node number, deformed x, y, z)
+    node_labels - node number of each point, if not 1 to N
+    '''
+    if node_labels is None:
+        node_labels = np.arange(1, len(points)+1)
+    arrays = {'points': points, 'node_labels': node_labels, 'connectivity': connectivity, 'offsets': offsets,
+        'cell_types': cell_types, 'displacement': displacement, 'stress': stress,
+        'fiducial_sets': np.array([str(name) for name, data in fiducials])}
+    for name, data in fiducials:
+        arrays[FIDUCIAL_PREFIX + str(name)] = data
+    np.savez(npzfile, **arrays)
+
+def write_npz_topology(npzfile, points, connectivity, offsets, cell_types, node_labels=None):
+    '''
+    Starts a series archive with the undeformed mesh, see write_npz for arguments. Frames are added with append_npz_frame.
+    '''
+    if node_labels is None:
+        node_labels = np.arange(1, len(points)+1)
+    np.savez(npzfile, points=points, node_labels=node_labels, connectivity=connectivity, offsets=offsets,
+        cell_types=cell_types, fiducial_sets=np.array([]))
+
+def append_npz_frame(npzfile, frame, value, displacement, stress):
+    '''
+    Appends the Nx3 displacements and Nx6 stresses (see write_npz) of frame number frame, at step time value, to a series archive without rewriting or holding previous frames in memory.
+    '''
+    arrays = [('displacement_%i'%frame, displacement), ('stress_%i'%frame, stress), ('value_%i'%frame, np.array(value, dtype=np.float64))]
+    zf = zipfile.ZipFile(npzfile, 'a', zipfile.ZIP_STORED, allowZip64=True)
+    try:
+        for name, a in arrays:
+            buf = io.BytesIO()
+            np.lib.format.write_array(buf, np.asarray(a))
+            zf.writestr(name + '.npy', buf.getvalue())
+    finally:
+        zf.close()
+
+def npz_frames(files):
+    '''
+    Returns the sorted frame numbers held in a series archive given its member names (NpzFile.files); empty for single frame archives.
+    '''
+    return sorted([int(f.split('_')[-1]) for f in files if f.startswith('displacement_')])
+
+def read_npz(npzfile, frame=None):
+    '''
+    Returns a dictionary of the arrays written by write_npz, with 'fiducials' as a list of (set name, array) pairs in the order written. For series archives, 'displacement' and 'stress' are those of the specified frame number, or the last frame if not specified, which is given as 'frame' and its step time as 'value'.
+    '''
+    out = {}
+    with np.load(npzfile) as data:
+        for key in ['points', 'node_labels', 'connectivity', 'offsets', 'cell_types']:
+            out[key] = data[key]
+        frames = npz_frames(data.files)
+        if frames:
+            if frame is None:
+                frame = frames[-1]
+            elif frame not in frames:
+                raise ValueError('Frame %i not found in %s; available frames are %s.'%(frame, npzfile, frames))
+            out['frame'], out['value'] = frame, float(data['value_%i'%frame])
+            out['displacement'], out['stress'] = data['displacement_%i'%frame], data['stress_%i'%frame]
+        else:
+            out['displacement'], out['stress'] = data['displacement'], data['stress']
+        #set names are bytes if written by Python 2
+        names = [n.decode() if isinstance(n, bytes) else str(n) for n in data['fiducial_sets']]
+        out['fiducials'] = [(name, data[FIDUCIAL_PREFIX + name]) for name in names]
+    return out
+
+def npz_to_time_series(npzfile, h5file):
+    '''
+    Writes all frames of a series archive to a time series HDF5 store (see open_rs_hdf5_io.write_time_series_topology), one frame at a time.
+    '''
+    from OpenRS.open_rs_hdf5_io import write_time_series_topology, append_time_series_frame
+
+    with np.load(npzfile) as data:
+        frames = npz_frames(data.files)
+        if not frames:
+            raise ValueError('%s does not hold a series of frames.'%npzfile)
+        write_time_series_topology(h5file, data['points'], data['connectivity'], data['offsets'], data['cell_types'],
+            {'displacement': 3, 'stress': 6}, data['node_labels'])
+        for frame in frames:
+            append_time_series_frame(h5file, frame, float(data['value_%i'%frame]),
+                {'displacement': data['displacement_%i'%frame], 'stress': data['stress_%i'%frame]})
+    print('Wrote %i frames to %s.'%(len(frames), h5file))
+
+def npz_convert(npzfile, outfile, fiducial_file=None, binary=True, frame=None, scale=1.0):
+    '''
+    Writes the deformed mesh, stress components and their invariants held in npzfile to outfile (*.vtu, *.vtk or *.OpenRS), and the fiducial sets to fiducial_file if specified. If binary is False, *.vtu files are written as ascii rather than compressed binary. For series archives, frame selects the frame number to write (the last by default), or all frames are written to a time series store if outfile is *.h5.
+    Displacements (including those of fiducials) and stresses are multiplied by scale, which gives the result of a linear elastic model under a proportionally scaled load (see superposition.py).
+    '''
+    from OpenRS.generate.stress_tools import stress_point_data
+    from OpenRS.generate.vtu_writer import write_ug
+
+    if outfile.endswith('.h5'):
+        npz_to_time_series(npzfile, outfile)
+        return
+
+    data = read_npz(npzfile, frame)
+    points = data['points'] + scale*data['displacement']
+    point_data = stress_point_data(scale*data['stress'])
+    if outfile.endswith('.OpenRS'):
+        from OpenRS.open_rs_hdf5_io import write_model_arrays
+        write_model_arrays(outfile, points, data['connectivity'], data['offsets'], data['cell_types'], point_data)
+    else:
+        write_ug(outfile, points, data['connectivity'], data['offsets'], data['cell_types'], point_data, binary=binary)
+    print('Wrote %s.'%outfile)
+
+    if fiducial_file is not None:
+        with open(fiducial_file, 'w') as f:
+            if scale != 1.0:
+                index = np.zeros(data['node_labels'].max()+1, dtype=np.int64)
+                index[data['node_labels']] = np.arange(len(data['node_labels']))
+            for name, values in data['fiducials']:
+                if scale != 1.0:
+                    undeformed = data['points'][index[values[:,0].astype(np.int64)]]
+                    values = values.copy()
+                    values[:,1:4] = undeformed + scale*(values[:,1:4] - undeformed)
+                f.write('%s%s\n'%(FIDUCIAL_PREFIX, name))
+                np.savetxt(f, values)
+        print('Wrote %s.'%fiducial_file)
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Convert an *.npz archive written by odb_access*.py to *.vtu, *.vtk, *.OpenRS or a time series *.h5 store.')
+    parser.add_argument('npz', help='archive written by odb_access*.py')
+    parser.add_argument('outfile', help='output file, format according to extension: *.vtu, *.vtk, *.OpenRS or *.h5 (all frames of a series archive)')
+    parser.add_argument('--frame', type=int, help='frame number of a series archive to write, defaults to last')
+    parser.add_argument('--fiducial', help='fiducial output file, not written if omitted')
+    parser.add_argument('--ascii', action='store_true', help='write ascii rather than binary *.vtu')
+    args = parser.parse_args()
+
+    if not os.path.isfile(args.npz):
+        sys.exit('Specified npz file %s not valid.'%args.npz)
+    try:
+        npz_convert(args.npz, args.outfile, args.fiducial, binary=not args.ascii, frame=args.frame)
+    except ValueError as e:
+        sys.exit(str(e))
@@ -0,0 +1,36 @@
+'''
+Helpers for extracting arrays from ABAQUS output databases without iterating over individual field values, shared between odb_access.py and odb_access_plastic.py. Field values are read through the bulkDataBlocks interface, which returns each block of values as numpy arrays.
+NB: this module is imported by ABAQUS Python scripts, and therefore needs to remain Python 2.7 compatible.
+(c) M. J. Roy 2021
+'''
+import numpy as np
+
+def bulk_values(field, labels='nodeLabels'):
+    '''
+    Returns the labels (by default node labels; 'elementLabels' for element-based values) and an NxM array of data of all values of an ODB field output or subset, concatenated over its bulkDataBlocks.
+    '''
+    out_labels, data = [np.zeros(0, dtype=np.int64)], [np.zeros((0, max(len(field.componentLabels), 1)))]
+    for b in field.bulkDataBlocks:
+        l = np.asarray(getattr(b, labels), dtype=np.int64).ravel()
+        out_labels.append(l)
+        data.append(np.asarray(b.data, dtype=np.float64).reshape(len(l), -1))
+    if len(data) > 1:
+        out_labels, data = out_labels[1:], data[1:]
+    return np.concatenate(out_labels), np.concatenate(data)
+
+def node_coordinates(nodes):
+    '''
+    Returns node labels and an Nx3 array of coordinates of a sequence of ODB nodes.
+    '''
+    labels = np.array([n.label for n in nodes], dtype=np.int64)
+    coordinates = np.array([n.coordinates for n in nodes], dtype=np.float64).reshape(-1, 3)
+    return labels, coordinates
+
+def label_index(labels):
+    '''
+    Returns an array mapping labels (i.e. node numbers, which need not be contiguous) onto their position in labels.
+    '''
+    labels = np.asarray(labels, dtype=np.int64)
+    index = np.zeros(labels.max()+1, dtype=np.int64)
+    index[labels] = np.arange(len(labels))
+    return index
@@ -2,7 +2,7 @@
 Python script for generating a model of an EASI-STRESS elastically loaded U-bend specimen. The script operates sequentially according to:
 1) Runs an Abaqus Python preprocessing script "build_model.py" with Abaqus CAE to generate an abaqus input deck without material assignment or boundary conditions (a mesh). build_model.py requires the arguments of a provided *.STEP file, and global mesh size/density.
 2) Appends boundary conditions and material properties to the input deck generated in (1), generates an input deck with material properties and boundary conditions, and submits it to the Abaqus solver.
-3) The resulting output database from (2) is processed with an Abaqus Python script "odb_access.py", which generates an ASCII-based *.vtu (VTK unstructured grid) suitable for further postprocessing with ParaView. A further *fid.txt file is generated containing the displaced node numbers and coordinates of the fiducial markers. These latter two files have the same prefixes as `run_file_name`.
+3) The resulting output database from (2) is processed with an Abaqus Python script "odb_access.py", which generates a compressed binary *.vtu (VTK unstructured grid) suitable for further postprocessing with ParaView. A further *fid.txt file is generated containing the displaced node numbers and coordinates of the fiducial markers. These latter two files have the same prefixes as `run_file_name`.
 See accompanying documentation where available.
 NB: Relies on 'abaqus' being available at the command line, and the provided *.STEP file(s) being available.
 (c) M. J. Roy 2021
@@ -12,7 +12,12 @@ import subprocess as subproc
 import sys
 import glob
 
-def run_packager(disp=1.0):
+def run_packager(disp=1.0, npz=False, cache_dir=None):
+    '''
+    Builds, runs and postprocesses the elastic U-bend model with ABAQUS. If npz is True, odb_access.py hands results over as raw arrays (*.npz) which are converted to *.vtu by npz_interchange outside of ABAQUS.
+    If cache_dir is specified, results are cached against the assembled input deck and ABAQUS installation (see result_cache.py), and the solution and postprocessing of an identical deck are skipped in favour of the cached result.
+    '''
+    from OpenRS.generate.result_cache import solver_id, cache_key, cache_fetch, cache_store
     #block to run abaqus cae with appropriate pass-through, returns successful if inp file is created.
     step_file_name = r'..\geometry\U_elastic_imp_fid.STEP'
     mesh_density = 1 #mm
@@ -54,9 +59,17 @@ def run_packager(disp=1.0):
     '''%(disp/2,-disp/2)
 
     with open(mesh_file_name) as mesh:
-        with open(run_file_name, "w+") as run:
-            run.write(mesh.read())
-            run.write(appended_details)
+        deck = mesh.read() + appended_details
+
+    prefix = os.path.splitext(run_file_name)[0]
+    vtu_file = os.path.join(outputdir,prefix+'.vtu')
+    fid_file = os.path.join(outputdir,prefix+'_fid.txt')
+    key = cache_key(deck, solver_id('abaqus'), '.vtu') if cache_dir is not None else None
+    if cache_fetch(cache_dir, key, vtu_file, fid_file) is not None:
+        return
+
+    with open(run_file_name, "w+") as run:
+        run.write(deck)
     try:
         #submit the job and run it, ask_delete bypasses old job file check
         arg_inp="abaqus job=%s int ask_delete=OFF"%os.path.splitext(run_file_name)[0]
@@ -66,11 +79,12 @@ def run_packager(disp=1.0):
         sys.exit()
 
     #run abaqus python script to get stresses at nodes written to an ascii file, and run clean up.
-    prefix = os.path.splitext(run_file_name)[0]
-
-
-    arg_inp="abaqus python odb_access.py %s %s %s"%(prefix+'.odb', os.path.join(outputdir,prefix+'.vtu'), os.path.join(outputdir,prefix+'_fid.txt'))
+    arg_inp="abaqus python odb_access.py %s %s %s"%(prefix+'.odb', prefix+'.npz' if npz else vtu_file, fid_file)
     run=subproc.check_output(arg_inp, shell=True) #use check_output instead
+    if npz:
+        from OpenRS.generate.npz_interchange import npz_convert
+        npz_convert(prefix+'.npz', vtu_file) #archive is removed on clean up
+    cache_store(cache_dir, key, vtu_file, fid_file)
 
     print('Finished data extraction. Cleaning up . . .')
     #clean up directory
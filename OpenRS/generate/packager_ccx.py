@@ -1,33 +1,47 @@
 '''
 Python script for generating a model of an EASI-STRESS elastically loaded U-bend specimen. The script operates sequentially according to:
 1) Appends boundary conditions and material properties to an input deck containing mesh information including subsequently referenced geometry, generating an input deck with material properties and boundary conditions, and submits it to the CalculiX solver.
-2) The resulting output database from (2) is processed with a standard Python script "frd_access.py", which generates an ASCII-based *.vtu (VTK unstructured grid) suitable for further postprocessing with ParaView. A further *fid.txt file is generated containing the displaced node numbers and coordinates of the fiducial markers. See accompanying documentation.
+2) The resulting output database from (2) is processed with a standard Python script "frd_access.py", which generates a compressed binary *.vtu (VTK unstructured grid) suitable for further postprocessing with ParaView. A further *fid.txt file is generated containing the displaced node numbers and coordinates of the fiducial markers. See accompanying documentation.
 Relies on full path to CalculiX executable being specified below.
 (c) M. J. Roy 2021
 '''
 
 import os
-import subprocess as subproc
-import sys
 import glob
-from OpenRS.generate.frd_access import postprocess
+from OpenRS.generate.frd_access import postprocess, postprocess_steps
+from OpenRS.generate.ccx_process import run_ccx, CcxCancelled
+from OpenRS.generate.solver_config import check_solver
+from OpenRS.generate.result_cache import DEFAULT_CACHE_SIZE, solver_id, cache_key, cache_fetch, cache_store
 
-def run_packager_ccx(mesh_file_name='U_elastic_mesh_only.inp', \
-            run_file_name='U_elastic_run_ccx.inp', \
-            disp = 1.0, \
-            ccx_exe = r'C:\Calculix\CL32-win64bit\bin\ccx\ccx213.exe', \
-            outputdir = r'..\examples'):
+def default_mesh():
+    '''
+    Returns the path to the mesh of the elastic U-bend distributed with OpenRS.
+    '''
+    import importlib.resources
+    resource = importlib.resources.files('OpenRS') / 'generate/U_elastic_mesh_only.inp'
+    with importlib.resources.as_file(resource) as path:
+        return str(path)
 
-    #displacement case
-    appended_details='''
+def material_details(youngs_modulus=2.05E5, poissons_ratio=0.3):
+    '''
+    Returns the section and material definition appended to the mesh.
+    '''
+    return '''
     *solid section, elset=all, material=S355
     **Properties for S355 are here:
     **https://www.sciencedirect.com/science/article/pii/S0141029616301249
     *material, name=S355
     *elastic, type=iso
-    2.05E5,0.3
-    *step
-    *static
+    %E,%f
+    '''%(youngs_modulus,poissons_ratio)
+
+def step_details(disp, solver=None):
+    '''
+    Returns a static step applying displacement disp across the U-bend, with the output requests needed for postprocessing. Boundary conditions of later steps replace those of earlier ones, so that each step of a deck is an independent load case of the linear model. solver selects the equation solver (see solver_config.SOLVERS), otherwise CalculiX chooses.
+    '''
+    solver = check_solver(solver)
+    return '''*step
+    *static%s
     *boundary
     left, 1,1,%f
     left, 2,2,
@@ -49,41 +63,144 @@ def run_packager_ccx(mesh_file_name='U_elastic_mesh_only.inp', \
     *el print, elset=all
     S
     *endstep
-    '''%(disp/2,-disp/2)
-
-    with open(mesh_file_name) as mesh:
-        with open(run_file_name, "w+") as run:
-            run.write(mesh.read())
-            run.write(appended_details)
+    '''%(', solver=%s'%solver if solver else '',disp/2,-disp/2)
 
+def _submit(ccx_exe, run_file_name, work_dir, binary, progress=None, cancel=None, threads=None, keep=()):
+    '''
+    Runs CalculiX on run_file_name in work_dir with ccx_process.run_ccx, raising RuntimeError on failure. If cancelled, the files of the job are removed from work_dir before CcxCancelled is raised, with other files cleaned up other than those with extensions in keep.
+    '''
     print('Wrote CalculiX input, running . . .')
     try:
-        #submit the job and run it
-        arg_inp="%s -i %s"%(ccx_exe,os.path.splitext(run_file_name)[0])
-        run=subproc.check_output(arg_inp, shell=True) #use check_output instead
-    except Exception as e:
-        print('Job submission failed with following command: %s. Exiting.'%arg_inp)
+        run_ccx(ccx_exe, run_file_name, work_dir, binary, progress, cancel, threads=threads)
+    except CcxCancelled:
+        prefix = os.path.splitext(run_file_name)[0]
+        for file in glob.glob(prefix + '.*'):
+            os.remove(file)
+        _clean_up(work_dir, keep)
+        raise
+    except RuntimeError as e:
         print(e)
-        sys.exit()
+        raise
+
+def _clean_up(work_dir, keep=()):
+    '''
+    Removes CalculiX artefacts from work_dir, other than files with extensions in keep.
+    '''
+    #clean up directory
+    preserve = ['.dat', '.odb', '.py', '.vtu', '.STEP', '.inp', '.txt', '.frd', '.idx', '.npz', '.OpenRS'] + list(keep) #extensions to preserve
+
+    dirlist = glob.glob(os.path.join(work_dir,'*.*'))
+    for file in dirlist:
+        if not file.endswith(tuple(preserve)):
+            os.remove(file)
+        if file.endswith('input.inp'): #CalculiX artefact
+            os.remove(file)
+
+def run_packager_ccx(mesh_file_name='U_elastic_mesh_only.inp', \
+            run_file_name='U_elastic_run_ccx.inp', \
+            disp = 1.0, \
+            ccx_exe = r'C:\Calculix\CL32-win64bit\bin\ccx\ccx213.exe', \
+            outputdir = r'..\examples', \
+            binary = False, \
+            work_dir = None, \
+            youngs_modulus = 2.05E5, \
+            poissons_ratio = 0.3, \
+            ext = '.vtu', \
+            cache_dir = None, \
+            cache_size = DEFAULT_CACHE_SIZE, \
+            progress = None, \
+            cancel = None, \
+            threads = None, \
+            solver = None):
+    '''
+    Assembles, runs and postprocesses the elastic U-bend model. If binary is True, CalculiX is asked to write the *.frd file in binary, which is smaller and faster to postprocess.
+    The input deck is written to, and CalculiX run in work_dir (the current working directory if None), and only files in work_dir are cleaned up afterwards, so that jobs in separate work directories can run concurrently. Elastic properties default to S355.
+    Results are written to outputdir in the format given by ext (see frd_access.postprocess).
+    If cache_dir is specified, results are cached against the assembled input deck and CalculiX executable (see result_cache.py), and an identical run is retrieved from the cache rather than solved again, with the cache bounded to cache_size bytes.
+    progress and cancel follow and abort the CalculiX run as per ccx_process.run_ccx; if cancelled, the files of the job are removed from work_dir and ccx_process.CcxCancelled raised.
+    threads and solver set the number of threads and equation solver CalculiX uses (see solver_config.py), otherwise these are left to the environment and CalculiX respectively.
+    Raises RuntimeError if CalculiX fails. Returns a dictionary of the 'outfile' and 'fiducial_file' written to outputdir, along with the number of nodes and elements as per frd_access.postprocess.
+    '''
+    if work_dir is None:
+        work_dir = os.getcwd()
+    run_file_name = os.path.join(work_dir, os.path.basename(run_file_name))
+
+    #displacement case
+    appended_details = material_details(youngs_modulus, poissons_ratio) + step_details(disp, solver)
+
+    with open(mesh_file_name) as mesh:
+        deck = mesh.read() + appended_details
 
     prefix = os.path.splitext(run_file_name)[0]
+    name = os.path.basename(prefix)
+    out = {'outfile': os.path.join(outputdir,name+ext), 'fiducial_file': os.path.join(outputdir,name+'_fid.txt')}
 
+    key = cache_key(deck, solver_id(ccx_exe), ext, binary) if cache_dir is not None else None
+    cached = cache_fetch(cache_dir, key, out['outfile'], out['fiducial_file'])
+    if cached is not None:
+        out.update(cached)
+        return out
+
+    with open(run_file_name, "w+") as run:
+        run.write(deck)
+
+    _submit(ccx_exe, run_file_name, work_dir, binary, progress, cancel, threads)
 
     #run post-processing Python function located in frd_access and run clean-up.
-    postprocess(prefix+'.frd', os.path.join(outputdir,prefix+'.vtu'), os.path.join(outputdir,prefix+'_fid.txt'))
+    result = postprocess(prefix+'.frd', out['outfile'], out['fiducial_file'])
+    cache_store(cache_dir, key, out['outfile'], out['fiducial_file'], result, cache_size)
+    out.update(result)
 
     print('Finished data extraction. Cleaning up . . .')
-    #clean up directory
-    ext = ['.dat', '.odb', '.py', '.vtu', '.STEP', '.inp', '.txt', '.frd'] #extensions to preserve
+    _clean_up(work_dir)
+    print('Complete.')
+    return out
 
-    dirlist = glob.glob(os.path.join(os.getcwd(),'*.*'))
-    for file in dirlist:
-        if not file.endswith(tuple(ext)):
-            os.remove(file)
-        if file.endswith('input.inp'): #CalculiX artefact
-            os.remove(file)
-            
+def run_load_cases(displacements, \
+            mesh_file_name='U_elastic_mesh_only.inp', \
+            run_file_name='U_elastic_load_cases_ccx.inp', \
+            ccx_exe = r'C:\Calculix\CL32-win64bit\bin\ccx\ccx213.exe', \
+            outputdir = r'..\examples', \
+            binary = False, \
+            work_dir = None, \
+            youngs_modulus = 2.05E5, \
+            poissons_ratio = 0.3, \
+            ext = '.vtu', \
+            progress = None, \
+            cancel = None, \
+            threads = None, \
+            solver = None):
+    '''
+    Solves the elastic U-bend model for several displacements with a single CalculiX run, as one deck with a static step per displacement, rather than a run each. The input is read and the model set up once for all load cases.
+    The results of each step are split into separate datasets by frd_access.postprocess_steps, written to outputdir as run_file_name prefix with _000, _001 etc. in order of displacements. Other arguments are as per run_packager_ccx.
+    Raises RuntimeError if CalculiX fails. Returns a list of dictionaries as per run_packager_ccx, one per displacement, with the 'disp' and 'step' of each.
+    '''
+    if work_dir is None:
+        work_dir = os.getcwd()
+    run_file_name = os.path.join(work_dir, os.path.basename(run_file_name))
+
+    appended_details = material_details(youngs_modulus, poissons_ratio) + ''.join([step_details(d, solver) for d in displacements])
+
+    with open(mesh_file_name) as mesh:
+        with open(run_file_name, "w+") as run:
+            run.write(mesh.read())
+            run.write(appended_details)
+
+    _submit(ccx_exe, run_file_name, work_dir, binary, progress, cancel, threads)
+
+    prefix = os.path.splitext(run_file_name)[0]
+    name = os.path.basename(prefix)
+    out = [{'disp': d, 'step': i+1, \
+        'outfile': os.path.join(outputdir,'%s_%03i%s'%(name,i,ext)), \
+        'fiducial_file': os.path.join(outputdir,'%s_%03i_fid.txt'%(name,i))} for i, d in enumerate(displacements)]
+    results = postprocess_steps(prefix+'.frd', [o['outfile'] for o in out], [o['fiducial_file'] for o in out], [o['step'] for o in out])
+    for o, result in zip(out, results):
+        o.update(result)
+
+    print('Finished data extraction. Cleaning up . . .')
+    _clean_up(work_dir)
     print('Complete.')
-    
+    return out
+
 if __name__ == "__main__":
     run_packager_ccx()
\ No newline at end of file
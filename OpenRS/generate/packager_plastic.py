@@ -1,35 +1,44 @@
 '''
 Python script for generating a model of an EASI-STRESS plastically deformed U-bend specimen. The script operates sequentially according to:
 1) Runs an Abaqus Python preprocessing script "build_model.py" with Abaqus CAE to generate an abaqus input deck without material assignment or boundary conditions (a mesh). build_model.py requires the arguments of a provided *.STEP file, and global mesh size/density.
-2) Appends boundary conditions and material properties to the input deck generated in (1), generates an input deck with material properties and boundary conditions, and submits it to the Abaqus solver.
-3) The resulting output database from (2) is processed with an Abaqus Python script "odb_access.py", which generates an ASCII-based *.vtu (VTK unstructured grid) suitable for further postprocessing with ParaView. A further *fid.txt file is generated containing the displaced node numbers and coordinates of the fiducial markers. These latter two files have the same prefixes as `run_file_name`.
+2) Appends boundary conditions and material properties to the input deck generated in (1), with a step moving the plunger to each of the specified displacements in turn, generates an input deck with material properties and boundary conditions, and submits it to the Abaqus solver.
+3) The resulting output database from (2) is processed with an Abaqus Python script "odb_access.py", which generates a compressed binary *.vtu (VTK unstructured grid) suitable for further postprocessing with ParaView. A further *fid.txt file is generated containing the displaced node numbers and coordinates of the fiducial markers. These latter two files have the same prefixes as `run_file_name`.
+Restart data of the last converged increment is kept along with the results, so that an analysis can be continued with further steps (i.e. a longer stroke, or withdrawing the plunger to unload) with continue_packager_plastic, rather than solving the whole loading history again. An analysis which stopped part way through a step continues from its last converged increment.
 See accompanying documentation where available.
 NB: Relies on 'abaqus' being available at the command line
 (c) M. J. Roy 2021
 '''
 import os
+import re
 import subprocess as subproc
 import sys
 import glob
 
-#block to run abaqus cae with appropriate pass-through, returns successful if inp file is created.
-mesh_density = 2 #mm
-mesh_file_name = 'U_plastic_mesh_only.inp'
-run_file_name = 'U_plastic_run.inp'
-plunger_displacement = 100
-
-#run cae script held in build_model.py using subprocess
-#arg 1: mesh density
-arg_inp="abaqus cae noGUI=build_model_plastic.py -- %f"%(mesh_density)
-try:
-    run=subproc.check_output(arg_inp, shell=True)
-except:
-    print('mesh generation failed')
-    
-#will generate mesh_file_name
-
-#displacement case
-appended_details='''
+#extensions to preserve on clean up, including those needed to restart
+KEEP_EXTENSIONS = ['.dat', '.odb', '.py', '.vtu', '.STEP', '.inp', '.txt']
+RESTART_EXTENSIONS = ['.res', '.mdl', '.stt', '.prt', '.sim', '.sta', '.msg']
+
+#step, increment, attempt (suffixed U if cut back) of a line of a *.sta file
+STA_LINE = re.compile(r'^\s*(\d+)\s+(\d+)\s+(\d+)(U?)\s')
+
+def build_mesh(mesh_density=2, mesh_file_name='U_plastic_mesh_only.inp'):
+    '''
+    Runs build_model_plastic.py with ABAQUS CAE to write a mesh of nominal element size mesh_density (mm) to mesh_file_name.
+    '''
+    #run cae script held in build_model.py using subprocess
+    #arg 1: mesh density
+    arg_inp="abaqus cae noGUI=build_model_plastic.py -- %f"%(mesh_density)
+    try:
+        run=subproc.check_output(arg_inp, shell=True)
+    except:
+        print('mesh generation failed')
+    #will generate mesh_file_name
+
+def material_details():
+    '''
+    Returns the material, contact and initial boundary conditions appended to the mesh.
+    '''
+    return '''
 **
 **Create material properties
 **
@@ -64,49 +73,134 @@ Roller-1-RefPt_, 1,1,
 Roller-1-RefPt_, 3,6,
 Roller-2-RefPt_, 1,6,
 Roller-3-RefPt_, 1,6,
-**
-** Step 1
+'''
+
+def stroke_step(plunger_displacement):
+    '''
+    Returns a step moving the plunger to plunger_displacement below its starting position; steps towards a smaller displacement than the last withdraw the plunger, unloading the blank. Restart data is written for each increment, overwriting that of the last (OVERLAY), so that only the last converged increment is kept.
+    '''
+    return '''**
+** Plunger to %f
 **
 *STEP, INC=1000, NLGEOM=YES
 *STATIC, STABILIZE=0.0002, ALLSDTOL=0.05, CONTINUE=NO
 .0001,1.0,1.E-8,1
 *BOUNDARY
 Roller-1-RefPt_, 2,2, -%f
+*RESTART, WRITE, OVERLAY, FREQUENCY=1
 *output, field, frequency=10, variable=preselect
 *el print, elset=all, freq=1
 coord, S
 *node print, nset=all, freq=1
 U
 *end step
-'''%(plunger_displacement)
+'''%(plunger_displacement, plunger_displacement)
 
-with open(mesh_file_name) as mesh:
-    with open(run_file_name, "w+") as run:
-        run.write(mesh.read())
-        run.write(appended_details)
-try:
-    #submit the job and run it, ask_delete bypasses old job file check
-    arg_inp="abaqus job=%s int ask_delete=OFF"%os.path.splitext(run_file_name)[0]
+def last_increment(sta_file):
+    '''
+    Returns the step, increment and step time of the last converged increment listed in the status (*.sta) file of an ABAQUS or CalculiX analysis, or None if there are none.
+    '''
+    last = None
+    with open(sta_file) as f:
+        for line in f:
+            m = STA_LINE.match(line)
+            if m is not None and not m.group(4):
+                last = (int(m.group(1)), int(m.group(2)), float(line.split()[-2]))
+    return last
+
+def restart_details(sta_file, period=1.0):
+    '''
+    Returns the *RESTART card continuing the analysis of sta_file from its last converged increment, which carries on with the rest of its step if it is incomplete (step time short of period).
+    '''
+    last = last_increment(sta_file)
+    if last is None:
+        raise RuntimeError('No converged increments to restart from in %s.'%sta_file)
+    step, increment, step_time = last
+    if step_time < period*(1 - 1e-6):
+        return '*RESTART, READ, STEP=%i, INC=%i\n'%(step, increment)
+    return '*RESTART, READ, STEP=%i\n'%step
+
+def _submit(run_file_name, old_run_file_name=None):
+    '''
+    Runs ABAQUS on run_file_name, restarting from old_run_file_name if specified.
+    '''
+    job = os.path.splitext(run_file_name)[0]
+    try:
+        #submit the job and run it, ask_delete bypasses old job file check
+        arg_inp="abaqus job=%s int ask_delete=OFF"%job
+        if old_run_file_name is not None:
+            arg_inp += " oldjob=%s"%os.path.splitext(old_run_file_name)[0]
+        run=subproc.check_output(arg_inp, shell=True) #use check_output instead
+    except:
+        print('Job submission failed. Exiting.')
+        sys.exit()
+
+def _postprocess(run_file_name, outputdir):
+    '''
+    Runs odb_access_plastic.py on the output database of run_file_name, writing the last frame of its last step to outputdir, and cleans up.
+    '''
+    #run abaqus python script to get stresses at nodes written to an ascii file, and run clean up.
+    prefix = os.path.splitext(run_file_name)[0]
+    outfile = os.path.join(outputdir,prefix+'.vtu')
+    arg_inp="abaqus python odb_access_plastic.py %s %s"%(prefix+'.odb', outfile)
     run=subproc.check_output(arg_inp, shell=True) #use check_output instead
-except:
-    print('Job submission failed. Exiting.')
-    sys.exit()
 
+    print('Finished data extraction. Cleaning up . . .')
+    #clean up directory
+    ext = KEEP_EXTENSIONS + RESTART_EXTENSIONS
+    dirlist = glob.glob(os.path.join(os.getcwd(),'*.*'))
+    for file in dirlist:
+        if not file.endswith(tuple(ext)):
+            os.remove(file)
 
-#run abaqus python script to get stresses at nodes written to an ascii file, and run clean up.
-prefix = os.path.splitext(run_file_name)[0]
-outputdir = 'examples'
+    print('Complete.')
+    return outfile
 
-arg_inp="abaqus python odb_access_plastic.py %s %s"%(prefix+'.odb', os.path.join(outputdir,prefix+'.vtu'))
-run=subproc.check_output(arg_inp, shell=True) #use check_output instead
+def run_packager_plastic(plunger_displacements=(100,), mesh_density=2, run_file_name='U_plastic_run.inp', outputdir='examples'):
+    '''
+    Builds, runs and postprocesses the plastic U-bend model with ABAQUS, with a step moving the plunger to each of plunger_displacements in turn. Returns the path of the output written.
+    '''
+    mesh_file_name = 'U_plastic_mesh_only.inp'
+    build_mesh(mesh_density, mesh_file_name)
 
-print('Finished data extraction. Cleaning up . . .')
-#clean up directory
-ext = ['.dat', '.odb', '.py', '.vtu', '.STEP', '.inp', '.txt'] #extensions to preserve
+    with open(mesh_file_name) as mesh:
+        with open(run_file_name, "w+") as run:
+            run.write(mesh.read())
+            run.write(material_details())
+            for d in plunger_displacements:
+                run.write(stroke_step(d))
+    _submit(run_file_name)
+    return _postprocess(run_file_name, outputdir)
+
+def continue_packager_plastic(plunger_displacements, old_run_file_name='U_plastic_run.inp', run_file_name=None, outputdir='examples'):
+    '''
+    Continues the analysis of old_run_file_name from its last converged increment with a step moving the plunger to each of plunger_displacements in turn, i.e. (120,) extends a stroke of 100, and (100, 0) completes it then withdraws the plunger. Restart files of old_run_file_name are needed in the working directory. The restart job (run_file_name, defaulting to that of the old job suffixed '_restart') can itself be continued. Returns the path of the output written, which holds only the new steps.
+    '''
+    old_prefix = os.path.splitext(old_run_file_name)[0]
+    if run_file_name is None:
+        run_file_name = old_prefix + '_restart.inp'
+    if os.path.splitext(run_file_name)[0] == old_prefix:
+        raise ValueError('A restart job needs a different name to the job it continues.')
+
+    with open(run_file_name, "w+") as run:
+        run.write('*HEADING\n')
+        run.write(restart_details(old_prefix + '.sta'))
+        for d in plunger_displacements:
+            run.write(stroke_step(d))
+    _submit(run_file_name, old_run_file_name)
+    return _postprocess(run_file_name, outputdir)
 
-dirlist = glob.glob(os.path.join(os.getcwd(),'*.*'))
-for file in dirlist:
-    if not file.endswith(tuple(ext)):
-        os.remove(file)
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Build, solve and postprocess the plastic U-bend model with ABAQUS, or continue a previous analysis.')
+    parser.add_argument('-d', '--displacement', type=float, nargs='+', default=[100], help='plunger displacement of each step (mm)')
+    parser.add_argument('-m', '--mesh-density', type=float, default=2, help='nominal element size (mm)')
+    parser.add_argument('-o', '--outputdir', default='examples', help='directory to write results to')
+    parser.add_argument('-c', '--continue', dest='old_job', help='input deck of an analysis to continue from its last converged increment')
+    parser.add_argument('-j', '--job', help='input deck to write, defaults to U_plastic_run.inp, or that continued suffixed _restart')
+    args = parser.parse_args()
 
-print('Complete.')
\ No newline at end of file
+    if args.old_job is not None:
+        continue_packager_plastic(args.displacement, args.old_job, args.job, args.outputdir)
+    else:
+        run_packager_plastic(args.displacement, args.mesh_density, args.job or 'U_plastic_run.inp', args.outputdir)
@@ -0,0 +1,254 @@
+'''
+Python script for generating a model of an EASI-STRESS plastically deformed U-bend specimen with CalculiX, mirroring "packager_plastic.py". The script operates sequentially according to:
+1) Generates a mesh of the blank and rollers with "build_mesh_plastic.py".
+2) Appends material properties, contact and boundary conditions, with a step moving the plunger to each of the specified displacements in turn, and submits it to CalculiX.
+3) The last increment of the last step is processed with "frd_access.py", and written without the rollers to *.vtu, *.OpenRS or *.npz.
+CalculiX writes restart data (*.rout) at the end of each step, which is kept in the working directory along with the status (*.sta) file. An analysis is continued with further steps (i.e. a longer stroke, or withdrawing the plunger to unload) by continue_packager_plastic_ccx, rather than solving the whole loading history again. As restart data is only written at the ends of steps, a step that did not complete is solved again from its start before any further steps.
+(c) M. J. Roy 2021
+'''
+
+import os
+import re
+import shutil
+import numpy as np
+from OpenRS.generate.frd_access import postprocess
+from OpenRS.generate.packager_ccx import _submit, _clean_up
+from OpenRS.generate.ccx_process import RESTART_READ_LINE
+from OpenRS.generate.packager_plastic import last_increment
+from OpenRS.generate.build_mesh_plastic import build_mesh_plastic
+
+MESH_FILE = 'U_plastic_mesh_only_ccx.inp'
+RESTART_EXTENSIONS = ['.rout', '.rin', '.sta'] #kept on clean up
+
+PLUNGER_LINE = re.compile(r'^\s*roller1\s*,\s*2\s*,\s*2\s*,\s*(\S+)', re.IGNORECASE)
+
+def material_details():
+    '''
+    Returns the material, contact and initial boundary conditions appended to the mesh. Rollers are held in place, other than the plunger (roller1) moving vertically, by displacements of all of their nodes.
+    '''
+    return '''
+**
+**Create material properties
+**
+*SOLID SECTION, MATERIAL=STEEL, ELSET=all
+*SOLID SECTION, MATERIAL=STEEL, ELSET=rollers
+*MATERIAL, NAME=STEEL
+*ELASTIC
+200000,0.3
+*PLASTIC
+400, 0.0E-2
+420, 2.0E-2
+500,20.0E-2
+600,50.0E-2
+**
+** Contact definition
+**
+*CONTACT PAIR, INTERACTION=FRIC, TYPE=SURFACE TO SURFACE
+TOP, R1_SURF
+*CONTACT PAIR, INTERACTION=FRIC, TYPE=SURFACE TO SURFACE
+BOTTOM, R2_SURF
+*CONTACT PAIR, INTERACTION=FRIC, TYPE=SURFACE TO SURFACE
+BOTTOM, R3_SURF
+*SURFACE INTERACTION, NAME=FRIC
+*SURFACE BEHAVIOR, PRESSURE-OVERCLOSURE=LINEAR
+1.E5, 1.
+*FRICTION
+0.1, 1.E4
+**
+**Initial BCs
+**
+*BOUNDARY
+xy_midplane, 3,3
+yz_midplane, 1,1
+roller1, 1,1
+roller1, 3,3
+roller2, 1,3
+roller3, 1,3
+'''
+
+def stroke_step(plunger_displacement):
+    '''
+    Returns a step moving the plunger to plunger_displacement below its starting position; steps towards a smaller displacement than the last withdraw the plunger, unloading the blank. Restart data is written at the end of the step.
+    '''
+    return '''**
+** Plunger to %f
+**
+*STEP, NLGEOM, INC=1000
+*STATIC
+0.01,1.0,1.E-8,0.05
+*BOUNDARY
+roller1, 2,2, -%f
+*RESTART, WRITE, FREQUENCY=1
+*NODE FILE
+U
+*EL FILE
+S
+*END STEP
+'''%(plunger_displacement, plunger_displacement)
+
+def deck_plunger_steps(inp_file):
+    '''
+    Returns the number of the step a deck restarts from (0 if it does not) and the plunger displacement of each of its steps, as written by stroke_step.
+    '''
+    offset, displacements = 0, []
+    with open(inp_file) as f:
+        for line in f:
+            restart, plunger = RESTART_READ_LINE.match(line), PLUNGER_LINE.match(line)
+            if restart is not None:
+                offset = int(restart.group(1))
+            elif line.strip().lower().startswith('*step'):
+                displacements.append(None)
+            elif plunger is not None and displacements:
+                displacements[-1] = -float(plunger.group(1))
+    return offset, displacements
+
+def _blank_nodes(mesh_file_name):
+    '''
+    Returns the node numbers of the set 'all' of mesh_file_name, being those of the blank as written by build_mesh_plastic.
+    '''
+    labels, reading = [], False
+    with open(mesh_file_name) as f:
+        for line in f:
+            if line.startswith('*'):
+                reading = line.replace(' ', '').lower().startswith('*nset,nset=all')
+                generate = 'generate' in line.lower()
+            elif reading:
+                values = [int(v) for v in line.split(',') if v.strip()]
+                labels.extend(range(values[0], values[1]+1, values[2] if len(values) > 2 else 1) if generate else values)
+    return np.array(labels, dtype=np.int64)
+
+def _blank_only(npz_file, blank_nodes):
+    '''
+    Rewrites the results of npz_file with only the points and cells of blank_nodes.
+    '''
+    from OpenRS.generate.npz_interchange import read_npz, write_npz
+    data = read_npz(npz_file)
+    keep_point = np.isin(data['node_labels'], blank_nodes)
+    sizes = np.diff(np.concatenate(([0], data['offsets'])))
+    cell = np.repeat(np.arange(len(sizes)), sizes)
+    keep_cell = np.ones(len(sizes), dtype=bool)
+    np.logical_and.at(keep_cell, cell, keep_point[data['connectivity']])
+    index = np.cumsum(keep_point) - 1
+    write_npz(npz_file, data['points'][keep_point], index[data['connectivity'][keep_cell[cell]]], np.cumsum(sizes[keep_cell]), \
+        data['cell_types'][keep_cell], data['displacement'][keep_point], data['stress'][keep_point], \
+        node_labels=data['node_labels'][keep_point])
+
+def _postprocess(run_file_name, mesh_file_name, outputdir, ext, binary, work_dir):
+    '''
+    Writes the last increment of the last step of run_file_name to outputdir without the rollers, and cleans up work_dir other than restart files.
+    '''
+    from OpenRS.generate.npz_interchange import npz_convert
+    prefix = os.path.splitext(run_file_name)[0]
+    name = os.path.basename(prefix)
+    outfile = os.path.join(outputdir, name + ext)
+    npz_file = prefix + '_all.npz'
+    result = postprocess(prefix + '.frd', npz_file, prefix + '_fid.txt', fiducial_sets=[])
+    os.remove(prefix + '_fid.txt')
+    _blank_only(npz_file, _blank_nodes(mesh_file_name))
+    if ext == '.npz':
+        shutil.move(npz_file, outfile)
+    else:
+        npz_convert(npz_file, outfile, binary=binary)
+        os.remove(npz_file)
+
+    print('Finished data extraction. Cleaning up . . .')
+    _clean_up(work_dir, RESTART_EXTENSIONS)
+    print('Complete.')
+    return {'outfile': outfile, 'nodes': result['nodes'], 'elements': result['elements']}
+
+def run_packager_plastic_ccx(plunger_displacements=(100,), \
+            ccx_exe = r'C:\Calculix\CL32-win64bit\bin\ccx\ccx213.exe', \
+            outputdir = r'..\examples', \
+            mesh_density = 2.0, \
+            run_file_name = 'U_plastic_run_ccx.inp', \
+            work_dir = None, \
+            ext = '.vtu', \
+            binary = False, \
+            progress = None, \
+            cancel = None, \
+            threads = None):
+    '''
+    Meshes, runs and postprocesses the plastic U-bend model with CalculiX, with a step moving the plunger to each of plunger_displacements in turn. The mesh (MESH_FILE) and input deck are written to, and CalculiX run in work_dir (the current working directory if None), where restart files are kept for continue_packager_plastic_ccx. Other arguments are as per packager_ccx.run_packager_ccx.
+    Raises RuntimeError if CalculiX fails. Returns a dictionary of the 'outfile' written to outputdir, along with the number of nodes and elements as per frd_access.postprocess (including rollers).
+    '''
+    if work_dir is None:
+        work_dir = os.getcwd()
+    run_file_name = os.path.join(work_dir, os.path.basename(run_file_name))
+    mesh_file_name = os.path.join(work_dir, MESH_FILE)
+    build_mesh_plastic(mesh_file_name, mesh_density)
+
+    with open(mesh_file_name) as mesh:
+        with open(run_file_name, "w+") as run:
+            run.write(mesh.read())
+            run.write(material_details())
+            for d in plunger_displacements:
+                run.write(stroke_step(d))
+
+    _submit(ccx_exe, run_file_name, work_dir, binary, progress, cancel, threads, RESTART_EXTENSIONS)
+    return _postprocess(run_file_name, mesh_file_name, outputdir, ext, binary, work_dir)
+
+def continue_packager_plastic_ccx(plunger_displacements, \
+            ccx_exe = r'C:\Calculix\CL32-win64bit\bin\ccx\ccx213.exe', \
+            outputdir = r'..\examples', \
+            old_run_file_name = 'U_plastic_run_ccx.inp', \
+            run_file_name = None, \
+            work_dir = None, \
+            ext = '.vtu', \
+            binary = False, \
+            progress = None, \
+            cancel = None, \
+            threads = None):
+    '''
+    Continues the analysis of old_run_file_name in work_dir from the end of its last completed step, with a step moving the plunger to each of plunger_displacements in turn, i.e. (120,) extends a stroke of 100, and (100, 0) withdraws the plunger afterwards. Any step of old_run_file_name that did not complete is solved again first. The restart job (run_file_name, defaulting to that of the old job suffixed '_restart') can itself be continued. Other arguments are as per run_packager_plastic_ccx.
+    Raises RuntimeError if there is nothing to restart from or CalculiX fails. Returns a dictionary as per run_packager_plastic_ccx, with 'resumed_step', the step continued from, and 'repeated', the plunger displacements of steps solved again.
+    '''
+    if work_dir is None:
+        work_dir = os.getcwd()
+    old_prefix = os.path.join(work_dir, os.path.splitext(os.path.basename(old_run_file_name))[0])
+    if run_file_name is None:
+        run_file_name = old_prefix + '_restart.inp'
+    run_file_name = os.path.join(work_dir, os.path.basename(run_file_name))
+    prefix = os.path.splitext(run_file_name)[0]
+    if prefix == old_prefix:
+        raise ValueError('A restart job needs a different name to the job it continues.')
+
+    #last completed step; restart data of the steps before the old job is that it read in turn
+    offset, old_steps = deck_plunger_steps(old_prefix + '.inp')
+    last = last_increment(old_prefix + '.sta') if os.path.isfile(old_prefix + '.sta') else None
+    completed = offset if last is None else (last[0] if last[2] >= 1 - 1e-6 else last[0] - 1)
+    restart_file = old_prefix + ('.rout' if completed > offset else '.rin')
+    if completed < offset or completed == 0 or not os.path.isfile(restart_file):
+        raise RuntimeError('No restart data of a completed step of %s to continue from.'%old_run_file_name)
+    shutil.copyfile(restart_file, prefix + '.rin')
+
+    repeated = old_steps[completed - offset:]
+    with open(run_file_name, "w+") as run:
+        run.write('*RESTART, READ, STEP=%i\n'%completed)
+        for d in repeated + list(plunger_displacements):
+            run.write(stroke_step(d))
+
+    _submit(ccx_exe, run_file_name, work_dir, binary, progress, cancel, threads, RESTART_EXTENSIONS)
+    out = _postprocess(run_file_name, os.path.join(work_dir, MESH_FILE), outputdir, ext, binary, work_dir)
+    out.update({'resumed_step': completed, 'repeated': repeated})
+    return out
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Mesh, solve and postprocess the plastic U-bend model with CalculiX, or continue a previous analysis.')
+    parser.add_argument('ccx_exe', help='full path to the CalculiX executable')
+    parser.add_argument('outputdir', help='directory to write results to')
+    parser.add_argument('-d', '--displacement', type=float, nargs='+', default=[100], help='plunger displacement of each step (mm)')
+    parser.add_argument('-m', '--mesh-density', type=float, default=2.0, help='nominal element size (mm)')
+    parser.add_argument('-w', '--work-dir', help='directory to run CalculiX in and keep restart files, defaults to the current one')
+    parser.add_argument('-c', '--continue', dest='old_job', help='input deck of an analysis in the work directory to continue')
+    parser.add_argument('-j', '--job', help='input deck to write, defaults to U_plastic_run_ccx.inp, or that continued suffixed _restart')
+    parser.add_argument('-e', '--ext', default='.vtu', choices=['.vtu', '.vtk', '.OpenRS', '.npz'], help='output format')
+    parser.add_argument('-t', '--threads', type=int, help='number of threads CalculiX uses')
+    args = parser.parse_args()
+
+    if args.old_job is not None:
+        continue_packager_plastic_ccx(args.displacement, args.ccx_exe, args.outputdir, args.old_job, args.job, \
+            args.work_dir, args.ext, threads=args.threads)
+    else:
+        run_packager_plastic_ccx(args.displacement, args.ccx_exe, args.outputdir, args.mesh_density, \
+            args.job or 'U_plastic_run_ccx.inp', args.work_dir, args.ext, threads=args.threads)
@@ -0,0 +1,111 @@
+'''
+Content-addressed cache of postprocessed finite element results. Entries are keyed by a hash of the complete input deck submitted to the solver, the identity of the solver executable and the requested output format, so that repeating a run on an identical specimen (mesh, boundary conditions and material) returns the stored result and fiducial file rather than solving again. Each entry is a subdirectory of the cache directory named by its key; the cache is bounded in size by evicting the least recently used entries.
+(c) M. J. Roy 2021
+'''
+
+import os
+import json
+import shutil
+import hashlib
+
+DEFAULT_CACHE_SIZE = 2**30 #bytes
+ENTRY_FILE = 'entry.json'
+
+def solver_id(exe):
+    '''
+    Returns a string identifying the solver executable exe by its resolved path, size and modification time, so that updating the solver invalidates cached results without having to run it.
+    '''
+    path = shutil.which(exe) or exe
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return os.path.abspath(path)
+    return '%s:%i:%i'%(os.path.realpath(path), stat.st_size, int(stat.st_mtime))
+
+def cache_key(deck, solver, ext, binary=True):
+    '''
+    Returns the sha256 hex digest of the input deck text, solver identity (see solver_id) and output format.
+    '''
+    h = hashlib.sha256()
+    for part in [deck, solver, ext, str(bool(binary))]:
+        h.update(part.encode('utf-8'))
+        h.update(b'\0')
+    return h.hexdigest()
+
+def _entry_size(entry_dir):
+    return sum([os.path.getsize(os.path.join(entry_dir, f)) for f in os.listdir(entry_dir)])
+
+def cache_fetch(cache_dir, key, outfile, fiducial_file):
+    '''
+    Copies the result and fiducial file held against key to outfile and fiducial_file, marking the entry as recently used. Returns the information stored with the entry (see cache_store), or None if there is no entry.
+    '''
+    if cache_dir is None:
+        return None
+    entry_dir = os.path.join(cache_dir, key)
+    entry_file = os.path.join(entry_dir, ENTRY_FILE)
+    if not os.path.isfile(entry_file):
+        return None
+    with open(entry_file) as f:
+        info = json.load(f)
+    shutil.copyfile(os.path.join(entry_dir, info['outfile']), outfile)
+    shutil.copyfile(os.path.join(entry_dir, info['fiducial_file']), fiducial_file)
+    os.utime(entry_file, None) #least recently used is by entry modification time
+    print('Retrieved cached result %s.'%key)
+    return info['result']
+
+def cache_store(cache_dir, key, outfile, fiducial_file, result=None, max_size=DEFAULT_CACHE_SIZE):
+    '''
+    Stores copies of outfile and fiducial_file against key, along with the dictionary result (i.e. as returned by frd_access.postprocess), then evicts least recently used entries until the cache is no larger than max_size bytes.
+    '''
+    if cache_dir is None:
+        return
+    entry_dir = os.path.join(cache_dir, key)
+    tmp_dir = entry_dir + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    info = {'outfile': 'result' + os.path.splitext(outfile)[1], 'fiducial_file': 'fiducials.txt', 'result': result or {}}
+    shutil.copyfile(outfile, os.path.join(tmp_dir, info['outfile']))
+    shutil.copyfile(fiducial_file, os.path.join(tmp_dir, info['fiducial_file']))
+    with open(os.path.join(tmp_dir, ENTRY_FILE), 'w') as f:
+        json.dump(info, f, indent=2)
+    #entries only appear once complete
+    shutil.rmtree(entry_dir, ignore_errors=True)
+    os.rename(tmp_dir, entry_dir)
+    evict(cache_dir, max_size)
+
+def evict(cache_dir, max_size=DEFAULT_CACHE_SIZE):
+    '''
+    Removes the least recently used entries of cache_dir until the total size of those remaining is no more than max_size bytes. Returns the keys removed.
+    '''
+    entries = []
+    for key in os.listdir(cache_dir):
+        entry_file = os.path.join(cache_dir, key, ENTRY_FILE)
+        if os.path.isfile(entry_file):
+            entries.append((os.path.getmtime(entry_file), key, _entry_size(os.path.join(cache_dir, key))))
+    entries.sort()
+    total = sum([e[2] for e in entries])
+    removed = []
+    for mtime, key, size in entries:
+        if total <= max_size:
+            break
+        shutil.rmtree(os.path.join(cache_dir, key), ignore_errors=True)
+        total -= size
+        removed.append(key)
+    return removed
+
+def clear(cache_dir):
+    '''
+    Removes all entries of cache_dir.
+    '''
+    return evict(cache_dir, 0)
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Manage a cache of finite element results.')
+    parser.add_argument('cache_dir', help='cache directory')
+    parser.add_argument('--max-size', type=float, default=DEFAULT_CACHE_SIZE/2**20, help='evict least recently used entries down to this size in MB')
+    parser.add_argument('--clear', action='store_true', help='remove all entries')
+    args = parser.parse_args()
+
+    removed = clear(args.cache_dir) if args.clear else evict(args.cache_dir, args.max_size*2**20)
+    print('Removed %i entries.'%len(removed))
@@ -0,0 +1,64 @@
+'''
+CalculiX threading and equation solver settings, held under 'FEA' in meta/OpenRSconfig.yml alongside the path to the CalculiX executable and working directory:
+threads - number of threads CalculiX uses, both for the equation solver and assembly/results (0 leaves it to the environment)
+max_jobs - number of jobs the calculation widget runs at once
+solver - equation solver of *STATIC steps, one of SOLVERS ('' leaves it to CalculiX, which uses the best available)
+(c) M. J. Roy 2021
+'''
+
+import os
+import importlib.resources
+
+SOLVERS = ['SPOOLES', 'PASTIX', 'PARDISO']
+FEA_DEFAULTS = {'ccx_exec': '', 'work_dir': '', 'threads': 0, 'solver': '', 'max_jobs': 1}
+THREAD_VARIABLES = ['OMP_NUM_THREADS', 'CCX_NPROC_EQUATION_SOLVER', 'CCX_NPROC_RESULTS', 'CCX_NPROC_STIFFNESS']
+
+def config_file():
+    '''
+    Returns the path to OpenRSconfig.yml.
+    '''
+    resource = importlib.resources.files('OpenRS') / 'meta/OpenRSconfig.yml'
+    with importlib.resources.as_file(resource) as path:
+        return str(path)
+
+def read_config():
+    '''
+    Returns the contents of OpenRSconfig.yml, with any missing FEA settings set to defaults.
+    '''
+    import yaml
+    with open(config_file(), 'r') as f:
+        read = yaml.load(f, Loader=yaml.FullLoader) or {}
+    fea = dict(FEA_DEFAULTS)
+    fea.update(read.get('FEA') or {})
+    read['FEA'] = fea
+    return read
+
+def write_fea_config(**settings):
+    '''
+    Updates the FEA settings of OpenRSconfig.yml with keyword arguments (see FEA_DEFAULTS), retaining all others.
+    '''
+    import yaml
+    data = read_config()
+    data['FEA'].update(settings)
+    with open(config_file(), 'w') as f:
+        yaml.dump(data, f, default_flow_style=False)
+
+def check_solver(solver):
+    '''
+    Returns solver in upper case, raising ValueError if it is not one of SOLVERS. Empty strings or None are returned as None.
+    '''
+    if not solver:
+        return None
+    if solver.upper() not in SOLVERS:
+        raise ValueError('Solver %s not supported; needs to be one of %s.'%(solver, ', '.join(SOLVERS)))
+    return solver.upper()
+
+def solver_env(threads=None, env=None):
+    '''
+    Returns a copy of env (the current environment if None) with all CalculiX thread counts set to threads, unchanged if threads is None or 0.
+    '''
+    env = dict(os.environ if env is None else env)
+    if threads:
+        for k in THREAD_VARIABLES:
+            env[k] = str(int(threads))
+    return env
@@ -0,0 +1,51 @@
+'''
+Vectorised stress tensor operations for postprocessing, returning point data for writing alongside finite element results. Stresses are handled as Nx6 arrays of S11, S22, S33, S12, S23, S13 (the CalculiX SXX, SYY, SZZ, SXY, SYZ, SZX order).
+(c) M. J. Roy 2021
+'''
+import numpy as np
+
+STRESS_COMPONENTS = ['S11', 'S22', 'S33', 'S12', 'S23', 'S13']
+
+def stress_tensor(s):
+    '''
+    Returns an Nx3x3 array of symmetric stress tensors from an Nx6 array of components.
+    '''
+    s = np.asarray(s, dtype=np.float64)
+    t = np.empty((len(s), 3, 3))
+    t[:, 0, 0], t[:, 1, 1], t[:, 2, 2] = s[:, 0], s[:, 1], s[:, 2]
+    t[:, 0, 1] = t[:, 1, 0] = s[:, 3]
+    t[:, 1, 2] = t[:, 2, 1] = s[:, 4]
+    t[:, 0, 2] = t[:, 2, 0] = s[:, 5]
+    return t
+
+def stress_invariants(s):
+    '''
+    Calculates derived quantities of an Nx6 array of stress components in a single pass over all points. Returns a dictionary of:
+    'Svm' - von Mises equivalent stress
+    'Shyd' - hydrostatic (mean) stress
+    'SP1', 'SP2', 'SP3' - maximum, intermediate and minimum principal stresses
+    'SP1_dir', 'SP2_dir', 'SP3_dir' - Nx3 unit vectors of the respective principal directions
+    '''
+    s = np.asarray(s, dtype=np.float64)
+    out = {}
+    out['Shyd'] = s[:, 0:3].sum(axis=1)/3
+    out['Svm'] = np.sqrt(0.5*((s[:, 0]-s[:, 1])**2 + (s[:, 1]-s[:, 2])**2 + (s[:, 2]-s[:, 0])**2) \
+        + 3*(s[:, 3]**2 + s[:, 4]**2 + s[:, 5]**2))
+
+    #eigenvalues are returned in ascending order, with eigenvectors as columns
+    w, v = np.linalg.eigh(stress_tensor(s))
+    for i in range(3):
+        out['SP%i'%(i+1)] = w[:, 2-i]
+        out['SP%i_dir'%(i+1)] = v[:, :, 2-i]
+    return out
+
+def stress_point_data(s):
+    '''
+    Returns a list of (name, array) pairs of all six stress components followed by the invariants calculated by stress_invariants, suitable for vtu_writer.write_ug.
+    '''
+    s = np.asarray(s, dtype=np.float64)
+    inv = stress_invariants(s)
+    point_data = [(name, s[:, i]) for i, name in enumerate(STRESS_COMPONENTS)]
+    for name in ['Svm', 'Shyd', 'SP1', 'SP2', 'SP3', 'SP1_dir', 'SP2_dir', 'SP3_dir']:
+        point_data.append((name, inv[name]))
+    return point_data
@@ -0,0 +1,122 @@
+'''
+Superposition of elastic U-bend results. As the elastic U-bend model is linear, displacements and stresses are proportional to the applied displacement boundary condition. The model is therefore solved once with CalculiX for a unit displacement, with the raw result cached as an *.npz archive (see npz_interchange.py), and the result for any other displacement (i.e. from open_rs_common.get_disp_from_fid) is obtained by scaling the cached fields rather than solving again. A full solve remains available, i.e. for checking the cache or where the model is no longer linear.
+(c) M. J. Roy 2021
+'''
+
+import os
+import shutil
+import tempfile
+from OpenRS.generate.packager_ccx import run_packager_ccx, default_mesh, material_details
+from OpenRS.generate.result_cache import cache_key, solver_id
+from OpenRS.generate.npz_interchange import npz_convert
+from OpenRS.generate.solver_config import SOLVERS
+
+def unit_cache_name(ccx_exe, mesh_file_name=None, youngs_modulus=2.05E5, poissons_ratio=0.3, binary=True, solver=None):
+    '''
+    Returns the file name of the unit displacement result cached for a mesh, set of elastic properties and solver. The name holds a digest of the text of the mesh rather than relying on its modification time, so that results of different meshes (i.e. of a mesh convergence study with build_mesh.py) are never confused.
+    '''
+    if mesh_file_name is None:
+        mesh_file_name = default_mesh()
+    with open(mesh_file_name, 'r') as f:
+        deck = f.read() + material_details(youngs_modulus, poissons_ratio) + str(solver)
+    key = cache_key(deck, solver_id(ccx_exe), '.npz', binary)
+    return 'U_elastic_unit_E%g_nu%g_%s.npz'%(youngs_modulus, poissons_ratio, key[:16])
+
+def build_unit_cache(ccx_exe, cache_dir, mesh_file_name=None, youngs_modulus=2.05E5, poissons_ratio=0.3, binary=True, progress=None, cancel=None, threads=None, solver=None):
+    '''
+    Solves the elastic U-bend model for a unit displacement in a temporary work directory, writing the raw result and fiducial sets to cache_dir. progress and cancel are as per ccx_process.run_ccx, and threads and solver as per packager_ccx.run_packager_ccx. Returns the path to the cached *.npz archive.
+    '''
+    if mesh_file_name is None:
+        mesh_file_name = default_mesh()
+    if not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir)
+    cache = os.path.join(cache_dir, unit_cache_name(ccx_exe, mesh_file_name, youngs_modulus, poissons_ratio, binary, solver))
+
+    work_dir = tempfile.mkdtemp(prefix='OpenRS_unit_')
+    try:
+        out = run_packager_ccx(mesh_file_name = os.path.abspath(mesh_file_name), \
+            run_file_name = 'U_elastic_unit.inp', \
+            disp = 1.0, \
+            ccx_exe = ccx_exe, \
+            outputdir = work_dir, \
+            binary = binary, \
+            work_dir = work_dir, \
+            youngs_modulus = youngs_modulus, \
+            poissons_ratio = poissons_ratio, \
+            ext = '.npz', \
+            progress = progress, \
+            cancel = cancel, \
+            threads = threads, \
+            solver = solver)
+        shutil.move(out['outfile'], cache) #only complete archives appear in the cache
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return cache
+
+def get_unit_cache(ccx_exe, cache_dir, mesh_file_name=None, youngs_modulus=2.05E5, poissons_ratio=0.3, binary=True, rebuild=False, progress=None, cancel=None, threads=None, solver=None):
+    '''
+    Returns the path to the cached unit displacement result, solving for it if it is not present for the mesh, elastic properties and solver (see unit_cache_name), or rebuild is True.
+    '''
+    if mesh_file_name is None:
+        mesh_file_name = default_mesh()
+    cache = os.path.join(cache_dir, unit_cache_name(ccx_exe, mesh_file_name, youngs_modulus, poissons_ratio, binary, solver))
+    if rebuild or not os.path.isfile(cache):
+        print('Building unit displacement cache . . .')
+        cache = build_unit_cache(ccx_exe, cache_dir, mesh_file_name, youngs_modulus, poissons_ratio, binary, progress, cancel, threads, solver)
+    return cache
+
+def run_elastic(disp, ccx_exe, outputdir, full_solve=False, cache_dir=None, mesh_file_name=None, youngs_modulus=2.05E5, poissons_ratio=0.3, ext='.vtu', binary=True, rebuild=False, result_cache_dir=None, progress=None, cancel=None, threads=None, solver=None):
+    '''
+    Writes the elastic U-bend result for displacement disp to outputdir as U_elastic_run_ccx with extension ext, along with U_elastic_run_ccx_fid.txt, as per packager_ccx.run_packager_ccx.
+    full_solve - run CalculiX for disp in outputdir, rather than scaling the cached unit displacement result
+    cache_dir - where the unit displacement result is cached, defaults to a 'unit_cache' subdirectory of outputdir
+    rebuild - solve for the unit displacement result again, even if cached
+    result_cache_dir - where results of full solves are cached against their input deck (see result_cache.py), not cached if None
+    progress, cancel - follow and abort any CalculiX run, as per ccx_process.run_ccx
+    threads, solver - number of threads and equation solver of any CalculiX run, as per packager_ccx.run_packager_ccx
+    Returns a dictionary of the 'outfile' and 'fiducial_file' written, with the 'cache' used if not full_solve.
+    '''
+    if full_solve:
+        return run_packager_ccx(mesh_file_name = default_mesh() if mesh_file_name is None else mesh_file_name, \
+            run_file_name = 'U_elastic_run_ccx.inp', \
+            disp = disp, \
+            ccx_exe = ccx_exe, \
+            outputdir = outputdir, \
+            binary = binary, \
+            work_dir = outputdir, \
+            youngs_modulus = youngs_modulus, \
+            poissons_ratio = poissons_ratio, \
+            ext = ext, \
+            cache_dir = result_cache_dir, \
+            progress = progress, \
+            cancel = cancel, \
+            threads = threads, \
+            solver = solver)
+
+    if cache_dir is None:
+        cache_dir = os.path.join(outputdir, 'unit_cache')
+    out = {'cache': get_unit_cache(ccx_exe, cache_dir, mesh_file_name, youngs_modulus, poissons_ratio, binary, rebuild, progress, cancel, threads, solver), \
+        'outfile': os.path.join(outputdir, 'U_elastic_run_ccx' + ext), \
+        'fiducial_file': os.path.join(outputdir, 'U_elastic_run_ccx_fid.txt')}
+    npz_convert(out['cache'], out['outfile'], out['fiducial_file'], binary=binary, scale=disp)
+    return out
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Write the elastic U-bend result for a displacement by scaling a cached unit displacement CalculiX result.')
+    parser.add_argument('disp', type=float, help='displacement boundary condition')
+    parser.add_argument('ccx_exe', help='full path to the CalculiX executable')
+    parser.add_argument('outputdir', help='directory where results are written')
+    parser.add_argument('-f', '--format', default='.vtu', choices=['.vtu', '.vtk', '.OpenRS'], help='output format')
+    parser.add_argument('-c', '--cache-dir', help='directory of cached unit displacement results, defaults to outputdir/unit_cache')
+    parser.add_argument('-E', '--youngs-modulus', type=float, default=2.05E5, help="Young's modulus")
+    parser.add_argument('--poissons-ratio', type=float, default=0.3, help="Poisson's ratio")
+    parser.add_argument('--full-solve', action='store_true', help='run CalculiX for disp rather than scaling the cached result')
+    parser.add_argument('--rebuild', action='store_true', help='solve for the unit displacement result again')
+    parser.add_argument('--result-cache', help='directory where results of full solves are cached')
+    parser.add_argument('-t', '--threads', type=int, help='number of threads CalculiX uses')
+    parser.add_argument('-s', '--solver', choices=SOLVERS, help='CalculiX equation solver')
+    args = parser.parse_args()
+
+    run_elastic(args.disp, args.ccx_exe, args.outputdir, args.full_solve, args.cache_dir, None, \
+        args.youngs_modulus, args.poissons_ratio, args.format, rebuild=args.rebuild, result_cache_dir=args.result_cache, threads=args.threads, solver=args.solver)
@@ -0,0 +1,131 @@
+'''
+Parametric sweeps of the elastic U-bend model with CalculiX. Each case is a dictionary of keyword arguments of packager_ccx.run_packager_ccx (i.e. 'disp', 'youngs_modulus' and 'poissons_ratio'), and is run in its own temporary work directory across a bounded pool of worker processes. Postprocessed results of all cases are collected in a common output directory, alongside a JSON manifest of the cases, timings and any failures.
+(c) M. J. Roy 2021
+'''
+
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import itertools
+import traceback
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from OpenRS.generate.packager_ccx import run_packager_ccx, default_mesh
+from OpenRS.generate.batch_postprocess import limit_threads
+
+def sweep_cases(displacements, youngs_moduli=(2.05E5,), poissons_ratios=(0.3,)):
+    '''
+    Returns a list of cases of every combination of displacement and elastic properties.
+    '''
+    return [{'disp': d, 'youngs_modulus': E, 'poissons_ratio': nu} \
+        for E, nu, d in itertools.product(youngs_moduli, poissons_ratios, displacements)]
+
+def _run_case(name, case, mesh_file_name, ccx_exe, outputdir, binary, keep_work_dir):
+    '''
+    Runs a single case in a new temporary directory, returning a manifest entry rather than raising.
+    '''
+    entry = {'name': name, 'case': case}
+    work_dir = tempfile.mkdtemp(prefix='OpenRS_%s_'%name)
+    start = time.perf_counter()
+    try:
+        entry.update(run_packager_ccx(mesh_file_name = mesh_file_name, \
+            run_file_name = name + '.inp', \
+            ccx_exe = ccx_exe, \
+            outputdir = outputdir, \
+            binary = binary, \
+            work_dir = work_dir, \
+            **case))
+        entry['status'] = 'ok'
+    except Exception as e:
+        entry['status'] = 'failed'
+        entry['error'] = '%s: %s'%(type(e).__name__, e)
+        entry['traceback'] = traceback.format_exc()
+    finally:
+        if keep_work_dir:
+            entry['work_dir'] = work_dir
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    entry['time'] = time.perf_counter() - start
+    return entry
+
+def run_sweep(cases, ccx_exe, outputdir, mesh_file_name=None, processes=None, threads_per_job=1, binary=True, keep_work_dirs=False, prefix='U_elastic_run_ccx', manifest='sweep_manifest.json'):
+    '''
+    Runs all cases across a pool of processes.
+    cases - list of dictionaries of keyword arguments to run_packager_ccx, see sweep_cases
+    ccx_exe - full path to the CalculiX executable
+    outputdir - where results of all cases are written, as prefix_000.vtu, prefix_000_fid.txt etc. in order of cases
+    mesh_file_name - mesh input deck, defaults to that distributed with OpenRS
+    processes - number of concurrent jobs, defaults to the number of cores divided by threads_per_job
+    threads_per_job - number of threads each CalculiX job may use
+    binary - ask CalculiX for binary *.frd output, which is faster to postprocess
+    keep_work_dirs - retain the temporary work directory of each case, i.e. for debugging
+    manifest - name of the JSON summary written to outputdir, None to skip
+    Returns the list of manifest entries, one per case in order.
+    '''
+    if mesh_file_name is None:
+        mesh_file_name = default_mesh()
+    mesh_file_name = os.path.abspath(mesh_file_name)
+    outputdir = os.path.abspath(outputdir)
+    if not os.path.isdir(outputdir):
+        os.makedirs(outputdir)
+    if processes is None:
+        processes = max(1, os.cpu_count() // threads_per_job)
+    processes = max(1, min(processes, len(cases)))
+
+    names = ['%s_%03i'%(prefix, i) for i in range(len(cases))]
+    start = time.perf_counter()
+    results = [None]*len(cases)
+    if cases:
+        with limit_threads(threads_per_job), ProcessPoolExecutor(max_workers=processes) as pool:
+            futures = dict([(pool.submit(_run_case, name, case, mesh_file_name, ccx_exe, outputdir, binary, keep_work_dirs), i) \
+                for i, (name, case) in enumerate(zip(names, cases))])
+            for count, future in enumerate(as_completed(futures)):
+                i = futures[future]
+                results[i] = future.result()
+                print('[%i/%i] %s %s %s (%.2f s)'%(count+1, len(cases), results[i]['status'], results[i]['name'], results[i]['case'], results[i]['time']))
+    wall_time = time.perf_counter() - start
+
+    if manifest is not None:
+        summary = {
+            'created': datetime.today().strftime('%Y-%m-%d %H:%M:%S'),
+            'ccx_exe': ccx_exe,
+            'mesh_file_name': mesh_file_name,
+            'processes': processes,
+            'threads_per_job': threads_per_job,
+            'wall_time': wall_time,
+            'completed': sum([r['status'] == 'ok' for r in results]),
+            'failed': [r['name'] for r in results if r['status'] == 'failed'],
+            'results': results,
+            }
+        with open(os.path.join(outputdir, manifest), 'w') as f:
+            json.dump(summary, f, indent=2)
+
+    return results
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Run a parametric sweep of the elastic U-bend model with CalculiX in parallel.')
+    parser.add_argument('ccx_exe', help='full path to the CalculiX executable')
+    parser.add_argument('outputdir', help='directory where results of all cases are written')
+    parser.add_argument('-d', '--disp', type=float, nargs='+', required=True, help='displacements to run')
+    parser.add_argument('-E', '--youngs-modulus', type=float, nargs='+', default=[2.05E5], help="Young's moduli to run")
+    parser.add_argument('--poissons-ratio', type=float, nargs='+', default=[0.3], help="Poisson's ratios to run")
+    parser.add_argument('-m', '--mesh', help='mesh input deck, defaults to that distributed with OpenRS')
+    parser.add_argument('-n', '--processes', type=int, help='number of concurrent jobs, defaults to the number of cores divided by threads')
+    parser.add_argument('-t', '--threads', type=int, default=1, help='threads per CalculiX job')
+    parser.add_argument('--ascii', action='store_true', help='ask CalculiX for ascii rather than binary *.frd output')
+    parser.add_argument('--keep', action='store_true', help='keep the temporary work directory of each case')
+    parser.add_argument('--prefix', default='U_elastic_run_ccx', help='prefix of the output files of each case')
+    args = parser.parse_args()
+
+    cases = sweep_cases(args.disp, args.youngs_modulus, args.poissons_ratio)
+    results = run_sweep(cases, args.ccx_exe, args.outputdir, args.mesh, args.processes, args.threads, \
+        not args.ascii, args.keep, args.prefix)
+    failed = [r for r in results if r['status'] == 'failed']
+    for r in failed:
+        print('Failed: %s %s, %s'%(r['name'], r['case'], r['error']))
+    print('Completed %i of %i cases.'%(len(results) - len(failed), len(results)))
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,156 @@
+'''
+Writer for VTK unstructured grids from numpy arrays, shared between the CalculiX (frd_access.py) and ABAQUS (odb_access*.py) postprocessing scripts. XML *.vtu files are written either with raw, zlib compressed binary data appended to the XML header (default), or as ascii. Legacy *.vtk files are written as ascii.
+NB: this module is imported by ABAQUS Python scripts, and therefore needs to remain Python 2.7 compatible.
+(c) M. J. Roy 2021
+'''
+import zlib
+import numpy as np
+
+#numpy dtype to VTK XML type names; data is always written little endian
+VTK_TYPES = {'f8': 'Float64', 'f4': 'Float32', 'i8': 'Int64', 'i4': 'Int32', 'u1': 'UInt8'}
+
+BLOCK_SIZE = 1 << 20 #uncompressed bytes per zlib block
+
+def _to_bytes(a):
+    if hasattr(a, 'tobytes'):
+        return a.tobytes()
+    return a.tostring() #numpy < 1.9 as shipped with older ABAQUS versions
+
+def _encode(a, compress=True, level=6):
+    '''
+    Returns the appended data representation of array a. Compressed data consists of a UInt64 header of the number of blocks, block size, size of the last block and each compressed block size followed by the compressed blocks. Uncompressed data is preceded by a UInt64 byte count.
+    '''
+    raw = _to_bytes(a)
+    if not compress:
+        return _to_bytes(np.array([len(raw)], dtype='<u8')) + raw
+
+    blocks = [zlib.compress(raw[i:i+BLOCK_SIZE], level) for i in range(0, len(raw), BLOCK_SIZE)]
+    last = len(raw) % BLOCK_SIZE
+    if last == 0 and len(raw) > 0:
+        last = BLOCK_SIZE
+    header = np.array([len(blocks), BLOCK_SIZE, last] + [len(b) for b in blocks], dtype='<u8')
+    return _to_bytes(header) + b''.join(blocks)
+
+def _prepare(a):
+    '''
+    Returns a contiguous little endian copy of a, converting types without a VTK equivalent.
+    '''
+    a = np.asarray(a)
+    if a.dtype.kind == 'f':
+        key = 'f4' if a.dtype.itemsize == 4 else 'f8'
+    elif a.dtype.kind == 'u' and a.dtype.itemsize == 1:
+        key = 'u1'
+    else:
+        key = 'i4' if a.dtype.itemsize == 4 else 'i8'
+    return np.ascontiguousarray(a, dtype='<' + key), VTK_TYPES[key]
+
+def write_vtu(outfile, points, connectivity, offsets, cell_types, point_data=(), binary=True, compress=True):
+    '''
+    Writes an XML unstructured grid file.
+    points - Nx3 array of point coordinates
+    connectivity - flat array of 0-based point indices of all cells
+    offsets - position in connectivity at which each cell ends
+    cell_types - VTK cell type of each cell
+    point_data - sequence of (name, array) pairs, each array having N rows
+    binary - write appended raw binary data (optionally zlib compressed), otherwise ascii
+    '''
+    arrays = [] #(section, xml attributes, prepared array)
+    for name, data in point_data:
+        a, vtk_type = _prepare(data)
+        ncomp = 1 if a.ndim == 1 else a.shape[1]
+        arrays.append(('PointData', 'type="%s" Name="%s" NumberOfComponents="%i"'%(vtk_type, name, ncomp), a))
+    a, vtk_type = _prepare(points)
+    arrays.append(('Points', 'type="%s" Name="Points" NumberOfComponents="3"'%vtk_type, a))
+    for name, data in [('connectivity', connectivity), ('offsets', offsets)]:
+        a, vtk_type = _prepare(np.asarray(data, dtype=np.int64))
+        arrays.append(('Cells', 'type="%s" Name="%s"'%(vtk_type, name), a))
+    a, vtk_type = _prepare(np.asarray(cell_types, dtype=np.uint8))
+    arrays.append(('Cells', 'type="%s" Name="types"'%vtk_type, a))
+
+    header = '<?xml version="1.0"?>\n<VTKFile type="UnstructuredGrid" version="1.0" byte_order="LittleEndian" header_type="UInt64"'
+    if binary and compress:
+        header += ' compressor="vtkZLibDataCompressor"'
+    header += '>\n<UnstructuredGrid>\n<Piece NumberOfPoints="%i" NumberOfCells="%i">\n'%(len(points), len(cell_types))
+
+    with open(outfile, 'wb') as fid:
+        fid.write(header.encode('ascii'))
+        encoded = []
+        offset = 0
+        for section in ['PointData', 'Points', 'Cells']:
+            fid.write(('<%s>\n'%section).encode('ascii'))
+            for sec, attrs, a in arrays:
+                if sec != section:
+                    continue
+                if binary:
+                    encoded.append(_encode(a, compress))
+                    fid.write(('<DataArray %s format="appended" offset="%i"/>\n'%(attrs, offset)).encode('ascii'))
+                    offset += len(encoded[-1])
+                else:
+                    fid.write(('<DataArray %s format="ascii">\n'%attrs).encode('ascii'))
+                    np.savetxt(fid, a.reshape(len(a), -1), fmt='%.6e' if a.dtype.kind == 'f' else '%i')
+                    fid.write(b'</DataArray>\n')
+            fid.write(('</%s>\n'%section).encode('ascii'))
+        fid.write(b'</Piece>\n</UnstructuredGrid>\n')
+        if binary:
+            fid.write(b'<AppendedData encoding="raw">\n_')
+            for e in encoded:
+                fid.write(e)
+            fid.write(b'\n</AppendedData>\n')
+        fid.write(b'</VTKFile>\n')
+
+def legacy_cells(connectivity, offsets):
+    '''
+    Returns the legacy VTK cell array, where each cell is given by its number of points followed by point indices, and the location of each cell in this array (as per vtkUnstructuredGrid.GetCellLocationsArray).
+    '''
+    connectivity = np.asarray(connectivity)
+    offsets = np.asarray(offsets)
+    n_cells = len(offsets)
+    sizes = np.diff(np.concatenate(([0], offsets)))
+    cells = np.empty(n_cells + len(connectivity), dtype=np.int64)
+    locations = offsets - sizes + np.arange(n_cells)
+    is_size = np.zeros(len(cells), dtype=bool)
+    is_size[locations] = True
+    cells[is_size] = sizes
+    cells[~is_size] = connectivity
+    return cells, locations
+
+def write_vtk(outfile, points, connectivity, offsets, cell_types, point_data=()):
+    '''
+    Writes a legacy ascii unstructured grid file, with the same arguments as write_vtu.
+    '''
+    connectivity = np.asarray(connectivity)
+    offsets = np.asarray(offsets)
+    n_cells = len(cell_types)
+    sizes = np.diff(np.concatenate(([0], offsets)))
+
+    with open(outfile, 'wb') as fid:
+        fid.write(('# vtk DataFile Version 2.0\n%s,created by OpenRS\nASCII\nDATASET UNSTRUCTURED_GRID\n'%outfile[:-4]).encode('ascii'))
+        fid.write(('POINTS %i double\n'%len(points)).encode('ascii'))
+        np.savetxt(fid, points, fmt='%.6f')
+        fid.write(('\nCELLS %i %i\n'%(n_cells, n_cells + len(connectivity))).encode('ascii'))
+        cells, _ = legacy_cells(connectivity, offsets)
+        if n_cells and np.all(sizes == sizes[0]):
+            np.savetxt(fid, cells.reshape(n_cells, -1), fmt='%i')
+        else:
+            np.savetxt(fid, cells.reshape(-1, 1), fmt='%i')
+        fid.write(('\nCELL_TYPES %i\n'%n_cells).encode('ascii'))
+        np.savetxt(fid, np.asarray(cell_types).reshape(-1, 1), fmt='%i')
+        fid.write(('\nPOINT_DATA %i\n'%len(points)).encode('ascii'))
+        for name, data in point_data:
+            data = np.asarray(data)
+            if data.ndim == 1:
+                fid.write(('SCALARS %s float 1\nLOOKUP_TABLE DEFAULT\n'%name).encode('ascii'))
+            else:
+                fid.write(('FIELD FieldData 1\n%s %i %i float\n'%(name, data.shape[1], len(data))).encode('ascii'))
+            np.savetxt(fid, data)
+
+def write_ug(outfile, points, connectivity, offsets, cell_types, point_data=(), binary=True):
+    '''
+    Writes an unstructured grid to either a legacy *.vtk (ascii) or XML *.vtu (binary or ascii) file depending on the extension of outfile. See write_vtu for arguments.
+    '''
+    if outfile.endswith('.vtk'):
+        write_vtk(outfile, points, connectivity, offsets, cell_types, point_data)
+    elif outfile.endswith('.vtu'):
+        write_vtu(outfile, points, connectivity, offsets, cell_types, point_data, binary=binary)
+    else:
+        raise ValueError('Specified output file %s not valid, needs to be *.vtk or *.vtu.'%outfile)
@@ -0,0 +1,178 @@
+'''
+Queue of background FEA jobs for the calculation widget. Jobs are QThreads (i.e. flexure_widget.external) which emit their percentage complete through _signal (100 when done, -1 if failed or cancelled) and a description of progress through _status, can be cancelled with cancel(), and hold what they wrote in result. The queue is a table model listing the status, elapsed time and result of each job, and starts queued jobs in the order they were added, with no more than max_jobs running at once.
+(c) M. J. Roy 2021
+'''
+
+import time
+from PyQt5 import QtCore
+from PyQt5.QtCore import Qt, pyqtSignal
+
+FINISHED = ('Complete', 'Failed', 'Cancelled')
+
+class job_queue(QtCore.QAbstractTableModel):
+    '''
+    Table model of jobs, with a row per job in the order they were added. Emits job_finished with the row of a job once it has finished.
+    '''
+    job_finished = pyqtSignal(int)
+    headerlabels = ['Job', 'Status', 'Elapsed', 'Result']
+
+    def __init__(self, max_jobs=1, parent=None):
+        super(job_queue, self).__init__(parent)
+        self._jobs = []
+        self.max_jobs = max(1, int(max_jobs))
+        #refresh elapsed times of running jobs
+        self.timer = QtCore.QTimer(self)
+        self.timer.setInterval(1000)
+        self.timer.timeout.connect(self.update_elapsed)
+
+    def add(self, name, thread):
+        '''
+        Queues thread under name, starting it if fewer than max_jobs are running. Returns its row.
+        '''
+        row = len(self._jobs)
+        job = {'name': name, 'thread': thread, 'status': 'Queued', 'percent': 0, 'start': None, 'end': None}
+        self.beginInsertRows(QtCore.QModelIndex(), row, row)
+        self._jobs.append(job)
+        self.endInsertRows()
+        thread._status.connect(lambda msg, job=job: self._job_status(job, msg))
+        thread._signal.connect(lambda value, job=job: self._job_signal(job, value))
+        thread.finished.connect(lambda job=job: self._job_finished(job))
+        self.start_next()
+        return row
+
+    def set_max_jobs(self, max_jobs):
+        '''
+        Sets the number of jobs that can run at once, starting queued jobs if this has increased. Running jobs are not stopped if it has decreased.
+        '''
+        self.max_jobs = max(1, int(max_jobs))
+        self.start_next()
+
+    def running(self):
+        '''
+        Returns the number of jobs running.
+        '''
+        return len([job for job in self._jobs if job['start'] is not None and job['end'] is None])
+
+    def start_next(self):
+        '''
+        Starts queued jobs in turn until max_jobs are running.
+        '''
+        for job in self._jobs:
+            if self.running() >= self.max_jobs:
+                break
+            if job['status'] == 'Queued':
+                job['start'] = time.time()
+                job['status'] = 'Starting'
+                job['thread'].start()
+                self._changed(job)
+        if self.running():
+            self.timer.start()
+        else:
+            self.timer.stop()
+
+    def cancel(self, row):
+        '''
+        Cancels the job of row; queued jobs are removed from the queue without starting.
+        '''
+        job = self._jobs[row]
+        if job['status'] == 'Queued':
+            job['status'] = 'Cancelled'
+            self._changed(job)
+            self.job_finished.emit(row)
+        elif job['end'] is None:
+            job['thread'].cancel()
+
+    def clear_finished(self):
+        '''
+        Removes finished jobs from the table.
+        '''
+        for row in reversed(range(len(self._jobs))):
+            if self.is_finished(row):
+                self.beginRemoveRows(QtCore.QModelIndex(), row, row)
+                job = self._jobs.pop(row)
+                self.endRemoveRows()
+                job['thread'].deleteLater()
+
+    def is_finished(self, row):
+        return self._jobs[row]['status'] in FINISHED and (self._jobs[row]['start'] is None or self._jobs[row]['end'] is not None)
+
+    def result(self, row):
+        '''
+        Returns the path to the result of the job of row if it completed, otherwise None.
+        '''
+        job = self._jobs[row]
+        if job['status'] != 'Complete' or not job['thread'].result:
+            return None
+        return job['thread'].result.get('outfile')
+
+    def thread(self, row):
+        return self._jobs[row]['thread']
+
+    def elapsed(self, row):
+        '''
+        Returns the time in seconds the job of row has been running, or ran for; None if it has not started.
+        '''
+        job = self._jobs[row]
+        if job['start'] is None:
+            return None
+        return (job['end'] or time.time()) - job['start']
+
+    def update_elapsed(self):
+        for job in self._jobs:
+            if job['start'] is not None and job['end'] is None:
+                self._changed(job, 2)
+
+    def _job_status(self, job, msg):
+        job['status'] = msg
+        self._changed(job)
+
+    def _job_signal(self, job, value):
+        job['percent'] = int(value)
+        self._changed(job)
+
+    def _job_finished(self, job):
+        job['end'] = time.time()
+        if job['status'] not in FINISHED:
+            job['status'] = 'Complete' if job['percent'] == 100 else 'Failed'
+        self._changed(job)
+        self.job_finished.emit(self._jobs.index(job))
+        self.start_next()
+
+    def _changed(self, job, column=None):
+        '''
+        Signals views that the row of job has changed, only column if specified.
+        '''
+        row = self._jobs.index(job)
+        first, last = (0, len(self.headerlabels)-1) if column is None else (column, column)
+        self.dataChanged.emit(self.index(row, first), self.index(row, last))
+
+    def data(self, index, role):
+        job = self._jobs[index.row()]
+        column = index.column()
+        if role == Qt.DisplayRole:
+            if column == 0:
+                return job['name']
+            elif column == 1:
+                if job['status'] in FINISHED or job['status'] == 'Queued':
+                    return job['status']
+                return '%s (%i%%)'%(job['status'], job['percent'])
+            elif column == 2:
+                elapsed = self.elapsed(index.row())
+                return '' if elapsed is None else '%i:%02i'%divmod(int(elapsed), 60)
+            elif column == 3:
+                return self.result(index.row()) or ''
+        elif role == Qt.ToolTipRole and column == 3:
+            return self.result(index.row())
+
+    def rowCount(self, index=QtCore.QModelIndex()):
+        return len(self._jobs)
+
+    def columnCount(self, index=QtCore.QModelIndex()):
+        return len(self.headerlabels)
+
+    def headerData(self, col, orientation, role):
+        if role == QtCore.Qt.DisplayRole:
+            if orientation == QtCore.Qt.Horizontal:
+                return QtCore.QVariant(self.headerlabels[col])
+            if orientation == QtCore.Qt.Vertical:
+                return str(col+1)
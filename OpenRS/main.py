@@ -188,7 +188,13 @@ class main_window(QtWidgets.QMainWindow):
         self.psui.write_h5()
 
     def launch_modeling(self):
-        self.mw = modeling_widget(self)
+        '''
+        Shows the calculation widget, reusing any already open so that its job queue is kept.
+        '''
+        if not hasattr(self, 'mw'):
+            self.mw = modeling_widget(self)
+        self.mw.show()
+        self.mw.raise_()
     
     def launch_translate_amphyon(self):
         translate_amphyon_vtp(None,None)
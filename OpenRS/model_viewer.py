@@ -23,7 +23,8 @@ import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib import rc
 import importlib.resources
-from OpenRS.open_rs_common import get_file, get_save_file, line_query_vtk, line_query_NDinterp, generate_axis_actor, generate_info_actor, xyview, yzview, xzview, flip_visible, make_logo, modeling_widget, generate_sphere, do_transform
+from OpenRS.open_rs_common import get_file, get_save_file, line_query_vtk, line_query_NDinterp, generate_axis_actor, generate_info_actor, xyview, yzview, xzview, flip_visible, make_logo, generate_sphere, do_transform
+from OpenRS.flexure_widget import modeling_widget
 from OpenRS.open_rs_hdf5_io import *
 from OpenRS.transform_widget import make_translate_button_layout
 
@@ -420,8 +421,8 @@ class interactor(QtWidgets.QWidget):
                     del f['model_boundary/vertices']
                     np_pts = v2n(self.model_boundary.GetPoints().GetData())
                     np_verts = v2n(self.model_boundary.GetPolys().GetData())
-                    f.create_dataset('model_boundary/points', data=np_pts)
-                    f.create_dataset('model_boundary/vertices', data=np_verts)
+                    compressed_dataset(f, 'model_boundary/points', np_pts)
+                    compressed_dataset(f, 'model_boundary/vertices', np_verts)
                 self.display_info('Saved to data file.')
         else:
             return
@@ -441,15 +442,21 @@ class interactor(QtWidgets.QWidget):
         edges = False
         from_load = False #until turned false
         
+        #read the component displayed if point data is read lazily, releasing others
+        if getattr(self, 'point_data', None) is not None and hasattr(self, 'model_obj') and self.component in self.point_data.names():
+            self.point_data.activate(self.model_obj, self.component)
+        
         
         if hasattr(self,'active_obj') and not hasattr(self,'model_obj'):
             from_load = True
             #read the model data
-            self.model_obj, components = read_model_data(self.active_obj)
+            self.model_obj, components = read_model_data(self.active_obj, getattr(self, 'point_data', None))
             #update the combobox with the components
             self.ui.component_cb.clear()
             self.ui.component_cb.addItems(components)
             self.component = self.ui.component_cb.currentText()
+            if getattr(self, 'point_data', None) is not None and self.component:
+                self.point_data.activate(self.model_obj, self.component)
             
             #edge display conditioning
             
@@ -684,17 +691,17 @@ class interactor(QtWidgets.QWidget):
         filep, startdir = get_file('*.vtu','*.vtp')
         if filep is None:
             return
+        self.load_model_file(filep)
+
+    def load_model_file(self, filep):
+        """
+        Loads and draws the model file filep, i.e. a result of the calculation widget
+        """
         if not(os.path.isfile(filep)):
             self.display_info('Invalid model file.')
             return
         
-        if hasattr(self,'model_obj'):
-            delattr(self, 'active_obj')
-            delattr(self, 'model_obj')
-            delattr(self, 'component')
-            #clear all actors
-            self.ren.RemoveAllViewProps()
-            
+        self.clear_model()
         self.active_obj = filep
         self.ui.load_label.setText(filep)
         #call draw_model
@@ -706,7 +713,22 @@ class interactor(QtWidgets.QWidget):
         
         
             
+    def clear_model(self):
+        '''
+        Removes any model loaded, along with its actors.
+        '''
+        if hasattr(self,'model_obj'):
+            delattr(self, 'active_obj')
+            delattr(self, 'model_obj')
+            delattr(self, 'component')
+            #clear all actors
+            self.ren.RemoveAllViewProps()
+        self.point_data = None
+
     def load_h5(self):
+        '''
+        Loads the model of an OpenRS file. Point data is read as each component is displayed, with only the one displayed held in memory.
+        '''
         if self.file is None:
             self.file, _ = get_file("*.OpenRS")
         
@@ -721,14 +743,15 @@ class interactor(QtWidgets.QWidget):
             
             if not self.polydata_mode:
                 r = HDF5vtkug_reader()
-                r.SetFileName(self.file)
-                r.Update()
             else:
                 r = HDF5vtkpd_reader()
-                r.SetFileName(self.file)
-                r.Update()
+            r.SetFileName(self.file)
+            r.SetLazyPointData(True)
+            r.Update()
             
+            self.clear_model()
             self.active_obj = r.GetOutputDataObject(0).GetBlock(0)
+            self.point_data = r.GetLazyPointData(0)
             
             self.ui.load_label.setText(self.file)
             #call draw_model
@@ -760,7 +783,9 @@ class interactor(QtWidgets.QWidget):
         elif key == "l": #debug
             self.load_h5()
         elif key == "m":
-            self.mw = modeling_widget(self)
+            if not hasattr(self, 'mw'):
+                self.mw = modeling_widget(self)
+            self.mw.show()
         elif key == "n":
             self.actuate_node_pick()
 
@@ -861,9 +886,9 @@ class interactor(QtWidgets.QWidget):
             
 
 
-def read_model_data(obj):
+def read_model_data(obj, point_data=None):
     '''
-    Read an unstructured grid from an XML formatted vtu file, or operate on a ug object, returning the ug and component names.
+    Read an unstructured grid from an XML formatted vtu file, or operate on a ug object, returning the ug and component names. Component names are those of point_data if it is read lazily (see open_rs_hdf5_io.lazy_point_data).
     '''
 
     #If read is true, then vtuname is a VTU file
@@ -879,10 +904,13 @@ def read_model_data(obj):
         output = reader.GetOutput()
     else: #coming from hdf5reader
         output = obj
-    #get the component names
+    #get the component names of scalar fields; vector fields such as principal directions are not displayed
+    if point_data is not None:
+        return output, point_data.scalar_names()
     components = []
     for index in range(output.GetPointData().GetNumberOfArrays()):
-        components.append(output.GetPointData().GetArrayName(index))
+        if output.GetPointData().GetArray(index).GetNumberOfComponents() == 1:
+            components.append(output.GetPointData().GetArrayName(index))
 
     return output, components
 
@@ -15,9 +15,50 @@ import h5py
 from vtk.util.vtkAlgorithm import VTKPythonAlgorithmBase
 from vtk.numpy_interface import dataset_adapter as dsa
 import numpy as np
+from collections import OrderedDict
 from datetime import datetime
 from OpenRS.open_rs_common import get_save_file
 
+#chunking and filters of datasets, chosen by size in bytes (see dataset_options)
+COMPRESSION = {
+    'min_size': 1 << 16, #smaller datasets are stored contiguously without filters
+    'filter': 'gzip', #filter of datasets up to fast_size, one of 'gzip' or 'lzf'
+    'level': 4, #gzip level
+    'fast_size': 1 << 28, #larger datasets are written with fast_filter
+    'fast_filter': 'lzf',
+    'shuffle': True, #byte shuffle ahead of filtering, which suits integer and floating point arrays
+    'chunk_size': 1 << 20, #nominal bytes per chunk
+    }
+
+def dataset_options(shape, dtype, compression=None, chunked=False):
+    '''
+    Returns keyword arguments for h5py's create_dataset, giving the chunks and filters of a dataset of shape and dtype according to its size. compression is a dictionary overriding values of COMPRESSION, or False to write without filters. Chunks hold whole rows (i.e. all components of a point), with as many rows as fit in chunk_size. Datasets smaller than min_size are stored contiguously, unless chunked (i.e. resizable datasets), in which case they are chunked without filters.
+    '''
+    c = dict(COMPRESSION)
+    if compression:
+        c.update(compression)
+    shape = tuple(int(n) for n in shape)
+    size = int(np.prod(shape))*np.dtype(dtype).itemsize
+    filtered = compression is not False and len(shape) > 0 and size >= c['min_size']
+    if not filtered and not chunked:
+        return {}
+    row_size = max(1, int(np.prod(shape[1:]))*np.dtype(dtype).itemsize)
+    rows = int(min(max(shape[0], 1), max(1, c['chunk_size']//row_size)))
+    options = {'chunks': (rows,) + shape[1:]}
+    if filtered:
+        options['compression'] = c['fast_filter'] if size >= c['fast_size'] else c['filter']
+        if options['compression'] == 'gzip':
+            options['compression_opts'] = c['level']
+        options['shuffle'] = c['shuffle']
+    return options
+
+def compressed_dataset(group, name, data, compression=None):
+    '''
+    Creates dataset name holding data in group with the chunks and filters of dataset_options.
+    '''
+    data = np.asarray(data)
+    return group.create_dataset(name, data=data, **dataset_options(data.shape, data.dtype, compression))
+
 def initialize_HDF5(file=None):
     '''
     Create an HDF5 file with relevant empty structures.
@@ -64,6 +105,160 @@ def initialize_HDF5(file=None):
     return file
     
 
+def write_model_arrays(file, points, connectivity, offsets, cell_types, point_data=(), compression=None):
+    '''
+    Writes an unstructured grid held as numpy arrays directly to the 'model_data/piece0' group of an OpenRS file, with the same layout as HDF5vtkug_writer and therefore readable by HDF5vtkug_reader. The file is created with initialize_HDF5 if it does not exist, otherwise existing model data is replaced.
+    points - Nx3 array of point coordinates
+    connectivity - flat array of 0-based point indices of all cells
+    offsets - position in connectivity at which each cell ends
+    cell_types - VTK cell type of each cell
+    point_data - sequence of (name, array) pairs, each array having N rows
+    compression - chunking and filters of datasets, as per dataset_options
+    '''
+    from OpenRS.generate.vtu_writer import legacy_cells
+    
+    if not os.path.isfile(file):
+        initialize_HDF5(file)
+    
+    points = np.asarray(points, dtype=np.float64)
+    cells, locations = legacy_cells(connectivity, offsets)
+    
+    with h5py.File(file, 'r+') as f:
+        if "model_data" in f:
+            del f["model_data"]
+        grp = f.create_group("model_data").create_group("piece0")
+        grp.attrs['bounds'] = np.column_stack((points.min(axis=0), points.max(axis=0))).ravel()
+        
+        compressed_dataset(grp, "cells", cells, compression)
+        compressed_dataset(grp, "cell_types", np.asarray(cell_types, dtype=np.uint8), compression)
+        compressed_dataset(grp, "cell_locations", locations, compression)
+        
+        compressed_dataset(grp, "points", points, compression)
+        
+        pdata = grp.create_group("point_data")
+        for name, data in point_data:
+            compressed_dataset(pdata, name, data, compression)
+        
+        f.attrs['date_modified'] = datetime.today().strftime('%Y-%m-%d %H:%M:%S')
+    
+    return file
+
+def write_time_series_topology(file, points, connectivity, offsets, cell_types, fields, node_labels=None, compression=None):
+    '''
+    Creates a time series store of results on a fixed mesh. The undeformed mesh is written once to the 'topology' group, and an empty, resizable dataset is created in the 'fields' group for each entry of fields (a dictionary of name and number of components), with a chunk holding (part of) a single frame so that frames can be appended and read individually. Frame numbers and step times are held in the 'frames' and 'frame_values' datasets.
+    points - Nx3 array of point coordinates
+    connectivity, offsets, cell_types - VTK cells, as per write_model_arrays
+    node_labels - node number of each point
+    compression - chunking and filters of datasets as per dataset_options, those of fields being chosen by the size of a frame
+    '''
+    n_points = len(points)
+    with h5py.File(file, 'w') as f:
+        f.attrs['date_created'] = datetime.today().strftime('%Y-%m-%d %H:%M:%S')
+        
+        topo = f.create_group("topology")
+        compressed_dataset(topo, "points", np.asarray(points, dtype=np.float64), compression)
+        compressed_dataset(topo, "connectivity", np.asarray(connectivity, dtype=np.int64), compression)
+        compressed_dataset(topo, "offsets", np.asarray(offsets, dtype=np.int64), compression)
+        compressed_dataset(topo, "cell_types", np.asarray(cell_types, dtype=np.uint8), compression)
+        if node_labels is not None:
+            compressed_dataset(topo, "node_labels", np.asarray(node_labels, dtype=np.int64), compression)
+        
+        f.create_dataset("frames", shape=(0,), maxshape=(None,), dtype=np.int64, chunks=(1024,))
+        f.create_dataset("frame_values", shape=(0,), maxshape=(None,), dtype=np.float64, chunks=(1024,))
+        grp = f.create_group("fields")
+        for name, n_comp in fields.items():
+            options = dataset_options((n_points, n_comp), np.float64, compression, chunked=True)
+            options['chunks'] = (1,) + options['chunks']
+            grp.create_dataset(name, shape=(0, n_points, n_comp), maxshape=(None, n_points, n_comp), \
+                dtype=np.float64, **options)
+        
+        f.attrs['date_modified'] = datetime.today().strftime('%Y-%m-%d %H:%M:%S')
+    
+    return file
+
+def append_time_series_frame(file, frame, value, fields):
+    '''
+    Appends a frame to a time series store created by write_time_series_topology. fields is a dictionary of name and array with one row per point.
+    '''
+    with h5py.File(file, 'r+') as f:
+        i = len(f["frames"])
+        for ds in [f["frames"], f["frame_values"]] + [f["fields"][name] for name in fields]:
+            ds.resize(i+1, axis=0)
+        f["frames"][i] = frame
+        f["frame_values"][i] = value
+        for name, data in fields.items():
+            f["fields"][name][i] = data
+        f.attrs['date_modified'] = datetime.today().strftime('%Y-%m-%d %H:%M:%S')
+
+def read_time_series_frame(file, i=-1, names=None):
+    '''
+    Returns a dictionary of the topology of a time series store along with 'frame', 'value' and the fields (all, or those in names) of the i-th frame stored (the last by default).
+    '''
+    out = {}
+    with h5py.File(file, 'r') as f:
+        for key in f["topology"]:
+            out[key] = f["topology"][key][()]
+        n_frames = len(f["frames"])
+        if i < 0:
+            i += n_frames
+        if not 0 <= i < n_frames:
+            raise IndexError('Frame %i not in %s, which holds %i frames.'%(i, file, n_frames))
+        out['frame'] = int(f["frames"][i])
+        out['value'] = float(f["frame_values"][i])
+        for name in (names if names is not None else f["fields"].keys()):
+            out[name] = f["fields"][name][i]
+    return out
+
+class lazy_point_data(object):
+    '''
+    Point data arrays of a group of an OpenRS file (i.e. 'model_data/piece0/point_data'), read only when requested. The arrays added to a VTK dataset with activate are limited to the max_arrays most recently activated, others being removed from the dataset so that their memory is released; evicted arrays are read again if activated later. The file is only open while an array is read.
+    '''
+    def __init__(self, file, group, max_arrays=1):
+        self.file = file
+        self.group = group
+        self.max_arrays = max(1, int(max_arrays))
+        self.loaded = OrderedDict() #names of arrays held by the dataset, least recently used first
+        with h5py.File(file, 'r') as f:
+            self.shapes = OrderedDict([(name, f[group][name].shape) for name in f[group]])
+
+    def names(self):
+        return list(self.shapes.keys())
+
+    def scalar_names(self):
+        '''
+        Returns the names of arrays with a single component.
+        '''
+        return [name for name, shape in self.shapes.items() if len(shape) == 1 or shape[1] == 1]
+
+    def read(self, name):
+        '''
+        Returns array name read from the file.
+        '''
+        with h5py.File(self.file, 'r') as f:
+            return f[self.group][name][:]
+
+    def activate(self, dataset, name):
+        '''
+        Adds array name to the point data of dataset if it is not already present, removing the least recently used arrays from it beyond max_arrays.
+        '''
+        if name in self.loaded and dataset.GetPointData().HasArray(name):
+            self.loaded.move_to_end(name)
+        else:
+            dsa.WrapDataObject(dataset).PointData.append(self.read(name), name)
+            self.loaded[name] = True
+        while len(self.loaded) > self.max_arrays:
+            evicted, _ = self.loaded.popitem(last=False)
+            dataset.GetPointData().RemoveArray(evicted)
+        dataset.GetPointData().SetActiveScalars(name)
+
+    def release(self, dataset):
+        '''
+        Removes all activated arrays from dataset.
+        '''
+        for name in self.loaded:
+            dataset.GetPointData().RemoveArray(name)
+        self.loaded.clear()
+
 class HDF5vtkug_writer(VTKPythonAlgorithmBase):
     def __init__(self):
         VTKPythonAlgorithmBase.__init__(self, \
@@ -74,6 +269,7 @@ class HDF5vtkug_writer(VTKPythonAlgorithmBase):
         self.__FileName = ""
         self.__NumberOfPieces = 1
         self.__CurrentPiece = 0
+        self.__Compression = None
 
 
     def RequestData(self, request, inInfo, outInfo):
@@ -89,15 +285,15 @@ class HDF5vtkug_writer(VTKPythonAlgorithmBase):
         grp = model.create_group("piece%d" % self.__CurrentPiece)
         grp.attrs['bounds'] = inp.GetBounds()
  
-        grp.create_dataset("cells", data=inp.Cells)
-        grp.create_dataset("cell_types", data=inp.CellTypes)
-        grp.create_dataset("cell_locations", data=inp.CellLocations)
+        compressed_dataset(grp, "cells", inp.Cells, self.__Compression)
+        compressed_dataset(grp, "cell_types", inp.CellTypes, self.__Compression)
+        compressed_dataset(grp, "cell_locations", inp.CellLocations, self.__Compression)
  
-        grp.create_dataset("points", data=inp.Points)
+        compressed_dataset(grp, "points", inp.Points, self.__Compression)
  
         pdata = grp.create_group("point_data")
         for name in inp.PointData.keys():
-            pdata.create_dataset(name, data=inp.PointData[name])
+            compressed_dataset(pdata, name, inp.PointData[name], self.__Compression)
         
         self.__File.attrs['date_modified'] = datetime.today().strftime('%Y-%m-%d %H:%M:%S')
         
@@ -145,6 +341,17 @@ class HDF5vtkug_writer(VTKPythonAlgorithmBase):
  
     def GetNumberOfPieces(self):
         return self.__NumberOfPieces
+ 
+    def SetCompression(self, compression):
+        '''
+        Sets the chunking and filters of datasets written, as per dataset_options.
+        '''
+        if compression != self.__Compression:
+            self.Modified()
+            self.__Compression = compression
+ 
+    def GetCompression(self):
+        return self.__Compression
 
 class HDF5vtkpd_writer(VTKPythonAlgorithmBase):
     def __init__(self):
@@ -156,6 +363,7 @@ class HDF5vtkpd_writer(VTKPythonAlgorithmBase):
         self.__FileName = ""
         self.__NumberOfPieces = 1
         self.__CurrentPiece = 0
+        self.__Compression = None
 
 
     def RequestData(self, request, inInfo, outInfo):
@@ -175,11 +383,11 @@ class HDF5vtkpd_writer(VTKPythonAlgorithmBase):
         
         # grp.create_dataset("cell_locations", data=inp.CellLocations)
  
-        grp.create_dataset("points", data=inp.Points)
+        compressed_dataset(grp, "points", inp.Points, self.__Compression)
  
         pdata = grp.create_group("point_data")
         for name in inp.PointData.keys():
-            pdata.create_dataset(name, data=inp.PointData[name])
+            compressed_dataset(pdata, name, inp.PointData[name], self.__Compression)
         
         self.__File.attrs['date_modified'] = datetime.today().strftime('%Y-%m-%d %H:%M:%S')
         
@@ -227,6 +435,17 @@ class HDF5vtkpd_writer(VTKPythonAlgorithmBase):
  
     def GetNumberOfPieces(self):
         return self.__NumberOfPieces
+ 
+    def SetCompression(self, compression):
+        '''
+        Sets the chunking and filters of datasets written, as per dataset_options.
+        '''
+        if compression != self.__Compression:
+            self.Modified()
+            self.__Compression = compression
+ 
+    def GetCompression(self):
+        return self.__Compression
 
 class HDF5vtkug_reader(VTKPythonAlgorithmBase):
     def __init__(self):
@@ -235,9 +454,13 @@ class HDF5vtkug_reader(VTKPythonAlgorithmBase):
             nOutputPorts=1, outputType='vtkMultiBlockDataSet')
  
         self.__FileName = ""
+        self.__LazyPointData = False
+        self.__MaxArrays = 1
+        self.__PointData = []
  
     def RequestData(self, request, inInfo, outInfo):
         output = dsa.WrapDataObject(vtk.vtkMultiBlockDataSet.GetData(outInfo))
+        self.__PointData = []
         f = h5py.File(self.__FileName, 'r')
         idx = 0
         data = f["model_data"]
@@ -254,6 +477,9 @@ class HDF5vtkug_reader(VTKPythonAlgorithmBase):
             pts = grp['points'][:]
             ug.Points = pts
             pt_arrays = grp['point_data']
+            if self.__LazyPointData:
+                self.__PointData.append(lazy_point_data(self.__FileName, pt_arrays.name, self.__MaxArrays))
+                continue
             for pt_array in pt_arrays:
                 array = pt_arrays[pt_array][:]
                 ug.PointData.append(array, pt_array)
@@ -267,6 +493,21 @@ class HDF5vtkug_reader(VTKPythonAlgorithmBase):
  
     def GetFileName(self):
         return self.__FileName
+ 
+    def SetLazyPointData(self, lazy, max_arrays=1):
+        '''
+        If lazy, point data is not read with the geometry and topology of each block, but when activated through GetLazyPointData, keeping no more than max_arrays in memory.
+        '''
+        if lazy != self.__LazyPointData or max_arrays != self.__MaxArrays:
+            self.Modified()
+            self.__LazyPointData = lazy
+            self.__MaxArrays = max_arrays
+ 
+    def GetLazyPointData(self, block=0):
+        '''
+        Returns the lazy_point_data of a block read, or None if point data was read with it.
+        '''
+        return self.__PointData[block] if self.__LazyPointData else None
 
 class HDF5vtkpd_reader(VTKPythonAlgorithmBase):
     def __init__(self):
@@ -275,9 +516,13 @@ class HDF5vtkpd_reader(VTKPythonAlgorithmBase):
             nOutputPorts=1, outputType='vtkMultiBlockDataSet')
  
         self.__FileName = ""
+        self.__LazyPointData = False
+        self.__MaxArrays = 1
+        self.__PointData = []
  
     def RequestData(self, request, inInfo, outInfo):
         output = dsa.WrapDataObject(vtk.vtkMultiBlockDataSet.GetData(outInfo))
+        self.__PointData = []
         f = h5py.File(self.__FileName, 'r')
         idx = 0
         data = f["model_data"]
@@ -295,6 +540,9 @@ class HDF5vtkpd_reader(VTKPythonAlgorithmBase):
                 verts.InsertNextCell(1)
                 verts.InsertCellPoint(i)
             pd.SetVerts(verts)
+            if self.__LazyPointData:
+                self.__PointData.append(lazy_point_data(self.__FileName, pt_arrays.name, self.__MaxArrays))
+                continue
             
             for pt_array in pt_arrays:
                 array = pt_arrays[pt_array][:]
@@ -308,4 +556,19 @@ class HDF5vtkpd_reader(VTKPythonAlgorithmBase):
             self.__FileName = fname
  
     def GetFileName(self):
-        return self.__FileName
\ No newline at end of file
+        return self.__FileName
+ 
+    def SetLazyPointData(self, lazy, max_arrays=1):
+        '''
+        If lazy, point data is not read with the points of each block, but when activated through GetLazyPointData, keeping no more than max_arrays in memory.
+        '''
+        if lazy != self.__LazyPointData or max_arrays != self.__MaxArrays:
+            self.Modified()
+            self.__LazyPointData = lazy
+            self.__MaxArrays = max_arrays
+ 
+    def GetLazyPointData(self, block=0):
+        '''
+        Returns the lazy_point_data of a block read, or None if point data was read with it.
+        '''
+        return self.__PointData[block] if self.__LazyPointData else None
@@ -897,11 +897,11 @@ class interactor(QtWidgets.QWidget):
             del f['sample/transform']
             del f['measurement_points/points']
             del f['fiducials/points']
-            f.create_dataset('sample/points', data=self.np_pts)
-            f.create_dataset('sample/vertices', data=self.np_verts)
-            f.create_dataset('sample/transform', data=self.c_trans)
-            f.create_dataset('measurement_points/points', data=tab_data[0])
-            f.create_dataset('fiducials/points', data=tab_data[1])
+            compressed_dataset(f, 'sample/points', self.np_pts)
+            compressed_dataset(f, 'sample/vertices', self.np_verts)
+            compressed_dataset(f, 'sample/transform', self.c_trans)
+            compressed_dataset(f, 'measurement_points/points', tab_data[0])
+            compressed_dataset(f, 'fiducials/points', tab_data[1])
             for k in self.ui.sgv.params.keys():
                 f['sgv'].attrs[k] = self.ui.sgv.params[k]
             f.attrs['date_modified'] = datetime.today().strftime('%Y-%m-%d %H:%M:%S')
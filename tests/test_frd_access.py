@@ -0,0 +1,142 @@
+'''
+Regression tests of reading CalculiX results with generate/frd_access.py. The fixtures in data/ are the results of cube.inp, a single C3D8 element in uniaxial tension for which the linear element is exact, in ascii (cube.frd/dat) and binary (cube_bin.frd/dat) form. They were assembled record by record to the layout CalculiX writes, as no solver was available where they were made; they should be replaced by the output of ccx for cube.inp when one is.
+(c) M. J. Roy 2021
+'''
+import os
+import shutil
+import numpy as np
+import pytest
+from OpenRS.generate import frd_access
+
+DATA = os.path.join(os.path.dirname(__file__), 'data')
+FIXTURES = ['cube', 'cube_bin']
+
+COORDINATES = np.array([[0,0,0],[1,0,0],[1,1,0],[0,1,0],[0,0,1],[1,0,1],[1,1,1],[0,1,1]], dtype=float)
+XMAX = [2, 3, 6, 7]
+
+def expected(step):
+    '''
+    Returns the displacements and stresses (SXX, SYY, SZZ, SXY, SYZ, SZX) at the nodes of cube.inp at the end of step, with 100 MPa applied per step.
+    '''
+    sxx = 100.0*step
+    strain = sxx/200000.0
+    displacement = COORDINATES*np.array([strain, -0.3*strain, -0.3*strain])
+    stress = np.zeros((8, 6))
+    stress[:, 0] = sxx
+    return displacement, stress
+
+@pytest.fixture(params=FIXTURES)
+def frdname(request, tmp_path):
+    '''
+    Copies a fixture to tmp_path, so that index and output files are not written to data/.
+    '''
+    for ext in ['.frd', '.dat']:
+        shutil.copy(os.path.join(DATA, request.param + ext), tmp_path)
+    return str(tmp_path / (request.param + '.frd'))
+
+def test_read_frd(frdname):
+    out = frd_access.read_frd(frdname)
+    assert np.array_equal(out['nodes'][:, 0], np.arange(1, 9))
+    assert np.allclose(out['nodes'][:, 1:], COORDINATES)
+    assert np.array_equal(out['elements']['labels'], [1])
+    assert np.array_equal(out['elements']['types'], [1])
+    assert np.array_equal(out['elements']['connectivity'], np.arange(1, 9))
+    assert [(r['name'], r['step']) for r in out['results']] == [('DISP', 1), ('STRESS', 1), ('DISP', 2), ('STRESS', 2)]
+    for r in out['results']:
+        displacement, stress = expected(r['step'])
+        assert r['value'] == pytest.approx(r['step'])
+        assert np.array_equal(r['labels'], np.arange(1, 9))
+        if r['name'] == 'DISP':
+            assert r['components'] == ['D1', 'D2', 'D3']
+            assert np.allclose(r['data'], displacement, rtol=1e-5, atol=1e-9)
+        else:
+            assert r['components'] == ['SXX', 'SYY', 'SZZ', 'SXY', 'SYZ', 'SZX']
+            assert np.allclose(r['data'], stress, rtol=1e-5)
+
+def test_binary_node_flag():
+    '''
+    CalculiX flags binary node coordinates as double precision (3), and results as single precision (2).
+    '''
+    frd = frd_access.FrdFile(os.path.join(DATA, 'cube_bin.frd'), save_index=False)
+    assert frd.index['nodes']['format'] == 3
+    assert frd.index['elements']['format'] == 2
+    assert [r['format'] for r in frd.results] == [2]*4
+
+def test_index_reused(frdname):
+    frd = frd_access.FrdFile(frdname)
+    assert os.path.isfile(frdname + '.idx')
+    reopened = frd_access.FrdFile(frdname)
+    assert reopened.index == frd.index
+    assert reopened.steps() == [1, 2]
+    assert reopened.fields() == ['DISP', 'STRESS']
+    assert np.allclose(reopened.get('DISP', 1)['data'], expected(1)[0], rtol=1e-5, atol=1e-9)
+
+@pytest.mark.parametrize('step', [None, 1])
+def test_postprocess_npz(frdname, tmp_path, step):
+    outfile, fiducial_file = str(tmp_path / 'out.npz'), str(tmp_path / 'out_fid.txt')
+    out = frd_access.postprocess(frdname, outfile, fiducial_file, step=step)
+    assert out == {'nodes': 8, 'elements': 1, 'fiducial_sets': ['XMAX']}
+
+    displacement, stress = expected(2 if step is None else step)
+    with np.load(outfile) as data:
+        assert np.allclose(data['points'], COORDINATES)
+        assert np.array_equal(data['node_labels'], np.arange(1, 9))
+        assert np.allclose(data['displacement'], displacement, rtol=1e-5, atol=1e-9)
+        assert np.allclose(data['stress'], stress, rtol=1e-5)
+        fiducials = data['U_XMAX']
+    assert np.array_equal(fiducials[:, 0], XMAX)
+    assert np.allclose(fiducials[:, 1:], COORDINATES[np.array(XMAX)-1] + displacement[np.array(XMAX)-1])
+
+    with open(fiducial_file) as f:
+        assert f.readline().strip() == 'U_XMAX'
+    assert np.allclose(np.loadtxt(fiducial_file, skiprows=1), fiducials)
+
+def test_postprocess_steps(frdname, tmp_path):
+    outfiles = [str(tmp_path / ('out_%i.npz'%i)) for i in range(2)]
+    fiducial_files = [str(tmp_path / ('out_%i_fid.txt'%i)) for i in range(2)]
+    frd_access.postprocess_steps(frdname, outfiles, fiducial_files)
+    for step, outfile in enumerate(outfiles, 1):
+        with np.load(outfile) as data:
+            assert np.allclose(data['displacement'], expected(step)[0], rtol=1e-5, atol=1e-9)
+
+@pytest.mark.parametrize('ip_stress', ['averaged', 'unaveraged'])
+def test_postprocess_ip_stress(frdname, tmp_path, ip_stress):
+    outfile = str(tmp_path / 'out.npz')
+    frd_access.postprocess(frdname, outfile, str(tmp_path / 'out_fid.txt'), ip_stress=ip_stress)
+    with np.load(outfile) as data:
+        #single element, so unaveraged points are those of the mesh in connectivity order
+        assert len(data['node_labels']) == len(data['points']) == 8
+        assert np.array_equal(data['node_labels'], np.arange(1, 9))
+        assert np.allclose(data['stress'], expected(2)[1], rtol=1e-5)
+
+def test_unaveraged_node_labels(tmp_path):
+    '''
+    Points duplicated per cell keep the number of the node they were copied from; needs more than one element, so uses fake_ccx.
+    '''
+    from OpenRS.generate import fake_ccx
+    mesh = fake_ccx.structured_mesh(8)
+    displacement, stress = fake_ccx.synthetic_fields(mesh['coordinates'], 1.0)
+    frdname = str(tmp_path / 'block.frd')
+    fake_ccx.write_frd(frdname, mesh, [(1.0, displacement, stress)])
+    fake_ccx.write_dat(str(tmp_path / 'block.dat'), mesh, [{'node_print': ['LEFT'], 'el_print': ['ALL']}], [(1.0, displacement, stress)])
+    outfile = str(tmp_path / 'block.npz')
+    frd_access.postprocess(frdname, outfile, str(tmp_path / 'block_fid.txt'), ip_stress='unaveraged')
+    with np.load(outfile) as data:
+        assert len(data['node_labels']) == len(data['points']) == len(data['connectivity']) > len(mesh['node_labels'])
+        index = dict(zip(mesh['node_labels'], mesh['coordinates']))
+        assert np.allclose(data['points'], [index[n] for n in data['node_labels']])
+
+def test_missing_fiducial_set(frdname, tmp_path):
+    with pytest.raises(ValueError, match='missing.*XMAX'):
+        frd_access.postprocess(frdname, str(tmp_path / 'out.npz'), str(tmp_path / 'out_fid.txt'), fiducial_sets=['xmax', 'missing'])
+    assert not os.path.isfile(str(tmp_path / 'out.npz'))
+
+def test_vtu_output(frdname, tmp_path):
+    vtk = pytest.importorskip('vtk')
+    outfile = str(tmp_path / 'out.vtu')
+    frd_access.postprocess(frdname, outfile, str(tmp_path / 'out_fid.txt'))
+    reader = vtk.vtkXMLUnstructuredGridReader()
+    reader.SetFileName(outfile)
+    reader.Update()
+    assert reader.GetOutput().GetNumberOfPoints() == 8
+    assert reader.GetOutput().GetNumberOfCells() == 1
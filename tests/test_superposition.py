@@ -0,0 +1,41 @@
+'''
+Regression tests of the cached unit displacement results of generate/superposition.py, solved with the stand-in CalculiX executable of generate/fake_ccx.py.
+(c) M. J. Roy 2021
+'''
+import os
+import pytest
+from OpenRS.generate import fake_ccx
+from OpenRS.generate.build_mesh import build_mesh
+from OpenRS.generate.superposition import run_elastic
+
+vtk = pytest.importorskip('vtk')
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def n_points(vtu):
+    reader = vtk.vtkXMLUnstructuredGridReader()
+    reader.SetFileName(vtu)
+    reader.Update()
+    return reader.GetOutput().GetNumberOfPoints()
+
+def test_unit_cache_per_mesh(tmp_path, monkeypatch):
+    '''
+    Meshes of different refinement sharing a cache directory each get their own unit displacement result, regardless of which is older than the cache.
+    '''
+    #the launcher runs fake_ccx as a module, so OpenRS needs to be importable whether or not it is installed
+    monkeypatch.setenv('PYTHONPATH', os.pathsep.join([p for p in [ROOT, os.environ.get('PYTHONPATH')] if p]))
+    ccx_exe = fake_ccx.install(str(tmp_path / 'bin'))
+    meshes = [str(tmp_path / 'A.inp'), str(tmp_path / 'B.inp')]
+    n_nodes = [build_mesh(meshes[0], 4.0)[0], build_mesh(meshes[1], 8.0)[0]]
+    assert n_nodes[0] != n_nodes[1]
+
+    cache_dir = str(tmp_path / 'unit_cache')
+    points = {}
+    for mesh in reversed(meshes):
+        outputdir = str(tmp_path / os.path.basename(mesh)[0])
+        os.makedirs(outputdir)
+        out = run_elastic(1.0, ccx_exe, outputdir, cache_dir=cache_dir, mesh_file_name=mesh)
+        points[mesh] = n_points(out['outfile'])
+    assert points[meshes[0]] != points[meshes[1]]
+    assert [points[mesh] for mesh in meshes] == n_nodes
+    assert len(os.listdir(cache_dir)) == 2